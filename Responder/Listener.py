@@ -1,6 +1,13 @@
-import whisper
+import queue
 import sounddevice as sd
 import numpy as np
+from collections import deque
+from dataclasses import replace
+from vad import EnergyVAD
+from typing import Callable, List, Optional, Union
+from streaming_asr import StreamingTranscriber, Word
+from asr_backends import ASRBackend, DecodeProfile, create_backend, get_profile
+from tracing import span, traced
 
 class WhisperListener:
     """
@@ -8,17 +15,33 @@ class WhisperListener:
     It records audio, processes it, and transcribes speech to text.
     """
 
-    def __init__(self, model_size: str = "base") -> None:
+    def __init__(self, model_size: str = "base", frame_ms: int = 30,
+                 backend: Union[str, ASRBackend] = "whisper", profile: Union[str, DecodeProfile] = "default",
+                 input_stream: Optional[Callable] = None, **backend_options) -> None:
         """
         Initializes the WhisperListener with a specified model.
 
         Args:
             model_size (str): Whisper model size. Options: 'tiny', 'base', 'small', 'medium', 'large'.
+            frame_ms (int): Frame length in milliseconds for voice activity detection.
+            backend (Union[str, ASRBackend]): ASR engine: 'whisper' (PyTorch float32),
+                'faster-whisper' (CTranslate2 int8), or a ready ASRBackend instance.
+            profile (Union[str, DecodeProfile]): Decode profile: 'default', 'kiosk-fast' or 'accurate'.
+            input_stream (Optional[Callable]): Opens the microphone, with the signature of
+                sd.InputStream. Lets recorded audio stand in for the microphone.
+            **backend_options: Passed to the backend, e.g. compute_type='int8_float32'.
         """
-        print("Loading Whisper model...")
-        self.model = whisper.load_model(model_size)  # Load the model (options: tiny, base, small, medium, large)
+        self.profile = get_profile(profile)
+        if isinstance(backend, ASRBackend):
+            self.backend = backend
+        else:
+            print(f"Loading Whisper model ({backend}, {self.profile.name} profile)...")
+            self.backend = create_backend(backend, model_size, **backend_options)
+        self.input_stream = input_stream or sd.InputStream
         self.sampling_rate = 16000  # Whisper works best with 16kHz audio
+        self.frame_size = int(self.sampling_rate * frame_ms / 1000)
 
+    @traced("asr.record")
     def record_audio(self, duration: int = 8):
         """
         Records audio from the microphone.
@@ -35,6 +58,102 @@ class WhisperListener:
         print("Recording complete.")
         return audio.flatten()
 
+    @traced("asr.record")
+    def record_until_silence(self, max_duration: float = 15.0, trailing_silence: float = 0.8,
+                             onset_timeout: float = 8.0, min_speech: float = 0.15, pre_roll: float = 0.3,
+                             vad: EnergyVAD = None,
+                             on_speech: Optional[Callable[[np.ndarray], None]] = None,
+                             input_stream: Optional[Callable] = None, stall_timeout: float = 2.0) -> np.ndarray:
+        """
+        Records one utterance from the microphone using voice activity detection.
+        Capture starts on speech onset and stops after a stretch of trailing silence,
+        so short answers return quickly and long answers are not cut off.
+
+        Args:
+            max_duration (float): Maximum utterance length in seconds.
+            trailing_silence (float): Seconds of silence that end the utterance.
+            onset_timeout (float): Seconds to wait for speech before giving up.
+            min_speech (float): Seconds of continuous speech required to count as onset.
+            pre_roll (float): Seconds of audio kept from before the onset, so the first
+                syllable is not clipped.
+            vad (EnergyVAD): Voice activity detector. A fresh EnergyVAD by default.
+            on_speech (Optional[Callable[[np.ndarray], None]]): Called on the recording thread
+                with the utterance audio as it is captured, starting at the pre-roll.
+            input_stream (Optional[Callable]): Microphone to record from, for listeners shared by
+                several stations. Defaults to the listener's own.
+            stall_timeout (float): Seconds without audio from the microphone, or a stream that
+                stopped, before the recording ends with whatever was captured.
+
+        Returns:
+            np.ndarray: The trimmed speech segment, or an empty array if nobody spoke.
+        """
+        vad = vad or EnergyVAD()
+        frame_seconds = self.frame_size / self.sampling_rate
+        frames = queue.Queue()
+
+        def callback(indata, frame_count, time_info, status):
+            frames.put(indata[:, 0].copy())
+
+        pre_onset = deque(maxlen=max(1, int(pre_roll / frame_seconds)))
+        onset_frames = max(1, int(min_speech / frame_seconds))
+        silence_frames = max(1, int(trailing_silence / frame_seconds))
+        max_frames = int(max_duration / frame_seconds)
+        timeout_frames = int(onset_timeout / frame_seconds)
+
+        speech = []
+        speech_run = 0
+        silence_run = 0
+        waited = 0
+
+        print("Recording...")
+        with (input_stream or self.input_stream)(samplerate=self.sampling_rate, channels=1, dtype=np.float32,
+                            blocksize=self.frame_size, callback=callback) as stream:
+            stalled = 0.0
+            while True:
+                try:
+                    frame = frames.get(timeout=0.25)
+                except queue.Empty:
+                    # An unplugged or failed device stops delivering, or stops the stream
+                    stalled += 0.25
+                    if stalled >= stall_timeout or not getattr(stream, "active", True):
+                        print("Microphone stopped delivering audio.")
+                        break
+                    continue
+                stalled = 0.0
+                is_speech = vad.is_speech(frame)
+
+                if not speech:
+                    # Waiting for onset
+                    pre_onset.append(frame)
+                    speech_run = speech_run + 1 if is_speech else 0
+                    if speech_run >= onset_frames:
+                        speech = list(pre_onset)
+                        if on_speech:
+                            on_speech(np.concatenate(speech))
+                        continue
+                    waited += 1
+                    if waited >= timeout_frames:
+                        print("No speech detected.")
+                        return np.zeros(0, dtype=np.float32)
+                    continue
+
+                speech.append(frame)
+                if on_speech:
+                    on_speech(frame)
+                silence_run = 0 if is_speech else silence_run + 1
+                if silence_run >= silence_frames or len(speech) >= max_frames:
+                    break
+
+        if not speech:
+            return np.zeros(0, dtype=np.float32)
+        # Keep a short tail of the trailing silence so word endings are not clipped
+        tail = max(0, silence_run - int(0.2 / frame_seconds))
+        if tail:
+            speech = speech[:-tail]
+        print(f"Recording complete ({len(speech) * frame_seconds:.1f}s of speech).")
+        return np.concatenate(speech)
+
+    @traced("asr.transcribe")
     def transcribe_audio(self, audio: np.ndarray) -> str:
         """
         Transcribes the given audio using Whisper.
@@ -45,9 +164,57 @@ class WhisperListener:
         Returns:
             str: Transcribed text.
         """
+        if audio.size == 0:
+            return ""
+        print("Transcribing...")
+        return self.backend.transcribe(audio, self.profile)
+
+    @traced("asr.decode", log=False)
+    def transcribe_words(self, audio: np.ndarray, prompt: str = "") -> List[Word]:
+        """
+        Transcribes audio into timestamped words.
+
+        Args:
+            audio (np.ndarray): The audio to decode.
+            prompt (str): Preceding text, used to keep the transcript consistent.
+
+        Returns:
+            List[Word]: (start, end, word) tuples, times relative to the start of the audio.
+        """
+        if audio.size == 0:
+            return []
+        # Each decode covers a single window; the committed text is passed as the prompt instead
+        return self.backend.transcribe_words(audio, replace(self.profile, condition_on_previous_text=False), prompt)
+
+    @traced("asr.listen_streaming")
+    def listen_streaming(self, on_partial: Optional[Callable[[str, str], None]] = None, step: float = 1.0,
+                         **endpointing) -> str:
+        """
+        Records one utterance and transcribes it while the patient is still talking.
+        Partial hypotheses are emitted as they stabilise, and the final transcript is
+        ready shortly after the patient stops speaking.
+
+        Args:
+            on_partial (Optional[Callable[[str, str], None]]): Called on the decode thread with the
+                partial transcript and its committed prefix.
+            step (float): Seconds of new audio between incremental decodes.
+            **endpointing: Passed on to record_until_silence.
+
+        Returns:
+            str: The final transcript.
+        """
+        transcriber = StreamingTranscriber(self.transcribe_words, self.sampling_rate, step=step, on_partial=on_partial)
+
+        # Partials decode on their own thread, so endpointing never waits for Whisper
+        transcriber.start()
+        try:
+            self.record_until_silence(on_speech=transcriber.insert_audio, **endpointing)
+        except Exception:
+            transcriber.stop()
+            raise
         print("Transcribing...")
-        transcription = self.model.transcribe(audio)
-        return transcription["text"].strip()
+        with span("asr.finalize"):
+            return transcriber.finish()
 
     def start_listening(self, duration=5):
         """
@@ -1,19 +1,96 @@
-from notion_client import Client
+import os
+import json
+import threading
+from notion_client import APIResponseError, Client
 from config import NOTION_KEY, PAGE_ID
 from datetime import datetime
+from tracing import traced
 
 class NotionDB:
-    def __init__(self, database_title="New Database"):
-        self.notion = Client(auth=NOTION_KEY)
+    """
+    Long-lived Notion client for the patient database. Create one per process and share it:
+    the HTTP client is reused, and the database ID is resolved once and persisted in a
+    title-to-ID cache file, so a write costs only the requests of the write itself.
+    Cached IDs are trusted until Notion reports the database missing, then re-resolved.
+    """
+
+    def __init__(self, database_title="New Database", cache_path="notion_ids.json"):
+        """
+        Args:
+            database_title (str): Title of the database under the parent page.
+            cache_path (str): JSON file mapping parent page and title to database ID.
+        """
+        # NOTION_BASE_URL points the client at a local stand-in API for testing
+        self.notion = Client(auth=NOTION_KEY, base_url=os.environ.get("NOTION_BASE_URL", "https://api.notion.com"))
         self.parent_page_id = PAGE_ID
         self.database_title = database_title
-        self.database_id = self.get_or_create_database()
-    def get_or_create_database(self):
-        # Check if database already exists in the parent page
-        children = self.notion.blocks.children.list(self.parent_page_id)['results']
+        self.cache_path = cache_path
+        self._database_id = None
+        self._lock = threading.Lock()
+
+    @property
+    def _cache_key(self):
+        return f"{self.parent_page_id}/{self.database_title}"
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache):
+        # Write-then-rename so a crash never leaves a truncated cache
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    @property
+    def database_id(self):
+        """The database ID: from memory, then the cache file, then looked up (or created) in Notion."""
+        if self._database_id is None:
+            with self._lock:
+                if self._database_id is None:
+                    cache = self._load_cache()
+                    database_id = cache.get(self._cache_key)
+                    if database_id is None:
+                        database_id = self.get_or_create_database()
+                        cache[self._cache_key] = database_id
+                        try:
+                            self._save_cache(cache)
+                        except OSError as e:
+                            print(f"Error saving Notion ID cache: {e}")
+                    self._database_id = database_id
+        return self._database_id
+
+    def forget_database(self):
+        """Drops the cached database ID, e.g. after the database was deleted or moved."""
+        with self._lock:
+            self._database_id = None
+            cache = self._load_cache()
+            if cache.pop(self._cache_key, None) is not None:
+                try:
+                    self._save_cache(cache)
+                except OSError as e:
+                    print(f"Error saving Notion ID cache: {e}")
+
+    def _iter_children(self, block_id):
+        """Yields every child block, following the pagination cursor."""
+        kwargs = {'block_id': block_id, 'page_size': 100}
+        while True:
+            response = self.notion.blocks.children.list(**kwargs)
+            yield from response['results']
+            if not response.get('has_more'):
+                return
+            kwargs['start_cursor'] = response['next_cursor']
 
-        for child in children:
-            if child['object'] == 'block' and child['type'] == 'child_database':
+    @traced("notion.resolve_database")
+    def get_or_create_database(self):
+        # Check if database already exists in the parent page (all pages of children,
+        # or a database beyond the first 100 blocks would be missed and duplicated)
+        for child in self._iter_children(self.parent_page_id):
+            if child['object'] == 'block' and child['type'] == 'child_database' and not child.get('archived'):
                 if child['child_database']['title'] == self.database_title:
                     return child['id']
 
@@ -32,7 +109,47 @@ class NotionDB:
         )
         return database['id']
 
-    def add_entry(self, name, description, date, image_url=None):
+    @traced("notion.add_entry")
+    def add_entry(self, name, description, date, image_url=None, time=None):
+        """
+        Creates a database entry and writes the description (and image) into its body.
+
+        Args:
+            name (str): Patient name.
+            description (str): Summary for the doctor.
+            date (str): Date as YYYY-MM-DD.
+            image_url (Optional[str]): Image to attach.
+            time (Optional[str]): Time as HH:MM:SS. Defaults to now.
+        """
+        page_id = self._create_page(name, description, date, image_url, time)
+        self._append_body(page_id, description, image_url)
+
+    def write_entry(self, entry):
+        """
+        Writes an entry from the write-behind queue. The created page ID is recorded in `entry`,
+        so a retry after a failed body append does not create a second page.
+
+        Args:
+            entry (dict): add_entry keyword arguments, plus 'page_id' once the page exists.
+        """
+        if not entry.get('page_id'):
+            entry['page_id'] = self._create_page(
+                entry['name'], entry['description'], entry['date'], entry.get('image_url'), entry.get('time')
+            )
+        self._append_body(entry['page_id'], entry['description'], entry.get('image_url'))
+
+    def _create_page(self, name, description, date, image_url=None, time=None):
+        try:
+            return self._create_page_in(self.database_id, name, description, date, image_url, time)
+        except APIResponseError as e:
+            if e.code != 'object_not_found':
+                raise
+            # The cached database is gone: resolve it again and retry once
+            print(f"Notion database {self._database_id} not found, resolving it again.")
+            self.forget_database()
+            return self._create_page_in(self.database_id, name, description, date, image_url, time)
+
+    def _create_page_in(self, database_id, name, description, date, image_url=None, time=None):
         properties = {
             'Patient Name': {
                 'title': [
@@ -61,7 +178,7 @@ class NotionDB:
                 'rich_text': [
                     {
                         'text': {
-                            'content': datetime.now().strftime("%H:%M:%S")
+                            'content': time or datetime.now().strftime("%H:%M:%S")
                         }
                     }
                 ]
@@ -81,10 +198,12 @@ class NotionDB:
 
         # Create the page
         new_page = self.notion.pages.create(
-            parent={'database_id': self.database_id},
+            parent={'database_id': database_id},
             properties=properties
         )
+        return new_page['id']
 
+    def _append_body(self, page_id, description, image_url=None):
         # Add content to the body of the new page
         children_blocks = [
             {
@@ -119,7 +238,7 @@ class NotionDB:
             )
 
         self.notion.blocks.children.append(
-            block_id=new_page['id'],
+            block_id=page_id,
             children=children_blocks
         )
 
@@ -1,10 +1,14 @@
 import streamlit as st
+from assistant import warm_up_in_background, readiness
 
 
 
 
 st.set_page_config(layout="wide", initial_sidebar_state="collapsed")
 
+# Load models, the face gallery and API connections while the landing page is shown
+warm_up_in_background()
+
 
 
 
@@ -129,4 +133,22 @@ st.markdown(
 col1, col2, col3, col4, col5 = st.columns([0.1, 0.1, 0.1, 0.1, 0.1])
 with col3:
     if st.button("Talk to me →"):
-        st.switch_page("pages/test.py")
\ No newline at end of file
+        st.switch_page("pages/test.py")
+
+
+@st.fragment(run_every=1.0)
+def show_readiness():
+    """Shows how far the background warm-up has got, refreshing every second."""
+    status = readiness()
+    done = sum(state in ("ready", "warm") for state in status.values())
+    failed = [name for name, state in status.items() if state == "failed"]
+    if failed:
+        st.caption(f"Some components failed to load: {', '.join(failed)}")
+    elif done < len(status):
+        st.caption(f"Getting ready... ({done}/{len(status)})")
+    else:
+        st.caption("Ready")
+
+
+with col3:
+    show_readiness()
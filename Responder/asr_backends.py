@@ -0,0 +1,205 @@
+import numpy as np
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple, Union
+from streaming_asr import Word
+
+SAMPLING_RATE = 16000
+
+
+@dataclass(frozen=True)
+class DecodeProfile:
+    """
+    Named set of decoding options, trading speed against word error rate.
+
+    Attributes:
+        name (str): Profile name.
+        language (Optional[str]): Fixed language code, or None to auto-detect (an extra pass).
+        beam_size (Optional[int]): Beam width, or None for greedy decoding.
+        best_of (Optional[int]): Candidates sampled at non-zero temperature.
+        temperature (Tuple[float, ...]): Temperature schedule. More than one value enables
+            fallback re-decoding when a result looks unreliable.
+        condition_on_previous_text (bool): Feed the previous window's text as a prompt.
+        without_timestamps (bool): Skip timestamp tokens (single-window clips do not need them).
+        trim_silence (bool): Cut leading and trailing silence before decoding.
+        min_duration (float): Clips with less speech than this (seconds) decode to "".
+    """
+    name: str
+    language: Optional[str] = None
+    beam_size: Optional[int] = None
+    best_of: Optional[int] = 5
+    temperature: Tuple[float, ...] = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+    condition_on_previous_text: bool = True
+    without_timestamps: bool = False
+    trim_silence: bool = False
+    min_duration: float = 0.0
+
+
+PROFILES: Dict[str, DecodeProfile] = {
+    # Whisper's stock settings
+    "default": DecodeProfile("default"),
+    # Kiosk answers are short English clips: fixed language, greedy, no fallback
+    "kiosk-fast": DecodeProfile(
+        "kiosk-fast", language="en", beam_size=None, best_of=None, temperature=(0.0,),
+        condition_on_previous_text=False, without_timestamps=True, trim_silence=True, min_duration=0.25
+    ),
+    "accurate": DecodeProfile("accurate", language="en", beam_size=5, best_of=5),
+}
+
+
+def get_profile(profile: Union[str, DecodeProfile]) -> DecodeProfile:
+    """Resolves a profile name to its DecodeProfile."""
+    if isinstance(profile, DecodeProfile):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown decode profile: {profile}. Options: {', '.join(PROFILES)}")
+    return PROFILES[profile]
+
+
+def trim_silence(audio: np.ndarray, frame: int = 480, threshold: float = 0.01) -> Tuple[np.ndarray, float]:
+    """
+    Cuts leading and trailing low-energy frames.
+
+    Returns:
+        Tuple[np.ndarray, float]: The trimmed audio and the seconds cut from the front.
+    """
+    frames = len(audio) // frame
+    if frames == 0:
+        return audio, 0.0
+    energy = np.sqrt(np.mean(np.square(audio[:frames * frame].reshape(frames, frame)), axis=1))
+    voiced = np.flatnonzero(energy > threshold)
+    if voiced.size == 0:
+        return audio[:0], 0.0
+    start = voiced[0] * frame
+    end = min(len(audio), (voiced[-1] + 1) * frame)
+    return audio[start:end], float(start) / SAMPLING_RATE
+
+
+class ASRBackend:
+    """
+    Interface of a speech recognition engine behind WhisperListener.
+    Subclasses implement _decode; clip preparation and profile handling are shared.
+    """
+
+    def transcribe(self, audio: np.ndarray, profile: DecodeProfile, prompt: str = "") -> str:
+        """
+        Transcribes a clip.
+
+        Args:
+            audio (np.ndarray): 16 kHz mono float32 audio.
+            profile (DecodeProfile): Decoding options.
+            prompt (str): Preceding text, used to keep the transcript consistent.
+
+        Returns:
+            str: Transcribed text.
+        """
+        audio, _ = self._prepare(audio, profile)
+        if audio.size == 0:
+            return ""
+        text, _ = self._decode(audio, profile, prompt, word_timestamps=False)
+        return text.strip()
+
+    def transcribe_words(self, audio: np.ndarray, profile: DecodeProfile, prompt: str = "") -> List[Word]:
+        """
+        Transcribes a clip into timestamped words.
+
+        Returns:
+            List[Word]: (start, end, word) tuples, times relative to the start of the given audio.
+        """
+        audio, offset = self._prepare(audio, profile)
+        if audio.size == 0:
+            return []
+        # Word timing needs timestamp tokens
+        _, words = self._decode(audio, replace(profile, without_timestamps=False), prompt, word_timestamps=True)
+        return [(start + offset, end + offset, word) for start, end, word in words]
+
+    def _prepare(self, audio: np.ndarray, profile: DecodeProfile) -> Tuple[np.ndarray, float]:
+        audio = np.asarray(audio, dtype=np.float32).flatten()
+        offset = 0.0
+        if profile.trim_silence:
+            audio, offset = trim_silence(audio)
+        if len(audio) < profile.min_duration * SAMPLING_RATE:
+            return audio[:0], offset
+        return audio, offset
+
+    def _decode(self, audio: np.ndarray, profile: DecodeProfile, prompt: str,
+                word_timestamps: bool) -> Tuple[str, List[Word]]:
+        raise NotImplementedError
+
+
+class WhisperBackend(ASRBackend):
+    """OpenAI Whisper on PyTorch (float32 on CPU)."""
+
+    def __init__(self, model_size: str = "base") -> None:
+        import whisper
+
+        self.model = whisper.load_model(model_size)
+
+    def _decode(self, audio, profile, prompt, word_timestamps):
+        options = {
+            "language": profile.language,
+            "temperature": profile.temperature,
+            "condition_on_previous_text": profile.condition_on_previous_text,
+            "without_timestamps": profile.without_timestamps,
+            "word_timestamps": word_timestamps,
+            "initial_prompt": prompt or None,
+            "fp16": False,
+        }
+        if profile.beam_size:
+            options["beam_size"] = profile.beam_size
+        if profile.best_of and len(profile.temperature) > 1:
+            options["best_of"] = profile.best_of
+        result = self.model.transcribe(audio, **options)
+        words = [(word["start"], word["end"], word["word"])
+                 for segment in result["segments"] for word in segment.get("words", [])]
+        return result["text"], words
+
+
+class FasterWhisperBackend(ASRBackend):
+    """Whisper on CTranslate2 (faster-whisper) with int8-quantized CPU inference."""
+
+    def __init__(self, model_size: str = "base", compute_type: str = "int8", cpu_threads: int = 0) -> None:
+        """
+        Args:
+            model_size (str): Whisper model size.
+            compute_type (str): CTranslate2 weight type, e.g. 'int8', 'int8_float32', 'float32'.
+            cpu_threads (int): Inference threads; 0 uses the CTranslate2 default.
+        """
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+    def _decode(self, audio, profile, prompt, word_timestamps):
+        segments, _ = self.model.transcribe(
+            audio,
+            language=profile.language,
+            beam_size=profile.beam_size or 1,
+            best_of=profile.best_of or 1,
+            temperature=list(profile.temperature),
+            condition_on_previous_text=profile.condition_on_previous_text,
+            without_timestamps=profile.without_timestamps,
+            word_timestamps=word_timestamps,
+            initial_prompt=prompt or None,
+        )
+        segments = list(segments)  # Decoding is lazy; this runs it
+        words = [(word.start, word.end, word.word) for segment in segments for word in (segment.words or [])]
+        return "".join(segment.text for segment in segments), words
+
+
+BACKENDS = {
+    "whisper": WhisperBackend,
+    "faster-whisper": FasterWhisperBackend,
+}
+
+
+def create_backend(name: str, model_size: str = "base", **options) -> ASRBackend:
+    """
+    Builds an ASR backend by name.
+
+    Args:
+        name (str): 'whisper' (PyTorch float32) or 'faster-whisper' (CTranslate2 int8).
+        model_size (str): Whisper model size.
+        **options: Backend-specific options, e.g. compute_type for faster-whisper.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend: {name}. Options: {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_size, **options)
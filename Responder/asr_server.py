@@ -0,0 +1,211 @@
+import time
+import queue
+import itertools
+import threading
+import multiprocessing as mp
+import numpy as np
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+from asr_backends import SAMPLING_RATE, ASRBackend, DecodeProfile, WhisperBackend
+
+WINDOW_SECONDS = 30  # Whisper's fixed encoder window
+
+
+class ASRServerError(Exception):
+    """Raised when the ASR server fails a request or is not running."""
+
+
+def _decode_batch(model, audios: List[np.ndarray], profile: DecodeProfile) -> List[str]:
+    """
+    Decodes several single-window clips in one forward pass: their mel spectrograms are
+    stacked into a batch and decoded together, without temperature fallback.
+    """
+    import torch
+    import whisper
+
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)), model.dims.n_mels)
+        for audio in audios
+    ]).to(model.device)
+    temperature = profile.temperature[0]
+    options = whisper.DecodingOptions(
+        task="transcribe",
+        language=profile.language,
+        temperature=temperature,
+        beam_size=profile.beam_size if temperature == 0 else None,
+        best_of=profile.best_of if temperature > 0 else None,
+        without_timestamps=profile.without_timestamps,
+        fp16=False,
+    )
+    return [result.text for result in whisper.decode(model, mels, options)]
+
+
+def _serve(model_size: str, requests: mp.Queue, responses: mp.Queue, batch_window: float, max_batch: int) -> None:
+    """
+    Server process: loads one model, then decodes requests until it receives None.
+    Plain transcriptions of clips that fit one window and arrive within `batch_window` of
+    each other are batched per decode profile; word-timestamp and prompted requests are
+    decoded one at a time.
+    """
+    backend = WhisperBackend(model_size)
+    responses.put(("ready", None, None))
+    stopping = False
+    while not stopping:
+        batch = [requests.get()]
+        deadline = time.time() + batch_window
+        while batch[-1] is not None and len(batch) < max_batch:
+            try:
+                batch.append(requests.get(timeout=max(0.0, deadline - time.time())))
+            except queue.Empty:
+                break
+        if batch[-1] is None:
+            stopping = True
+            batch.pop()
+
+        groups: Dict[DecodeProfile, List[Tuple[int, np.ndarray]]] = {}
+        for request_id, audio, profile, prompt, word_timestamps in batch:
+            if not word_timestamps and not prompt and len(audio) <= WINDOW_SECONDS * SAMPLING_RATE:
+                groups.setdefault(profile, []).append((request_id, audio))
+                continue
+            try:
+                responses.put((request_id, backend._decode(audio, profile, prompt, word_timestamps), None))
+            except Exception as e:
+                responses.put((request_id, None, f"{type(e).__name__}: {e}"))
+
+        for profile, items in groups.items():
+            try:
+                texts = _decode_batch(backend.model, [audio for _, audio in items], profile)
+                for (request_id, _), text in zip(items, texts):
+                    responses.put((request_id, (text, []), None))
+            except Exception as e:
+                for request_id, _ in items:
+                    responses.put((request_id, None, f"{type(e).__name__}: {e}"))
+
+
+class ASRServer:
+    """
+    Local Whisper inference service. One model copy runs in a separate process and serves
+    every listener and session in the host process over IPC queues, batching clips that
+    arrive close together into one forward pass. Memory stays flat as stations are added,
+    and concurrent requests share decoder passes instead of queueing for one model.
+    """
+
+    def __init__(self, model_size: str = "base", batch_window: float = 0.05, max_batch: int = 8,
+                 start_timeout: float = 300.0) -> None:
+        """
+        Args:
+            model_size (str): Whisper model size.
+            batch_window (float): Seconds the server waits for more clips after the first one.
+            max_batch (int): Largest batch of clips decoded together.
+            start_timeout (float): Seconds to wait for the model to load.
+        """
+        self.model_size = model_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.start_timeout = start_timeout
+        self._ids = itertools.count()
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._process = None
+        self._requests = None
+        self._responses = None
+        self._ready = threading.Event()
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def start(self) -> "ASRServer":
+        """Starts the server process and waits until its model is loaded."""
+        if self._process is not None:
+            return self
+        context = mp.get_context("spawn")  # A fresh interpreter; forking a loaded torch is unsafe
+        self._requests = context.Queue()
+        self._responses = context.Queue()
+        self._process = context.Process(
+            target=_serve, name="asr-server", daemon=True,
+            args=(self.model_size, self._requests, self._responses, self.batch_window, self.max_batch)
+        )
+        self._process.start()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="asr-dispatch", daemon=True)
+        self._dispatcher.start()
+        deadline = time.time() + self.start_timeout
+        while not self._ready.wait(0.5):
+            if not self._process.is_alive() or time.time() > deadline:
+                self.stop()
+                raise ASRServerError("ASR server failed to start")
+        print(f"ASR server ready (pid {self._process.pid})")
+        return self
+
+    def _dispatch(self) -> None:
+        """Routes results from the server process to the waiting callers."""
+        while True:
+            try:
+                request_id, result, error = self._responses.get(timeout=1.0)
+            except queue.Empty:
+                if self._process is None or not self._process.is_alive():
+                    self._fail_pending("ASR server stopped")
+                    return
+                continue
+            except (EOFError, OSError):
+                self._fail_pending("ASR server connection closed")
+                return
+            if request_id == "ready":
+                self._ready.set()
+                continue
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if error:
+                future.set_exception(ASRServerError(error))
+            else:
+                future.set_result(result)
+
+    def _fail_pending(self, reason: str) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(ASRServerError(reason))
+
+    def submit(self, audio: np.ndarray, profile: DecodeProfile, prompt: str = "",
+               word_timestamps: bool = False) -> Future:
+        """
+        Queues a clip for decoding.
+
+        Returns:
+            Future: Resolves to (text, words).
+        """
+        if self._process is None or not self._process.is_alive():
+            raise ASRServerError("ASR server is not running")
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = future
+        self._requests.put((request_id, np.ascontiguousarray(audio, dtype=np.float32), profile, prompt, word_timestamps))
+        return future
+
+    def client(self, timeout: float = 120.0) -> "ASRClient":
+        """Returns an ASR backend that decodes on this server."""
+        return ASRClient(self, timeout)
+
+    def stop(self) -> None:
+        """Stops the server process after the requests already queued."""
+        if self._process is None:
+            return
+        try:
+            self._requests.put(None)
+            self._process.join(10)
+        finally:
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+            self._fail_pending("ASR server stopped")
+
+
+class ASRClient(ASRBackend):
+    """ASR backend that sends clips to a shared ASRServer. Safe to use from many threads."""
+
+    def __init__(self, server: ASRServer, timeout: float = 120.0) -> None:
+        self.server = server
+        self.timeout = timeout
+
+    def _decode(self, audio, profile, prompt, word_timestamps):
+        return self.server.submit(audio, profile, prompt, word_timestamps).result(self.timeout)
@@ -1,43 +1,36 @@
+import io
 import os
-import cv2
 import time
+import importlib
+import threading
 import numpy as np
-import soundfile as sf
-import streamlit as st
-import sounddevice as sd
-from Notion import NotionDB
 from datetime import datetime
-from typing import Optional, Dict
-from langchain_groq import ChatGroq
-from Listener import WhisperListener
-from face_recog import FaceIdentifier
+from typing import Callable, Optional, Dict, Iterator
 from config import GROQ_KEY, AUDIO_DIR,DB_NAME
-from deepgram_call import synthesize_audio
-from langchain.prompts import PromptTemplate
-from langchain.schema import HumanMessage, AIMessage
-from langchain.memory import ConversationBufferWindowMemory
+from deepgram_call import synthesize_audio_bytes, get_tts_engine, TTS_MODEL, TTS_FORMAT
+from tts_cache import TTSCache
+from speech_pipeline import SpeechPipeline
+from conversation_state import ConversationState
+from session_worker import (
+    AudioPlaying, Identified, PartialTranscript, PatientMessage, ResponderMessage, SessionEvent, SummarySaved
+)
+from resources import ResourceRegistry, registry
+from tracing import configure_from_env, session_scope, span, traced, tracer
 
-class FirstResponderAssistant:
-    """
-    A hospital responder system that:
-    1. Detects patient identity through face recognition.
-    2. Collects patient symptoms via natural conversation using LLM.
-    3. Assigns the patient to the appropriate doctor based on symptoms.
-    """
-    def __init__(self) -> None:
-        # Initialize components
-        self.face_identifier = FaceIdentifier()
-        self.listener = WhisperListener(model_size="base")
-        self.llm = self._setup_llm()
-        self.memory = ConversationBufferWindowMemory(k=5)
-        self.current_patient: Optional[str] = None
-        
-        # Audio settings
-        self.sampling_rate = 16000
-        self.audio_duration = 5  # seconds
-        
-        # Initialize prompts
-        self.system_prompt = """You are a professional first responder assisting in an emergency situation. 
+# Heavy dependencies (cv2, whisper/torch, dlib, boto3, langchain, notion_client, audio I/O)
+# are imported on first use, so importing this module is cheap and the landing page can
+# show up while warm_up_in_background() loads them.
+DEFERRED_MODULES = [
+    "cv2", "soundfile", "sounddevice", "face_recognition", "boto3", "face_recog",
+    "langchain_groq", "Listener", "Notion", "notion_queue",
+]
+# The ASR model library depends on the deployment's backend (see _setup_listener)
+ASR_MODULES = {"whisper": ["torch", "whisper"], "faster-whisper": ["faster_whisper"]}
+
+CLOSING_MESSAGE = "Thank you for your time, I will report your symptoms to the doctor."
+
+
+SYSTEM_PROMPT = """You are a professional first responder assisting in an emergency situation. 
         Your responses should be calm, clear, and focused on gathering critical information. 
         Ask one question at a time. 
         Prioritize assessing:
@@ -53,37 +46,390 @@ class FirstResponderAssistant:
         4. If you’ve gathered enough information, close the conversation politely and hand over to the appropriate doctor.
         """
 
-        self.prompt_template = PromptTemplate(
-            input_variables=["history", "input", "patient_name", "question_count"],
-            template=self.system_prompt + """
-            Current conversation:
-            {history}
-            Patient: {input}
-            Important: You have {question_count} questions left. Please ask the most important ones to maximize information.
-            Responder:"""
-        )
-
-    def _setup_llm(self) -> ChatGroq:
-        """Sets up the LLM model for generating responses."""
-        return ChatGroq(
-            temperature=0.3,
-            groq_api_key=GROQ_KEY,
-            model_name="llama-3.3-70b-versatile"
-        )
-    
-    def _delete_file(self, file_path: str) -> None:
-        """Deletes a file if it exists."""
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            
-    def _play_audio(self, filename: str) -> None:
-        """Plays an audio file."""
+
+def questions_left_note(question_count: int) -> str:
+    """Returns the per-turn reminder of how many questions are left."""
+    return (f"Important: You have {question_count} questions left. "
+            "Please ask the most important ones to maximize information.")
+
+
+def greeting(name: str) -> str:
+    """Returns the opening line for a patient."""
+    return f"Hi {name}!, How can I help you today?"
+
+
+# Names of the shared resources the assistant pulls from the registry
+CAMERA = "camera"
+FACE_IDENTIFIER = "face_identifier"
+LISTENER = "listener"
+LLM = "llm"
+TTS_CACHE = "tts_cache"
+NOTION = "notion"
+NOTION_QUEUE = "notion_queue"
+DUPLEX_AUDIO = "duplex_audio"
+
+NOTION_SPOOL = os.path.join("spool", "notion.sqlite3")
+
+
+def _setup_llm():
+    """Sets up the LLM model for generating responses."""
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        temperature=0.3,
+        groq_api_key=GROQ_KEY,
+        model_name="llama-3.3-70b-versatile"
+    )
+
+
+def _setup_camera():
+    """Opens the camera once for the life of the process and keeps it capturing."""
+    from camera_service import CameraService
+
+    return CameraService(0).start()
+
+
+def _setup_face_identifier(resources: ResourceRegistry):
+    from face_recog import FaceIdentifier
+
+    # Newly enrolled patients are picked up without a restart; FACE_SYNC_INTERVAL=0 disables polling
+    identifier = FaceIdentifier(sync_interval=float(os.environ.get("FACE_SYNC_INTERVAL", 60)))
+    # Recognition reads the warm camera's recent frames instead of opening the device per patient.
+    # The camera starts on first use, so its first frame may take as long as recognition would.
+    identifier.camera = lambda: resources.get(CAMERA).reader(timeout=identifier.recognition_timeout)
+    return identifier
+
+
+def _setup_listener():
+    from Listener import WhisperListener
+
+    # The speed/accuracy tradeoff is chosen per deployment, e.g.
+    # ASR_BACKEND=faster-whisper ASR_PROFILE=kiosk-fast on a CPU-only kiosk.
+    # ASR_BACKEND=server decodes in a separate process that batches concurrent clips,
+    # for hosts serving several stations.
+    model_size = os.environ.get("ASR_MODEL", "base")
+    backend = os.environ.get("ASR_BACKEND", "whisper")
+    if backend == "server":
+        from asr_server import ASRServer
+
+        backend = ASRServer(model_size).start().client()
+    return WhisperListener(model_size=model_size, backend=backend, profile=os.environ.get("ASR_PROFILE", "default"))
+
+
+def _close_listener(listener) -> None:
+    server = getattr(listener.backend, "server", None)
+    if server is not None:
+        server.stop()
+
+
+def _setup_duplex_audio():
+    from duplex_audio import DuplexAudio
+
+    # The device is opened on first use, so sessions without barge-in never hold it
+    return DuplexAudio()
+
+
+def _setup_notion():
+    from Notion import NotionDB
+
+    return NotionDB(DB_NAME)
+
+
+def _setup_notion_queue(resources: ResourceRegistry):
+    """Opens the handoff spool and starts writing queued entries (including any left from a previous run)."""
+    from notion_queue import NotionWriteQueue
+
+    return NotionWriteQueue(NOTION_SPOOL, lambda entry: resources.get(NOTION).write_entry(entry)).start()
+
+
+def _warm_listener(listener) -> None:
+    """Runs a dummy decode so the first real transcription does not pay one-off setup costs."""
+    # Low-level noise rather than silence, which profiles that trim silence would skip
+    noise = np.random.default_rng(0).normal(0, 0.05, listener.sampling_rate).astype(np.float32)
+    listener.transcribe_audio(noise)
+
+
+def _warm_llm(llm) -> None:
+    """Opens the connection to Groq with a one-token request."""
+    llm.bind(max_tokens=1).invoke("Hi")
+
+
+def _warm_tts(cache) -> None:
+    """Opens the connection to Deepgram and pre-renders the fixed phrases."""
+    get_tts_engine().warm()
+    cache.warm()
+
+
+def register_resources(resources: ResourceRegistry) -> None:
+    """Registers the heavyweight components shared by every assistant session."""
+    # Warm once the first frame arrives, i.e. after device open and auto-exposure
+    resources.register(CAMERA, _setup_camera, warmup=lambda camera: camera.wait_for_frame(timeout=10),
+                       close=lambda camera: camera.stop())
+    resources.register(
+        FACE_IDENTIFIER, lambda: _setup_face_identifier(resources), close=lambda identifier: identifier.close()
+    )
+    resources.register(LISTENER, _setup_listener, warmup=_warm_listener, close=_close_listener)
+    resources.register(LLM, _setup_llm, warmup=_warm_llm)
+    # Resolving the database ID up front keeps the lookup off the first handoff
+    resources.register(NOTION, _setup_notion, warmup=lambda notion: notion.database_id)
+    resources.register(DUPLEX_AUDIO, _setup_duplex_audio, close=lambda duplex: duplex.stop())
+    resources.register(NOTION_QUEUE, lambda: _setup_notion_queue(resources), close=lambda queue: queue.close())
+    resources.register(
+        TTS_CACHE,
+        lambda: TTSCache(synthesize_audio_bytes, os.path.join(AUDIO_DIR, "tts_cache"), TTS_MODEL, TTS_FORMAT,
+                         fixed_phrases=[CLOSING_MESSAGE, greeting("Unknown")]),
+        warmup=_warm_tts
+    )
+
+
+register_resources(registry)
+# Span log, /metrics endpoint and profiler, if enabled through HEALIA_* environment variables
+configure_from_env()
+
+_warmup_started = False
+_warmup_lock = threading.Lock()
+
+
+def warm_up_in_background(resources: Optional[ResourceRegistry] = None) -> None:
+    """
+    Imports the deferred modules and loads and warms every shared resource in background
+    threads, so the first patient turn is as fast as later ones. Safe to call on every
+    Streamlit rerun; the work only starts once per process.
+    """
+    global _warmup_started
+    resources = resources or registry
+    with _warmup_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+
+    def import_modules():
+        for module in DEFERRED_MODULES + ASR_MODULES.get(os.environ.get("ASR_BACKEND", "whisper"), []):
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                print(f"Error importing {module}: {e}")
+
+    def warm(name):
+        try:
+            resources.warm(name)
+        except Exception as e:
+            print(f"Error warming up {name}: {e}")
+
+    threading.Thread(target=import_modules, name="warmup-imports", daemon=True).start()
+    for name in resources.status():
+        threading.Thread(target=warm, args=(name,), name=f"warmup-{name}", daemon=True).start()
+
+
+def readiness(resources: Optional[ResourceRegistry] = None) -> Dict[str, str]:
+    """Returns the warm-up state of every shared resource."""
+    return (resources or registry).status()
+
+
+class FirstResponderAssistant:
+    """
+    A hospital responder system that:
+    1. Detects patient identity through face recognition.
+    2. Collects patient symptoms via natural conversation using LLM.
+    3. Assigns the patient to the appropriate doctor based on symptoms.
+    """
+    # Service the OpenCV window during recognition; off for sessions sharing one identifier
+    show_windows = True
+
+    def __init__(self, streaming: bool = False, endpointing: bool = True, live_transcription: bool = False,
+                 resources: Optional[ResourceRegistry] = None, play_audio: Optional[Callable[[bytes], None]] = None,
+                 handoff: Optional[Callable[[str, str, str], None]] = None, barge_in: bool = False,
+                 on_event: Optional[Callable[[SessionEvent], None]] = None) -> None:
+        """
+        Creates a patient session. Models, the face gallery and API clients are shared
+        through the resource registry and only loaded by the first session in the process;
+        the conversation state is per session.
+
+        Args:
+            streaming (bool): Stream LLM replies and speak them sentence by sentence as they
+                arrive, instead of waiting for the full reply and the full audio file.
+            endpointing (bool): Record each patient answer from speech onset until a pause
+                (voice activity detection) instead of for a fixed `audio_duration`.
+            live_transcription (bool): Transcribe answers while the patient is still talking and
+                show the partial text on screen. Requires endpointing.
+            resources (Optional[ResourceRegistry]): Where shared components come from. Defaults
+                to the process-wide registry.
+            play_audio (Optional[Callable[[bytes], None]]): Plays WAV audio to the patient and returns
+                when it has finished. Defaults to the sound device.
+            handoff (Optional[Callable[[str, str, str], None]]): Records the doctor handoff from the
+                patient name, summary and date. Defaults to queueing a Notion entry.
+            barge_in (bool): Keep the microphone open while speaking, and stop a response as soon
+                as the patient talks over it; what they said becomes their answer. Uses the
+                full-duplex sound device instead of `play_audio`, and requires endpointing.
+            on_event (Optional[Callable[[SessionEvent], None]]): Receives the session's progress
+                (see session_worker.py), e.g. to update a UI. Called from the session's threads,
+                so it must return quickly.
+        """
+        # Shared components
+        self.resources = resources or registry
+        self.face_identifier = self._component(FACE_IDENTIFIER)
+        self.listener = self._component(LISTENER)
+        self.llm = self._component(LLM)
+        self.tts_cache = self._component(TTS_CACHE)
+        # Pre-render the fixed phrases in the background so startup is not delayed
+        threading.Thread(target=self.resources.warm, args=(TTS_CACHE,), daemon=True).start()
+
+        # Per-session state
+        self.streaming = streaming
+        self.barge_in = barge_in
+        self.duplex = self.resources.get(DUPLEX_AUDIO) if barge_in else None
+        if self.duplex is not None:
+            play_audio = self.duplex.play
+        self._sounddevice_playback = play_audio is None
+        self.on_event = on_event
+        self._cancelled = threading.Event()
+        self.play_audio = traced("audio.playback")(self._announce_playback(play_audio or self._play_audio_bytes))
+        self.handoff = handoff or self._queue_handoff
+        self.speech = SpeechPipeline(self.tts_cache.get, self.play_audio, interrupted=self._interrupted)
+        
+        # Audio settings
+        self.sampling_rate = 16000
+        self.audio_duration = 5  # seconds, fixed-length recording when endpointing is off
+        self.endpointing = endpointing
+        self.live_transcription = live_transcription
+        self.max_answer_duration = 20  # seconds, cap on one answer when endpointing
+        self.trailing_silence = 0.8  # seconds of silence that end an answer
+        self.question_count = 7
+        
+        # Initialize prompts
+        self.system_prompt = SYSTEM_PROMPT
+        self.max_prompt_tokens = 2000
+        self.conversation: Optional[ConversationState] = None
+        self.new_session()
+
+    def _component(self, name: str):
+        """Returns the shared component the session uses for a resource name."""
+        return self.resources.get(name)
+
+    def new_session(self) -> None:
+        """Resets the per-session conversation state for the next patient."""
+        if self.conversation is not None:
+            self.conversation.close()
+        self.conversation = ConversationState(self.llm, self.system_prompt, max_prompt_tokens=self.max_prompt_tokens)
+        self.current_patient: Optional[str] = None
+
+    def _emit(self, event: SessionEvent) -> None:
+        if self.on_event is None:
+            return
         try:
-            data, fs = sf.read(filename)
-            sd.play(data, fs)
-            sd.wait()
+            self.on_event(event)
         except Exception as e:
-            print(f"Error playing audio: {e}")
+            print(f"Error publishing session event: {e}")
+
+    def _announce_playback(self, play: Callable[[bytes], None]) -> Callable[[bytes], None]:
+        def play_and_announce(data: bytes):
+            self._emit(AudioPlaying(True))
+            try:
+                return play(data)
+            finally:
+                self._emit(AudioPlaying(False))
+        return play_and_announce
+
+    def cancel(self) -> None:
+        """
+        Stops the session at its next step: playback and a streamed reply stop right away, an
+        answer being recorded is finished first. What was said so far is still handed off.
+        """
+        self._cancelled.set()
+        if self.duplex is not None:
+            self.duplex.stop_playback()
+        elif self._sounddevice_playback:
+            try:
+                import sounddevice as sd
+
+                sd.stop()  # Also ends the sd.wait() in _play_audio_bytes
+            except Exception as e:
+                print(f"Error stopping playback: {e}")
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def _queue_handoff(self, name: str, summary: str, date: str) -> None:
+        """
+        Queues the doctor handoff for the Notion database. The entry is saved to a local spool
+        and written in the background, so the session ends without waiting for Notion and
+        the summary is kept through Notion outages.
+        """
+        self.resources.get(NOTION_QUEUE).enqueue({
+            "name": name,
+            "description": summary,
+            "date": date,
+            "time": datetime.now().strftime("%H:%M:%S")
+        })
+
+    def _play_audio_bytes(self, data: bytes) -> None:
+        """Plays in-memory WAV audio."""
+        import soundfile as sf
+        import sounddevice as sd
+
+        samples, fs = sf.read(io.BytesIO(data))
+        sd.play(samples, fs)
+        sd.wait()
+
+    def _identify(self):
+        """
+        Identifies the patient in front of the camera.
+
+        Returns:
+            RecognitionResult: The recognised name (or "Unknown") and the last camera frame.
+        """
+        return self.face_identifier.recognize(display=self.show_windows)
+
+    def _interrupted(self) -> bool:
+        """True once the session was cancelled or the patient talked over the current response."""
+        return self.cancelled or (self.duplex is not None and self.duplex.barged_in.is_set())
+
+    def _speak(self, text: str) -> None:
+        """Synthesizes (or fetches from the TTS cache) and plays a complete response."""
+        with span("speak", streaming=self.streaming):
+            if self.streaming:
+                self.speech.speak(text)
+                return
+            data = self.tts_cache.get(text)
+            if data:
+                try:
+                    self.play_audio(data)
+                except Exception as e:
+                    print(f"Error playing audio: {e}")
+
+    @traced("listen")
+    def _listen(self) -> str:
+        """
+        Records and transcribes the patient's answer. With live transcription the partial
+        transcript is published as the patient talks.
+
+        Returns:
+            str: The transcribed answer.
+        """
+        # With barge-in the microphone is the duplex stream, which starts with anything
+        # the patient said over the response
+        input_stream = self.duplex.input_stream if self.duplex is not None else None
+        if self.endpointing and self.live_transcription:
+            return self.listener.listen_streaming(
+                on_partial=lambda text, committed: self._emit(PartialTranscript(text)),
+                max_duration=self.max_answer_duration,
+                trailing_silence=self.trailing_silence,
+                input_stream=input_stream
+            ).strip()
+        if self.endpointing:
+            audio = self.listener.record_until_silence(
+                max_duration=self.max_answer_duration,
+                trailing_silence=self.trailing_silence,
+                input_stream=input_stream
+            )
+        else:
+            audio = self.listener.record_audio(self.audio_duration)
+        return self.listener.transcribe_audio(audio).strip()
+
+    def _format_prompt(self, user_input: str, question_count: int) -> str:
+        """Builds the LLM prompt from the conversation state and the patient's input."""
+        return self.conversation.build_prompt(user_input, suffix=questions_left_note(question_count))
 
     def _get_llm_response(self, user_input: str, question_count: int) -> str:
         """
@@ -96,40 +442,46 @@ class FirstResponderAssistant:
         Returns:
             str: Generated LLM response.
         """
-        history = self.memory.load_memory_variables({}).get("history", "")
-        formatted_prompt = self.prompt_template.format(
-            history=history,
-            input=user_input,
-            patient_name=self.current_patient or "Patient",
-            question_count=question_count
-        )
-        response = self.llm.invoke(formatted_prompt)
+        with span("llm.respond"):
+            response = self.llm.invoke(self._format_prompt(user_input, question_count))
         return response.content
 
-    def summarize(self) -> Optional[str]:
+    def _stream_llm_response(self, user_input: str, question_count: int) -> Iterator[str]:
+        """
+        Streams the LLM response token by token.
+
+        Args:
+            user_input (str): The patient's input.
+            question_count (int): Number of remaining questions.
+
+        Yields:
+            str: Response text chunks as they are generated.
         """
-            Summarizes the given chat history to provide key information for a doctor.
+        start = time.time()
+        first = True
+        for chunk in self.llm.stream(self._format_prompt(user_input, question_count)):
+            if self.cancelled:
+                break
+            if first:
+                tracer.record("llm.first_token", time.time() - start)
+                first = False
+            yield chunk.content
+        tracer.record("llm.stream", time.time() - start)
 
-            Args:
-                chat (Dict[str, str]): A dictionary containing the chat history with key 'history'.
+    def summarize(self) -> Optional[str]:
+        """
+            Returns the summary of the conversation for the doctor. It is updated in the
+            background after every turn, so it is normally ready as soon as the patient stops.
 
             Returns:
-                Optional[str]: A summarized version of the chat, or None if an error occurs.
+                Optional[str]: The summary, or None if there is nothing to summarize or an error occurs.
             """
     
         try:
-            chat_history = self.memory.load_memory_variables({}).get("history", None)
-            if not chat_history:
+            summary = self.conversation.handoff_summary()
+            if not summary:
                 print("No chat history available for summarization.")
-                return None
-
-            prompt = (
-                "Summarize the following patient-agent conversation, highlighting key things:\n\n"
-                f"{chat_history}\n\n"
-                "Summary:"
-            )
-            response = self.llm.invoke(prompt)
-            return response.content.strip()
+            return summary
         
         except Exception as e:
             print(f"Error summarizing chat: {e}")
@@ -141,71 +493,79 @@ class FirstResponderAssistant:
         - Detects face and identifies patient.
         - Collects symptoms and medical details.
         - Generates and plays LLM-generated responses.
+        Every stage is traced under a fresh session ID.
         """
-        print("Starting first responder assistant...")
+        with session_scope() as session, span("session"):
+            print(f"Starting first responder assistant (session {session})...")
+            if self.duplex is not None:
+                self.duplex.reset()
+            self._assistance_flow()
+
+    def _assistance_flow(self) -> None:
         chat = ""
         try:
-            self.current_patient = self.face_identifier.run_recognition()
+            with span("identify"):
+                recognition = self._identify()
+            self.current_patient = recognition.name
             # print(f"Detected patient: {self.current_patient}")
-            messages = st.container(height=300)
-            messages.chat_message("Responder").write(f"Detected patient: {self.current_patient}")
+            self._emit(Identified(self.current_patient, recognition.frame))
             
             # Start the conversation
             print("Starting conversation...")
-            question_count = 7
-            response = f"Hi {self.current_patient}!, How can I help you today?"
+            question_count = self.question_count
+            response = greeting(self.current_patient)
+            spoken = False
 
-            while question_count > 0:
-                # Generate and play audio
+            while question_count > 0 and not self.cancelled:
+                # Generate and play audio (streamed replies were already spoken as they arrived)
                 chat += "Responder: " + response + "\n"
-                audio_file = os.path.join(AUDIO_DIR, f"response_{int(time.time())}.wav")
-                synthesize_audio(response, audio_file)
                 print(f"Responder: {response}")
-                messages.chat_message("Responder").write(f"Responder: {response}")
-                self._play_audio(audio_file)
-                self._delete_file(audio_file)
+                self._emit(ResponderMessage(response))
+                if not spoken:
+                    self._speak(response)
 
                 if "Thank you for your time" in response:
                     break
 
                 # Listen for patient's response
                 print("Listening...")
-                audio = self.listener.record_audio(self.audio_duration)
-                user_input = self.listener.transcribe_audio(audio).strip()
+                user_input = self._listen()
                 chat += "Patient: " + user_input + "\n"
                 print(f"Patient: {user_input}")
-                messages.chat_message("Patient").write(f"Patient: {user_input}")
+                self._emit(PatientMessage(user_input))
 
+                # Save to memory (the summary updates in the background) before anything can end
+                # the session, so the last answer still reaches the handoff
+                self.conversation.add_turn(response, user_input)
+                if self.cancelled:
+                    print("Session cancelled.")
+                    break
                 if "quit" in user_input.lower():
                     print("Conversation terminated by patient.")
                     break
 
-                # Save to memory and generate next question
-                self.memory.save_context(
-                    {"output": response},
-                    {"input": user_input}
-                )
+                # Generate the next question
                 question_count -= 1
-                response = self._get_llm_response(user_input, question_count)
+                if self.streaming and question_count > 0:
+                    # After a barge-in this is only what was played, and the rest is never generated
+                    response = self.speech.speak_stream(self._stream_llm_response(user_input, question_count))
+                    spoken = True
+                else:
+                    response = self._get_llm_response(user_input, question_count)
                 # print(f"Responder: {response}")
             
-            audio_file = os.path.join(AUDIO_DIR, f"final_response.wav")
-            if os.path.exists(audio_file):
-                self._play_audio(audio_file)
-            else:
-                synthesize_audio("Thank you for your time, I will report your symptoms to the doctor.", audio_file)
-                self._play_audio(audio_file)
+            if not self.cancelled:
+                self._speak(CLOSING_MESSAGE)
             
             print("Session complete. Handoff to doctor.")
             
         finally:
-            summary = self.summarize()
-            if summary:
-                notion_obj = NotionDB(DB_NAME)
-                notion_obj.add_entry(
-                    name=self.current_patient,
-                    description=summary, 
-                    date = datetime.now().strftime("%Y-%m-%d")
-                )
-            
-            cv2.destroyAllWindows()
\ No newline at end of file
+            with span("handoff"):
+                summary = self.summarize()
+                if summary:
+                    self.handoff(self.current_patient, summary, datetime.now().strftime("%Y-%m-%d"))
+                    self._emit(SummarySaved(self.current_patient, summary))
+            if self.show_windows:
+                from face_recog import close_windows
+
+                close_windows()
\ No newline at end of file
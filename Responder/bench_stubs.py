@@ -0,0 +1,498 @@
+"""
+Local stand-ins for the devices and services the assistant depends on, used by benchmark.py
+and for exercising the Notion write-behind queue without the real API.
+Every stand-in takes an injected latency so slow-service scenarios can be reproduced.
+"""
+import io
+import os
+import time
+import wave
+import random
+import hashlib
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+
+def _sleep(latency: float, jitter: float = 0.0) -> None:
+    if latency > 0 or jitter > 0:
+        time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+
+def make_wav(samples: np.ndarray, rate: int) -> bytes:
+    """Encodes mono float samples in [-1, 1] as 16-bit PCM WAV."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def read_wav(path: str, rate: int = 16000) -> np.ndarray:
+    """Reads a 16-bit PCM WAV file as mono float32, resampled to `rate`."""
+    with wave.open(path, "rb") as f:
+        channels, source_rate = f.getnchannels(), f.getframerate()
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2").astype(np.float32) / 32768
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if source_rate != rate:
+        positions = np.arange(0, len(samples), source_rate / rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    return samples
+
+
+def wav_duration(data: bytes) -> float:
+    with wave.open(io.BytesIO(data), "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+
+def synthetic_answer(seconds: float = 2.0, rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """
+    Voiced, syllable-like bursts, loud enough to trigger voice activity detection. A stand-in
+    when no recorded answers are given; it measures latency, not transcription quality.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    pitch = 140 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    voice = sum(np.sin(2 * np.pi * k * np.cumsum(pitch) / rate) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+    return (0.1 * voice * envelope + 0.003 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+class RecordedCamera:
+    """
+    cv2.VideoCapture stand-in that replays a video file, a folder of images or a single image,
+    paced at `fps` like a live camera.
+    """
+
+    def __init__(self, source: str, fps: float = 30.0, loop: bool = True) -> None:
+        import cv2
+
+        self.fps = fps
+        self.loop = loop
+        self._capture = None
+        self._frames: List[np.ndarray] = []
+        if os.path.isdir(source):
+            for filename in sorted(os.listdir(source)):
+                frame = cv2.imread(os.path.join(source, filename))
+                if frame is not None:
+                    self._frames.append(frame)
+        else:
+            frame = cv2.imread(source)
+            if frame is not None:
+                self._frames.append(frame)
+            else:
+                self._capture = cv2.VideoCapture(source)
+        self._index = 0
+        self._next_time = time.time()
+
+    def read(self):
+        # Like a camera, a frame is only available every 1/fps seconds
+        delay = self._next_time - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_time = max(self._next_time, time.time()) + 1.0 / self.fps
+
+        if self._capture is not None:
+            ok, frame = self._capture.read()
+            if not ok and self.loop:
+                self._capture.set(1, 0)  # cv2.CAP_PROP_POS_FRAMES
+                ok, frame = self._capture.read()
+            return ok, frame
+        if not self._frames or (self._index >= len(self._frames) and not self.loop):
+            return False, None
+        frame = self._frames[self._index % len(self._frames)]
+        self._index += 1
+        return True, frame.copy()
+
+    def isOpened(self) -> bool:
+        return bool(self._frames) or (self._capture is not None and self._capture.isOpened())
+
+    def release(self) -> None:
+        if self._capture is not None:
+            self._capture.release()
+
+
+class RecordedMicrophone:
+    """
+    Factory with the signature of sd.InputStream. Each stream it opens plays the next answer,
+    in real time, surrounded by silence, to the recording callback.
+    """
+
+    def __init__(self, answers: Sequence[np.ndarray], lead_silence: float = 0.5,
+                 trail_silence: float = 3.0, noise: float = 0.002) -> None:
+        """
+        Args:
+            answers (Sequence[np.ndarray]): 16 kHz mono answers, used in turn and then cycled.
+            lead_silence (float): Seconds before the answer starts (the patient's reaction time).
+            trail_silence (float): Seconds of silence after the answer.
+            noise (float): Background noise level.
+        """
+        self.answers = list(answers)
+        self.lead_silence = lead_silence
+        self.trail_silence = trail_silence
+        self.noise = noise
+        self.count = 0
+        self.speech_ends: List[float] = []  # When each answer finished playing
+
+    def __call__(self, samplerate, channels, dtype, blocksize, callback):
+        answer = self.answers[self.count % len(self.answers)]
+        self.count += 1
+        return _RecordedStream(self, answer, samplerate, blocksize, callback)
+
+
+class _RecordedStream:
+    def __init__(self, microphone: RecordedMicrophone, answer: np.ndarray, rate: int, blocksize: int, callback) -> None:
+        self.microphone = microphone
+        self.rate = rate
+        self.blocksize = blocksize
+        self.callback = callback
+        lead = np.zeros(int(microphone.lead_silence * rate), dtype=np.float32)
+        trail = np.zeros(int(microphone.trail_silence * rate), dtype=np.float32)
+        self.audio = np.concatenate([lead, answer, trail])
+        self.audio += microphone.noise * np.random.default_rng(microphone.count).standard_normal(len(self.audio))
+        self.speech_end = len(lead) + len(answer)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="recorded-microphone", daemon=True)
+
+    def _run(self) -> None:
+        start = time.time()
+        for offset in range(0, len(self.audio) - self.blocksize + 1, self.blocksize):
+            # Blocks are delivered at the rate a real microphone produces them
+            delay = start + (offset + self.blocksize) / self.rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            if self._stop.is_set():
+                return
+            if offset < self.speech_end <= offset + self.blocksize:
+                self.microphone.speech_ends.append(time.time())
+            block = self.audio[offset:offset + self.blocksize].astype(np.float32).reshape(-1, 1)
+            self.callback(block, self.blocksize, None, None)
+        # Keep the recorder fed with silence if it has not endpointed yet
+        while not self._stop.wait(self.blocksize / self.rate):
+            self.callback(np.zeros((self.blocksize, 1), dtype=np.float32), self.blocksize, None, None)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class FakePlayer:
+    """Stand-in for the speaker: records when each clip starts and blocks for its duration."""
+
+    def __init__(self, realtime: bool = True) -> None:
+        self.realtime = realtime
+        self.starts: List[float] = []
+
+    def __call__(self, data: bytes) -> None:
+        self.starts.append(time.time())
+        if self.realtime:
+            time.sleep(wav_duration(data))
+
+
+class _Message:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class FakeChatModel:
+    """
+    ChatGroq stand-in with invoke(), stream() and bind(). Latency is modelled as a time to
+    first token plus a per-token generation delay.
+    """
+
+    QUESTIONS = [
+        "Can you describe the pain, and where exactly you feel it?",
+        "When did the symptoms start, and have they been getting worse?",
+        "Do you have any allergies or take any regular medication?",
+        "Have you had anything like this before?",
+        "On a scale of one to ten, how severe is it right now?",
+        "Are you having any trouble breathing or feeling dizzy?",
+    ]
+
+    def __init__(self, first_token_latency: float = 0.3, token_latency: float = 0.01, jitter: float = 0.0,
+                 turns: Optional[int] = 3) -> None:
+        """
+        Args:
+            first_token_latency (float): Seconds before the first token.
+            token_latency (float): Seconds per further token.
+            jitter (float): Random +/- seconds added to the first-token latency.
+            turns (Optional[int]): Questions asked before the model closes the conversation. None
+                never closes it, for concurrent sessions that end on their own question count.
+        """
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.jitter = jitter
+        self.turns = turns
+        self.calls = 0
+        self.asked = 0
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        """Starts a new conversation."""
+        with self._lock:
+            self.asked = 0
+
+    def bind(self, **kwargs) -> "FakeChatModel":
+        return self
+
+    def _reply(self, prompt: str) -> str:
+        if "running summary" in prompt:
+            return "Patient reports chest pain for two days, worse on exertion, no known allergies."
+        with self._lock:
+            self.calls += 1
+            call, asked = self.calls, self.asked
+            self.asked += 1
+        if self.turns is not None and asked >= self.turns:
+            return "Thank you for your time, I will report your symptoms to the doctor."
+        # The call number keeps replies distinct, so the TTS cache does not hide synthesis latency
+        return f"{self.QUESTIONS[asked % len(self.QUESTIONS)]} ({call})"
+
+    def _tokens(self, text: str) -> List[str]:
+        words = text.split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+    def invoke(self, prompt) -> _Message:
+        text = self._reply(str(prompt))
+        _sleep(self.first_token_latency, self.jitter)
+        time.sleep(self.token_latency * len(self._tokens(text)))
+        return _Message(text)
+
+    def stream(self, prompt) -> Iterator[_Message]:
+        text = self._reply(str(prompt))
+        _sleep(self.first_token_latency, self.jitter)
+        for i, token in enumerate(self._tokens(text)):
+            if i:
+                time.sleep(self.token_latency)
+            yield _Message(token)
+
+
+class FakeS3Client:
+    """S3 client stand-in serving a local folder through list_objects_v2 and get_object."""
+
+    def __init__(self, folder: str, latency: float = 0.05, page_size: int = 1000) -> None:
+        self.folder = folder
+        self.latency = latency
+        self.page_size = page_size
+
+    def list_objects_v2(self, Bucket: str, ContinuationToken: Optional[str] = None, **kwargs) -> dict:
+        _sleep(self.latency)
+        keys = sorted(
+            os.path.relpath(os.path.join(root, name), self.folder).replace(os.sep, "/")
+            for root, _, files in os.walk(self.folder) for name in files
+        )
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + self.page_size]
+        response = {"Contents": [{"Key": key, "ETag": self._etag(key)} for key in page]}
+        if start + self.page_size < len(keys):
+            response["IsTruncated"] = True
+            response["NextContinuationToken"] = str(start + self.page_size)
+        return response
+
+    def _etag(self, key: str) -> str:
+        with open(os.path.join(self.folder, key), "rb") as f:
+            return '"' + hashlib.md5(f.read()).hexdigest() + '"'
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        _sleep(self.latency)
+        with open(os.path.join(self.folder, Key), "rb") as f:
+            return {"Body": io.BytesIO(f.read())}
+
+
+class FakeNotion:
+    """Handoff stand-in for the Notion write: records entries after an injected latency."""
+
+    def __init__(self, latency: float = 0.5) -> None:
+        self.latency = latency
+        self.entries: List[dict] = []
+
+    def __call__(self, name: str, summary: str, date: str) -> None:
+        _sleep(self.latency)
+        self.entries.append({"name": name, "description": summary, "date": date})
+
+
+class DeepgramStub:
+    """
+    Local HTTP server answering the Deepgram speak API with silent 16-bit WAV audio whose
+    length follows the text. Point DEEPGRAM_BASE_URL at `url` to use it.
+    """
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, seconds_per_char: float = 0.06,
+                 rate: int = 24000) -> None:
+        """
+        Args:
+            latency (float): Seconds before each response.
+            jitter (float): Random +/- seconds added to the latency.
+            seconds_per_char (float): Audio length per character of text.
+            rate (int): Sample rate of the returned audio.
+        """
+        stub = self
+        self.latency = latency
+        self.jitter = jitter
+        self.seconds_per_char = seconds_per_char
+        self.rate = rate
+        self.requests = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                self.send_response(200)
+                self.end_headers()
+
+            def do_POST(self):
+                import json
+
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                stub.requests += 1
+                _sleep(stub.latency, stub.jitter)
+                samples = np.zeros(int(len(body.get("text", "")) * stub.seconds_per_char * stub.rate), dtype=np.float32)
+                data = make_wav(samples, stub.rate)
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/wav")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="deepgram-stub", daemon=True)
+
+    def start(self) -> "DeepgramStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class NotionStub:
+    """
+    Local HTTP server implementing the parts of the Notion API that NotionDB uses: listing a
+    page's child blocks (paginated), creating and retrieving databases, creating pages and
+    appending blocks. Point NOTION_BASE_URL at `url` to use it. Latency, rate limiting
+    (every n-th request gets a 429) and outages (`down`) can be injected.
+    """
+
+    def __init__(self, latency: float = 0.1, rate_limit_every: int = 0, retry_after: float = 1.0,
+                 page_size: int = 100) -> None:
+        """
+        Args:
+            latency (float): Seconds before each response.
+            rate_limit_every (int): Answer every n-th request with 429 rate_limited (0: never).
+            retry_after (float): Retry-After seconds sent with a 429.
+            page_size (int): Maximum blocks per page of a child listing.
+        """
+        import json
+        import uuid
+        from urllib.parse import parse_qs, urlparse
+
+        stub = self
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self.down = False
+        self.requests: List[Tuple[str, str]] = []
+        self.children: dict = {}   # block ID -> list of child blocks
+        self.databases: dict = {}  # database ID -> database object
+        self.pages: dict = {}      # page ID -> page object
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _error(self, status, code, message, headers=None):
+                self._reply(status, {"object": "error", "status": status, "code": code, "message": message}, headers)
+
+            def _handle(self, method):
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")[1:]  # Drop the API version
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length)) if length else {}
+                with stub._lock:
+                    stub.requests.append((method, url.path))
+                    count = len(stub.requests)
+                _sleep(stub.latency)
+                if stub.down:
+                    return self._error(503, "service_unavailable", "Notion is unavailable.")
+                if stub.rate_limit_every and count % stub.rate_limit_every == 0:
+                    return self._error(429, "rate_limited", "Rate limited.",
+                                       {"Retry-After": str(stub.retry_after)})
+
+                with stub._lock:
+                    if method == "GET" and parts[0] == "blocks" and parts[2:] == ["children"]:
+                        query = parse_qs(url.query)
+                        blocks = stub.children.get(parts[1], [])
+                        start = int(query.get("start_cursor", ["0"])[0])
+                        size = min(int(query.get("page_size", [stub.page_size])[0]), stub.page_size)
+                        more = start + size < len(blocks)
+                        return self._reply(200, {
+                            "object": "list", "results": blocks[start:start + size],
+                            "has_more": more, "next_cursor": str(start + size) if more else None
+                        })
+                    if method == "PATCH" and parts[0] == "blocks" and parts[2:] == ["children"]:
+                        if parts[1] not in stub.pages:
+                            return self._error(404, "object_not_found", "Page not found.")
+                        stub.children.setdefault(parts[1], []).extend(body.get("children", []))
+                        return self._reply(200, {"object": "list", "results": body.get("children", [])})
+                    if method == "POST" and parts == ["databases"]:
+                        database_id = str(uuid.uuid4())
+                        title = "".join(item["text"]["content"] for item in body.get("title", []))
+                        stub.databases[database_id] = {"object": "database", "id": database_id, "title": body.get("title")}
+                        stub.children.setdefault(body["parent"]["page_id"], []).append({
+                            "object": "block", "id": database_id, "type": "child_database",
+                            "child_database": {"title": title}
+                        })
+                        return self._reply(200, stub.databases[database_id])
+                    if method == "GET" and parts[0] == "databases" and len(parts) == 2:
+                        if parts[1] not in stub.databases:
+                            return self._error(404, "object_not_found", "Database not found.")
+                        return self._reply(200, stub.databases[parts[1]])
+                    if method == "POST" and parts == ["pages"]:
+                        if body["parent"].get("database_id") not in stub.databases:
+                            return self._error(404, "object_not_found", "Database not found.")
+                        page_id = str(uuid.uuid4())
+                        stub.pages[page_id] = {"object": "page", "id": page_id, "properties": body["properties"]}
+                        return self._reply(200, stub.pages[page_id])
+                return self._error(400, "invalid_request_url", f"Unsupported: {method} {url.path}")
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="notion-stub", daemon=True)
+
+    def start(self) -> "NotionStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
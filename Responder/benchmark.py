@@ -0,0 +1,246 @@
+"""
+End-to-end latency benchmark of FirstResponderAssistant.
+
+Replays recorded camera frames and WAV answers instead of the camera and microphone, and
+replaces Groq, Deepgram, Notion and S3 with local stand-ins with injected latency (see
+bench_stubs.py). Face recognition and speech recognition run for real. Reports p50/p95/p99 of:
+
+- time to identity: session start until the patient is recognised,
+- time to first audio: end of the patient's answer until the reply starts playing,
+- session time: session start until the handoff is written.
+
+With --stations N, N stations run concurrently through SessionManager, sharing its
+recognition, ASR, LLM and TTS stages, and --sessions is the number of sessions per station.
+
+Usage:
+    python benchmark.py --sessions 20 --frames known_faces/Dheeraj.png --answers answer1.wav answer2.wav
+    python benchmark.py --streaming --llm-latency 0.8 --tts-latency 0.4 --json results.json
+    python benchmark.py --stations 4 --sessions 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+from typing import Dict, List
+from bench_stubs import (
+    DeepgramStub, FakeChatModel, FakeNotion, FakePlayer, FakeS3Client,
+    RecordedCamera, RecordedMicrophone, read_wav, synthetic_answer
+)
+
+PERCENTILES = (50, 95, 99)
+
+
+def summarize_samples(samples: List[float]) -> Dict[str, float]:
+    """Returns the count, mean and percentiles of a list of durations."""
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples)
+    summary = {"count": len(samples), "mean": float(values.mean())}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = float(np.percentile(values, p))
+    return summary
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark of the assistant.")
+    parser.add_argument("--sessions", type=int, default=10, help="Patient sessions to run (per station with --stations).")
+    parser.add_argument("--stations", type=int, default=0,
+                        help="Run this many stations concurrently through SessionManager.")
+    parser.add_argument("--turns", type=int, default=3, help="Questions the fake LLM asks per session.")
+    parser.add_argument("--faces", default="known_faces", help="Folder served by the fake S3 bucket.")
+    parser.add_argument("--frames", default=None,
+                        help="Video file, image folder or image replayed as the camera. "
+                             "Defaults to the first image in --faces.")
+    parser.add_argument("--fps", type=float, default=15.0, help="Camera frame rate.")
+    parser.add_argument("--answers", nargs="*", default=[], help="16-bit WAV files of patient answers.")
+    parser.add_argument("--reaction-time", type=float, default=0.5, help="Silence before each answer.")
+    parser.add_argument("--streaming", action="store_true", help="Stream LLM replies sentence by sentence.")
+    parser.add_argument("--live-transcription", action="store_true", help="Transcribe while the patient talks.")
+    parser.add_argument("--recognition-mode", default="detect", choices=["detect", "track"])
+    parser.add_argument("--cold-camera", action="store_true",
+                        help="Open the camera for each patient instead of reading the always-on camera service.")
+    parser.add_argument("--model-size", default="base", help="Whisper model size.")
+    parser.add_argument("--asr-backend", default="whisper", help="'whisper' or 'faster-whisper'.")
+    parser.add_argument("--asr-profile", default="default", help="Decode profile.")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="LLM time to first token (s).")
+    parser.add_argument("--llm-token-latency", type=float, default=0.01, help="LLM time per token (s).")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="Deepgram response time (s).")
+    parser.add_argument("--notion-latency", type=float, default=0.5, help="Notion write time (s).")
+    parser.add_argument("--s3-latency", type=float, default=0.05, help="S3 request time (s).")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds on LLM and TTS latency.")
+    parser.add_argument("--no-realtime-playback", action="store_true",
+                        help="Return from playback immediately instead of waiting for the audio length.")
+    parser.add_argument("--json", default=None, help="Write the results to this file.")
+    return parser.parse_args(argv)
+
+
+def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    """Runs the benchmark and returns the latency summaries."""
+    # The TTS engine reads its base URL when it is first used, so the stub must be up first
+    deepgram = DeepgramStub(latency=args.tts_latency, jitter=args.jitter).start()
+    os.environ["DEEPGRAM_BASE_URL"] = deepgram.url
+
+    import assistant
+    from resources import registry
+    from tts_cache import TTSCache
+    from Listener import WhisperListener
+    from face_recog import FaceIdentifier
+    from camera_service import CameraService
+    from deepgram_call import synthesize_audio_bytes, TTS_MODEL, TTS_FORMAT
+
+    workdir = tempfile.mkdtemp(prefix="healia-bench-")
+    frames = args.frames or os.path.join(args.faces, sorted(os.listdir(args.faces))[0])
+    answers = [read_wav(path) for path in args.answers] or [synthetic_answer(seed=i) for i in range(3)]
+    microphone = RecordedMicrophone(answers, lead_silence=args.reaction_time)
+    player = FakePlayer(realtime=not args.no_realtime_playback)
+    notion = FakeNotion(latency=args.notion_latency)
+    # Concurrent sessions share the model, so with stations the session's question count ends it
+    llm = FakeChatModel(args.llm_latency, args.llm_token_latency, jitter=args.jitter,
+                        turns=None if args.stations else args.turns)
+
+    print("Setting up resources...")
+    registry.override(assistant.LLM, llm)
+    registry.override(assistant.TTS_CACHE, TTSCache(
+        synthesize_audio_bytes, os.path.join(workdir, "tts_cache"), TTS_MODEL, TTS_FORMAT
+    ))
+    listener = WhisperListener(
+        model_size=args.model_size, backend=args.asr_backend, profile=args.asr_profile, input_stream=microphone
+    )
+    assistant._warm_listener(listener)
+    registry.override(assistant.LISTENER, listener)
+    camera = lambda: RecordedCamera(frames, fps=args.fps)
+    camera_service = None
+    if not args.cold_camera:
+        camera_service = CameraService(camera).start()
+        camera_service.wait_for_frame(timeout=10)
+        registry.override(assistant.CAMERA, camera_service)
+        camera = camera_service.reader
+    identifier = FaceIdentifier(
+        known_faces_folder=args.faces,
+        gallery_dir=os.path.join(workdir, "gallery"),
+        recognition_mode=args.recognition_mode,
+        s3_client=FakeS3Client(args.faces, latency=args.s3_latency),
+        camera=camera
+    )
+    registry.override(assistant.FACE_IDENTIFIER, identifier)
+
+    if args.stations:
+        results = run_stations(args, frames, answers, camera_service)
+        deepgram.stop()
+        if camera_service is not None:
+            camera_service.stop()
+        return results
+
+    # Time to identity is taken when recognition returns
+    recognised_at = []
+    recognize = identifier.recognize
+
+    def timed_recognition(*args, **kwargs):
+        result = recognize(*args, **kwargs)
+        recognised_at.append(time.time())
+        return result
+
+    identifier.recognize = timed_recognition
+
+    identity, first_audio, session = [], [], []
+    for i in range(args.sessions):
+        llm.reset()
+        recognised_at.clear()
+        microphone.speech_ends.clear()
+        player.starts.clear()
+
+        start = time.time()
+        responder = assistant.FirstResponderAssistant(
+            streaming=args.streaming, live_transcription=args.live_transcription,
+            play_audio=player, handoff=notion
+        )
+        responder.start_assistance_flow()
+        session.append(time.time() - start)
+
+        if recognised_at:
+            identity.append(recognised_at[0] - start)
+        for end in microphone.speech_ends:
+            replies = [t for t in player.starts if t > end]
+            if replies:
+                first_audio.append(replies[0] - end)
+        print(f"Session {i + 1}/{args.sessions}: {session[-1]:.2f}s")
+
+    deepgram.stop()
+    if camera_service is not None:
+        camera_service.stop()
+    return {
+        "time_to_identity": summarize_samples(identity),
+        "time_to_first_audio": summarize_samples(first_audio),
+        "session_time": summarize_samples(session),
+    }
+
+
+def run_stations(args: argparse.Namespace, frames: str, answers: List[np.ndarray],
+                 camera_service=None) -> Dict[str, Dict[str, float]]:
+    """Runs `args.stations` stations concurrently through SessionManager and returns the latency summaries."""
+    import asyncio
+    from session_manager import SessionManager, Station
+
+    stations, microphones, players = [], [], []
+    for i in range(args.stations):
+        microphone = RecordedMicrophone(answers, lead_silence=args.reaction_time)
+        player = FakePlayer(realtime=not args.no_realtime_playback)
+        if camera_service is not None:
+            camera = camera_service.reader
+        else:
+            camera = lambda: RecordedCamera(frames, fps=args.fps)
+        stations.append(Station(f"station-{i + 1}", camera, microphone, player))
+        microphones.append(microphone)
+        players.append(player)
+
+    manager = SessionManager(max_sessions=args.stations, question_count=args.turns,
+                             handoff=FakeNotion(latency=args.notion_latency))
+    start = time.time()
+    sessions = asyncio.run(manager.serve(stations, sessions_per_station=args.sessions))
+    elapsed = time.time() - start
+
+    first_audio = []
+    for microphone, player in zip(microphones, players):
+        for end in microphone.speech_ends:
+            replies = [t for t in player.starts if t > end]
+            if replies:
+                first_audio.append(replies[0] - end)
+    failed = [session for session in sessions if session.error]
+    print(f"{len(sessions)} sessions at {args.stations} stations in {elapsed:.1f}s "
+          f"({len(sessions) / elapsed * 60:.1f} sessions/min, {len(failed)} failed)")
+    for name, stats in manager.stats()["stages"].items():
+        print(f"  stage {name}: {stats['processed']} requests, {stats['workers']} workers")
+    return {
+        "time_to_identity": summarize_samples(
+            [session.time_to_identity for session in sessions if session.time_to_identity is not None]
+        ),
+        "time_to_first_audio": summarize_samples(first_audio),
+        "session_time": summarize_samples([session.elapsed for session in sessions]),
+    }
+
+
+def report(results: Dict[str, Dict[str, float]]) -> None:
+    """Prints the results as a table, in seconds."""
+    columns = ["count", "mean"] + [f"p{p}" for p in PERCENTILES]
+    print(f"\n{'metric':<22}" + "".join(f"{column:>9}" for column in columns))
+    for metric, summary in results.items():
+        cells = [f"{summary['count']:>9}"] + [
+            f"{summary[column]:>9.3f}" if column in summary else f"{'-':>9}" for column in columns[1:]
+        ]
+        print(f"{metric:<22}" + "".join(cells))
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    results = run(args)
+    report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
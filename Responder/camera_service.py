@@ -0,0 +1,197 @@
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, List, Optional, Tuple
+import numpy as np
+from tracing import span
+
+
+@dataclass(frozen=True)
+class Frame:
+    """
+    A captured frame.
+
+    Attributes:
+        index (int): Sequence number since the service started.
+        timestamp (float): Capture time (time.time()).
+        image (np.ndarray): BGR image. Read-only, as it is shared by every consumer.
+    """
+    index: int
+    timestamp: float
+    image: np.ndarray
+
+
+class CameraService:
+    """
+    Long-lived camera owner. A capture thread keeps the device open and reads frames
+    continuously into a bounded ring buffer of timestamped frames, so consumers never pay
+    device-open and auto-exposure settle time, and recognition can start on frames taken
+    as the patient walked up. Slow consumers always get the newest frame; older frames
+    fall out of the buffer instead of queueing.
+    """
+
+    def __init__(self, source: Any = 0, buffer_size: int = 30, max_age: float = 1.0,
+                 reopen_delay: float = 1.0) -> None:
+        """
+        Args:
+            source (Union[int, str, Callable]): Camera index or video file for cv2.VideoCapture,
+                or a callable returning an object with read() and release().
+            buffer_size (int): Frames kept in the ring buffer.
+            max_age (float): Frames older than this many seconds are treated as stale.
+            reopen_delay (float): Seconds to wait before reopening a device that stopped delivering.
+        """
+        self.source = source
+        self.buffer_size = buffer_size
+        self.max_age = max_age
+        self.reopen_delay = reopen_delay
+        self.captured = 0
+        self._frames: Deque[Frame] = deque(maxlen=buffer_size)
+        self._new_frame = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "CameraService":
+        """Starts the capture thread."""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="camera", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops capturing and releases the device."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self._new_frame:
+            self._new_frame.notify_all()
+
+    def _open(self):
+        import cv2
+
+        with span("camera.open"):
+            return self.source() if callable(self.source) else cv2.VideoCapture(self.source)
+
+    def _run(self) -> None:
+        capture = None
+        while not self._stop.is_set():
+            if capture is None:
+                try:
+                    capture = self._open()
+                except Exception as e:
+                    print(f"Error opening camera: {e}")
+                    self._stop.wait(self.reopen_delay)
+                    continue
+            try:
+                ok, image = capture.read()
+            except Exception as e:
+                print(f"Error reading camera: {e}")
+                ok, image = False, None
+            if not ok:
+                # Unplugged, busy or at the end of a video file: start over
+                capture.release()
+                capture = None
+                self._stop.wait(self.reopen_delay)
+                continue
+            image.flags.writeable = False
+            with self._new_frame:
+                self._frames.append(Frame(self.captured, time.time(), image))
+                self.captured += 1
+                self._new_frame.notify_all()
+        if capture is not None:
+            capture.release()
+
+    def latest_frames(self, count: Optional[int] = None, max_age: Optional[float] = None) -> List[Frame]:
+        """
+        Returns the newest buffered frames that are not stale, oldest first.
+
+        Args:
+            count (Optional[int]): Most frames to return. Defaults to the whole buffer.
+            max_age (Optional[float]): Staleness limit in seconds. Defaults to the service's.
+        """
+        cutoff = time.time() - (self.max_age if max_age is None else max_age)
+        with self._new_frame:
+            frames = [frame for frame in self._frames if frame.timestamp >= cutoff]
+        return frames[-count:] if count else frames
+
+    def latest(self, max_age: Optional[float] = None) -> Optional[Frame]:
+        """Returns the newest frame, or None if there is no fresh one."""
+        frames = self.latest_frames(1, max_age)
+        return frames[0] if frames else None
+
+    def wait_for_frame(self, after: int = -1, timeout: Optional[float] = None) -> Optional[Frame]:
+        """
+        Waits for a fresh frame newer than the given index.
+
+        Args:
+            after (int): Index of the last frame the caller has seen.
+            timeout (Optional[float]): Seconds to wait. Defaults to the staleness limit.
+
+        Returns:
+            Optional[Frame]: The newest such frame, or None on timeout.
+        """
+        deadline = time.time() + (self.max_age if timeout is None else timeout)
+        with self._new_frame:
+            while not self._stop.is_set():
+                if self._frames and self._frames[-1].index > after and \
+                        self._frames[-1].timestamp >= time.time() - self.max_age:
+                    return self._frames[-1]
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._new_frame.wait(remaining)
+        return None
+
+    def reader(self, history: int = 3, timeout: float = 5.0) -> "FrameReader":
+        """
+        Returns a capture-like reader over the service, e.g. as FaceIdentifier's camera:
+        `FaceIdentifier(camera=service.reader)`.
+
+        Args:
+            history (int): Buffered frames from the last `max_age` seconds to replay before live ones.
+            timeout (float): Seconds read() waits for a new frame before failing, covering a
+                device that is still opening or being reopened.
+        """
+        return FrameReader(self, history, timeout)
+
+
+class FrameReader:
+    """
+    cv2.VideoCapture-compatible view of a CameraService. read() first returns a few
+    recently buffered frames, then always the newest frame not returned yet, skipping any
+    captured while the caller was busy. Like VideoCapture, read() blocks until a frame
+    arrives, up to `timeout` seconds, so a slow open or a reopen does not end the read loop.
+    Releasing it leaves the camera running.
+    """
+
+    def __init__(self, service: CameraService, history: int = 3, timeout: float = 5.0) -> None:
+        self.service = service
+        self.timeout = timeout
+        self._last = -1
+        buffered = service.latest_frames()
+        if history and buffered:
+            # Spread the replayed frames over the buffered window, ending with the newest
+            picks = np.linspace(0, len(buffered) - 1, min(history, len(buffered))).round().astype(int)
+            self._backlog = [buffered[i] for i in sorted(set(picks))]
+        else:
+            self._backlog = []
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._backlog:
+            frame = self._backlog.pop(0)
+        else:
+            frame = self.service.wait_for_frame(self._last, timeout=self.timeout)
+            if frame is None:
+                return False, None
+        self._last = frame.index
+        # Consumers draw on the frame, so they get their own copy
+        return True, frame.image.copy()
+
+    def isOpened(self) -> bool:
+        return self.service._thread is not None
+
+    def release(self) -> None:
+        self._backlog = []
@@ -0,0 +1,172 @@
+import time
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from tracing import span
+
+Turn = Tuple[str, str]  # (responder, patient)
+
+SUMMARY_PROMPT = """You keep a running summary of a conversation between a first responder and a patient, for the doctor who takes over.
+Keep every symptom, its onset and severity, relevant medical history, medications, allergies and urgent needs. Drop small talk.
+
+Current summary:
+{summary}
+
+New exchange:
+{turns}
+
+Updated summary (under {words} words):"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)."""
+    return (len(text) + 3) // 4
+
+
+def format_turns(turns: List[Turn]) -> str:
+    return "\n".join(f"Responder: {responder}\nPatient: {patient}" for responder, patient in turns)
+
+
+class ConversationState:
+    """
+    Per-session conversation memory with a bounded prompt.
+    Keeps the last few turns verbatim and folds every turn into a rolling summary in the
+    background, one small LLM call per turn, so each prompt stays within a token budget
+    however long the conversation runs, and the doctor handoff summary is already written
+    when the conversation ends.
+    """
+
+    def __init__(self, llm, system_prefix: str, max_prompt_tokens: int = 2000, recent_turns: int = 3,
+                 summary_words: int = 150, count_tokens: Callable[[str], int] = estimate_tokens) -> None:
+        """
+        Initializes the state.
+
+        Args:
+            llm: Chat model used for the summary updates (anything with invoke()).
+            system_prefix (str): Static start of every prompt. It is rendered once and sent
+                byte-identical each turn, so provider-side prompt caching can reuse it.
+            max_prompt_tokens (int): Token budget of an assembled prompt.
+            recent_turns (int): Turns always kept verbatim.
+            summary_words (int): Target length of the rolling summary.
+            count_tokens (Callable[[str], int]): Token counter.
+        """
+        self.llm = llm
+        self.system_prefix = system_prefix
+        self.max_prompt_tokens = max_prompt_tokens
+        self.recent_turns = recent_turns
+        self.summary_words = summary_words
+        self.count_tokens = count_tokens
+        self._prefix_tokens = count_tokens(system_prefix)
+
+        self.turns: List[Turn] = []
+        self.summary = ""
+        self.summarized = 0  # Number of turns folded into the summary
+        self._lock = threading.Lock()
+        self._updating = threading.Lock()  # Held for a whole update, so updates never overlap
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary")
+        self._pending: Optional[Future] = None
+
+    def add_turn(self, responder: str, patient: str) -> None:
+        """Records a completed exchange and schedules the summary update in the background."""
+        with self._lock:
+            self.turns.append((responder, patient))
+            # Updates run one at a time, in order; each folds in every turn not yet summarized
+            self._pending = self._executor.submit(contextvars.copy_context().run, self._update_summary)
+
+    def _update_summary(self, timeout: float = -1) -> None:
+        # Each update starts from the summary the previous one wrote, so a later update
+        # running alongside an earlier one would overwrite it
+        if not self._updating.acquire(timeout=timeout):
+            print("Conversation summary update still running; keeping the summary so far")
+            return
+        try:
+            self._fold_turns()
+        finally:
+            self._updating.release()
+
+    def _fold_turns(self) -> None:
+        with self._lock:
+            summary, start, end = self.summary, self.summarized, len(self.turns)
+            turns = self.turns[start:end]
+        if not turns:
+            return
+        try:
+            prompt = SUMMARY_PROMPT.format(
+                summary=summary or "(none yet)", turns=format_turns(turns), words=self.summary_words
+            )
+            with span("llm.summary", turns=len(turns)):
+                updated = self.llm.invoke(prompt).content.strip()
+        except Exception as e:
+            # The turns stay unsummarized and are folded in by the next update
+            print(f"Error updating conversation summary: {e}")
+            return
+        with self._lock:
+            self.summary = updated
+            self.summarized = end
+
+    def build_prompt(self, user_input: str, suffix: str = "") -> str:
+        """
+        Assembles a prompt within the token budget: the cached prefix, the summary, as many
+        recent verbatim turns as fit (newest first, always including turns the summary does
+        not cover yet when possible), the patient's input and a per-turn suffix.
+
+        Args:
+            user_input (str): The patient's latest answer.
+            suffix (str): Per-turn instructions placed after the input, e.g. questions left.
+
+        Returns:
+            str: The prompt.
+        """
+        with self._lock:
+            summary, summarized, turns = self.summary, self.summarized, list(self.turns)
+
+        tail = f"\nPatient: {user_input}\n{suffix}\nResponder:"
+        budget = self.max_prompt_tokens - self._prefix_tokens - self.count_tokens(tail)
+        sections = []
+        if summary:
+            summary_section = f"\nSummary of the conversation so far:\n{summary}\n"
+            budget -= self.count_tokens(summary_section)
+            sections.append(summary_section)
+
+        first = min(summarized, max(0, len(turns) - self.recent_turns))
+        kept = []
+        for turn in reversed(turns[first:]):
+            text = format_turns([turn])
+            cost = self.count_tokens(text) + 1
+            if cost > budget:
+                break
+            kept.insert(0, text)
+            budget -= cost
+        if kept:
+            sections.append("\nCurrent conversation:\n" + "\n".join(kept))
+        return self.system_prefix + "".join(sections) + tail
+
+    def handoff_summary(self, timeout: Optional[float] = 30.0) -> Optional[str]:
+        """
+        Returns the summary of the whole conversation for the doctor. Normally it is already
+        up to date; otherwise this waits for the in-flight update and folds in any turns a
+        failed update left behind.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for the in-flight update and the final one.
+
+        Returns:
+            Optional[str]: The summary, or None if nothing was said or summarization failed.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            pending = self._pending
+        if pending is not None:
+            try:
+                pending.result(timeout=timeout)
+            except Exception as e:
+                print(f"Error waiting for conversation summary: {e}")
+        if self.summarized < len(self.turns):
+            # Runs after an update that is still in flight, within what is left of the timeout
+            self._update_summary(-1 if deadline is None else max(0.0, deadline - time.time()))
+        return self.summary or None
+
+    def close(self) -> None:
+        """Stops the background summarizer without waiting for it."""
+        self._executor.shutdown(wait=False)
@@ -1,11 +1,18 @@
 import os
 import re
+import threading
 # from dotenv import load_dotenv 
 from config import DEEPGRAM_KEY  
 from typing import List, Optional
-from deepgram import DeepgramClient, SpeakOptions
+from tracing import traced
 # load_dotenv()
 
+TTS_MODEL = "aura-asteria-en"
+TTS_FORMAT = "linear16/wav"  # Encoding and container of synthesize_audio_bytes output
+
+_engine = None
+_engine_lock = threading.Lock()
+
 def segmentTextBySentence(text:str) -> List[str]:
     """
     Splits the given text into a list of sentences.
@@ -18,6 +25,23 @@ def segmentTextBySentence(text:str) -> List[str]:
     """
     return re.findall(r"[^.!?]+[.!?]", text)
 
+def get_tts_engine():
+    """
+    Returns the process-wide TTSEngine, creating it on first use.
+    Set DEEPGRAM_BASE_URL to point it at a local stand-in server.
+    """
+    from tts_engine import TTSEngine
+
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = TTSEngine(
+                DEEPGRAM_KEY, TTS_MODEL, TTS_FORMAT,
+                base_url=os.environ.get("DEEPGRAM_BASE_URL", "https://api.deepgram.com")
+            )
+        return _engine
+
+@traced("tts.synthesize_file")
 def synthesize_audio(prompt:str, filename:str) -> Optional[dict]:
     """
     Converts the given text prompt into speech and saves it as an audio file.
@@ -27,21 +51,28 @@ def synthesize_audio(prompt:str, filename:str) -> Optional[dict]:
         filename (str): The output file path.
 
     Returns:
-        Optional[dict]: API response if successful, None otherwise.
+        Optional[dict]: The file name and content length if successful, None otherwise.
+    """
+    data = synthesize_audio_bytes(prompt)
+    if data is None:
+        return None
+    with open(filename, "wb") as f:
+        f.write(data)
+    return {"filename": filename, "content_length": len(data)}
+
+@traced("tts.synthesize")
+def synthesize_audio_bytes(prompt:str) -> Optional[bytes]:
+    """
+    Converts the given text prompt into speech without touching the disk.
+
+    Args:
+        prompt (str): The text to synthesize.
+
+    Returns:
+        Optional[bytes]: WAV file contents if successful, None otherwise.
     """
     try:
-        
-        deepgram = DeepgramClient(DEEPGRAM_KEY)
-        options = SpeakOptions(
-            model="aura-asteria-en",
-        )
-        SPEAK_OPTIONS = {"text": prompt}
-
-        response = deepgram.speak.rest.v("1").save(filename, SPEAK_OPTIONS, options)
-        # print(response.to_json(indent=4))
-        return response
-    
+        return get_tts_engine().synthesize(prompt)
     except Exception as e:
         print(f"Error in audio synthesis: {e}")
-        print(e)
-    
+        return None
@@ -0,0 +1,241 @@
+import io
+import queue
+import threading
+import numpy as np
+from collections import deque
+from typing import Callable, List, Optional
+from vad import EchoAwareVAD
+from tracing import tracer
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+    """Linearly resamples mono audio; good enough for speech playback."""
+    if rate == target_rate or samples.size == 0:
+        return samples.astype(np.float32)
+    positions = np.arange(int(len(samples) * target_rate / rate)) * rate / target_rate
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+class DuplexAudio:
+    """
+    Full-duplex audio engine for barge-in. One input/output stream stays open: playback
+    is fed through the output side while every microphone frame is checked by an
+    echo-aware VAD. When the patient starts talking over a response, playback stops at
+    once and the speech is captured, including a short pre-roll; the next listener that
+    opens the microphone through input_stream() receives that audio first, followed by
+    the live microphone, so nothing the patient said is lost.
+    """
+
+    def __init__(self, sampling_rate: int = 16000, frame_ms: int = 30, stream: Optional[Callable] = None,
+                 vad: Optional[EchoAwareVAD] = None, min_speech: float = 0.25, pre_roll: float = 0.3,
+                 max_capture: float = 20.0) -> None:
+        """
+        Args:
+            sampling_rate (int): Rate of both directions; playback is resampled to it.
+            frame_ms (int): Frame length in milliseconds.
+            stream (Optional[Callable]): Opens the duplex device, with the signature of sd.Stream.
+            vad (Optional[EchoAwareVAD]): Detector for speech during playback.
+            min_speech (float): Seconds of speech over playback that count as barge-in, within a
+                window twice as long so the dips between syllables do not reset it.
+            pre_roll (float): Seconds of audio kept from before the barge-in.
+            max_capture (float): Longest stretch of speech kept while no listener is attached.
+        """
+        self.sampling_rate = sampling_rate
+        self.frame_size = int(sampling_rate * frame_ms / 1000)
+        self.stream_factory = stream
+        self.vad = vad or EchoAwareVAD()
+        frame_seconds = self.frame_size / sampling_rate
+        self.onset_frames = max(1, int(min_speech / frame_seconds))
+        self.max_capture_frames = int(max_capture / frame_seconds)
+        self.barged_in = threading.Event()
+        self.barge_ins = 0
+
+        # Playback state, shared with the audio callback
+        self._lock = threading.Lock()
+        self._playback: Optional[np.ndarray] = None
+        self._position = 0
+        self._done: Optional[threading.Event] = None
+
+        # Microphone routing, owned by the worker thread
+        self._route_lock = threading.Lock()
+        self._consumer: Optional[Callable[[np.ndarray], None]] = None
+        self._pre_roll = deque(maxlen=max(1, int(pre_roll / frame_seconds)))
+        self._captured: Optional[List[np.ndarray]] = None
+        self._recent_speech = deque(maxlen=2 * self.onset_frames)
+
+        self._frames = queue.Queue()
+        self._stream = None
+        self._worker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> "DuplexAudio":
+        """Opens the device. Called on first use."""
+        with self._lock:
+            if self._stream is not None:
+                return self
+            factory = self.stream_factory
+            if factory is None:
+                import sounddevice as sd
+
+                factory = sd.Stream
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="duplex-audio", daemon=True)
+            self._worker.start()
+            self._stream = factory(samplerate=self.sampling_rate, channels=1, dtype=np.float32,
+                                   blocksize=self.frame_size, callback=self._callback)
+            self._stream.start()
+        return self
+
+    def stop(self) -> None:
+        """Closes the device."""
+        with self._lock:
+            stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+        self._stop.set()
+        if self._worker:
+            self._worker.join()
+            self._worker = None
+        self.stop_playback()
+
+    def reset(self) -> None:
+        """Forgets a barge-in nobody listened to, e.g. one during the closing message."""
+        with self._route_lock:
+            self._captured = None
+            self.barged_in.clear()
+
+    def _callback(self, indata, outdata, frames, time_info, status) -> None:
+        out = np.zeros(frames, dtype=np.float32)
+        with self._lock:
+            if self._playback is not None:
+                chunk = self._playback[self._position:self._position + frames]
+                out[:len(chunk)] = chunk
+                self._position += len(chunk)
+                if self._position >= len(self._playback):
+                    self._finish_playback()
+        outdata[:, 0] = out
+        self._frames.put((indata[:, 0].copy(), out))
+
+    def _finish_playback(self) -> None:
+        """Ends the current playback. Called with the playback lock held."""
+        self._playback = None
+        if self._done is not None:
+            self._done.set()
+            self._done = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                frame, reference = self._frames.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._route_lock:
+                if self._consumer is not None:
+                    self._consumer(frame)
+                    continue
+                if self._captured is not None:
+                    if len(self._captured) < self.max_capture_frames:
+                        self._captured.append(frame)
+                    continue
+                self._pre_roll.append(frame)
+                speech = self.vad.is_speech(frame, reference)
+                with self._lock:
+                    playing = self._playback is not None
+                self._recent_speech.append(speech and playing)
+                if sum(self._recent_speech) >= self.onset_frames:
+                    self._barge_in()
+
+    def _barge_in(self) -> None:
+        """Stops playback and starts keeping the patient's speech. Called with the route lock held."""
+        with self._lock:
+            played = self._position / self.sampling_rate
+            self._finish_playback()
+        self._captured = list(self._pre_roll)
+        self._recent_speech.clear()
+        self.barge_ins += 1
+        self.barged_in.set()
+        tracer.record("audio.barge_in", played)
+        print(f"Patient started speaking, stopping playback after {played:.1f}s.")
+
+    def stop_playback(self) -> None:
+        with self._lock:
+            self._finish_playback()
+
+    def play(self, data: bytes) -> bool:
+        """
+        Plays in-memory audio and returns when it has finished or was interrupted.
+        After a barge-in, further playback is skipped until a listener takes the speech.
+
+        Args:
+            data (bytes): Audio file bytes, e.g. WAV.
+
+        Returns:
+            bool: True if it played to the end, False if the patient interrupted it.
+        """
+        import soundfile as sf
+
+        if self.barged_in.is_set():
+            return False
+        samples, rate = sf.read(io.BytesIO(data), dtype="float32")
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        samples = resample(samples, rate, self.sampling_rate)
+        self.start()
+        done = threading.Event()
+        with self._lock:
+            if self._done is not None:
+                self._done.set()
+            self._playback, self._position, self._done = samples, 0, done
+        done.wait(len(samples) / self.sampling_rate + 2.0)
+        if not done.is_set():
+            self.stop_playback()  # The device stopped calling back
+        return not self.barged_in.is_set()
+
+    def input_stream(self, samplerate: int, channels: int = 1, dtype=np.float32, blocksize: int = 0,
+                     callback: Optional[Callable] = None, **kwargs) -> "DuplexInput":
+        """
+        Microphone with the signature of sd.InputStream, e.g. for
+        WhisperListener.record_until_silence(input_stream=duplex.input_stream). Speech captured
+        at a barge-in is delivered first.
+        """
+        if samplerate != self.sampling_rate or channels != 1:
+            raise ValueError(f"Duplex audio records mono at {self.sampling_rate} Hz")
+        return DuplexInput(self, blocksize or self.frame_size, callback)
+
+    def _attach(self, consumer: Callable[[np.ndarray], None]) -> None:
+        self.start()
+        with self._route_lock:
+            for frame in self._captured or []:
+                consumer(frame)
+            self._captured = None
+            self._consumer = consumer
+            self.barged_in.clear()
+
+    def _detach(self) -> None:
+        with self._route_lock:
+            self._consumer = None
+            self._pre_roll.clear()
+
+
+class DuplexInput:
+    """Input stream over DuplexAudio, delivering blocks of the requested size to a callback."""
+
+    def __init__(self, duplex: DuplexAudio, blocksize: int, callback: Callable) -> None:
+        self.duplex = duplex
+        self.blocksize = blocksize
+        self.callback = callback
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def _deliver(self, frame: np.ndarray) -> None:
+        self._pending = np.concatenate([self._pending, frame])
+        while len(self._pending) >= self.blocksize:
+            block, self._pending = self._pending[:self.blocksize], self._pending[self.blocksize:]
+            self.callback(block.reshape(-1, 1), self.blocksize, None, None)
+
+    def __enter__(self) -> "DuplexInput":
+        self.duplex._attach(self._deliver)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.duplex._detach()
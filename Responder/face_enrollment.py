@@ -0,0 +1,145 @@
+import io
+import os
+import time
+import threading
+import multiprocessing
+import numpy as np
+from PIL import Image
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+def name_from_key(key: str) -> str:
+    """Extracts the patient name from an object key (the filename without extension)."""
+    filename = key.split('/')[-1]
+    return os.path.splitext(filename)[0]
+
+
+def decode_image(data: bytes, max_dim: int) -> np.ndarray:
+    """
+    Decodes image bytes to an RGB array, downscaling oversized photos.
+
+    Args:
+        data (bytes): Raw image file contents.
+        max_dim (int): Longest allowed side in pixels. Larger images are shrunk to fit.
+
+    Returns:
+        np.ndarray: (H, W, 3) uint8 RGB image.
+    """
+    image = Image.open(io.BytesIO(data))
+    image.draft('RGB', (max_dim, max_dim))  # Lets JPEG decode straight at a reduced scale
+    image = image.convert('RGB')
+    image.thumbnail((max_dim, max_dim))
+    return np.asarray(image)
+
+
+def encode_face(image: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Computes the face encoding of the first face in the image. Runs in a worker process.
+
+    Returns:
+        Optional[np.ndarray]: The 128-d encoding, or None if no face is found.
+    """
+    import face_recognition
+
+    encodings = face_recognition.face_encodings(image)
+    if len(encodings) > 0:
+        return encodings[0]
+    return None
+
+
+class EnrollmentPipeline:
+    """
+    Streams gallery images through a bounded download thread pool and a
+    face-encoding process pool, so loading a large bucket uses every core.
+    """
+
+    def __init__(self, fetch: Callable[[str], bytes], download_workers: int = 16,
+                 encode_workers: Optional[int] = None, max_image_dim: int = 1024,
+                 report_interval: float = 2.0) -> None:
+        """
+        Initializes the pipeline.
+
+        Args:
+            fetch (Callable[[str], bytes]): Reads one object into memory by key. Called
+                concurrently from the download threads, so it must be thread-safe.
+            download_workers (int): Number of concurrent downloads.
+            encode_workers (Optional[int]): Number of encoding processes. Defaults to the CPU count.
+            max_image_dim (int): Images are downscaled to this longest side before encoding.
+            report_interval (float): Seconds between progress reports.
+        """
+        self.fetch = fetch
+        self.download_workers = download_workers
+        self.encode_workers = encode_workers or os.cpu_count() or 1
+        self.max_image_dim = max_image_dim
+        self.report_interval = report_interval
+
+    def run(self, keys: Iterable[Tuple[str, str]]) -> Dict[str, Tuple[str, str, Optional[np.ndarray]]]:
+        """
+        Downloads and encodes the given objects.
+
+        Args:
+            keys (Iterable[Tuple[str, str]]): (key, etag) pairs. May be a lazy generator
+                (e.g. fed by S3 pagination); work starts as soon as the first key arrives.
+
+        Returns:
+            Dict[str, Tuple[str, str, Optional[np.ndarray]]]: Key -> (etag, name, encoding) for
+                every object that was processed. Failed downloads are left out.
+        """
+        self._results = {}
+        self._lock = threading.Lock()
+        # Bounds the number of images held in memory between download and encoding
+        self._slots = threading.BoundedSemaphore(max(self.download_workers, self.encode_workers) * 2)
+        self._submitted = 0
+        self._done = 0
+        self._start = time.time()
+        self._last_report = self._start
+
+        # Spawned workers: forking while the download threads (and their sockets) are running is unsafe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.encode_workers, mp_context=context) as encoders:
+            with ThreadPoolExecutor(max_workers=self.download_workers) as downloads:
+                for key, etag in keys:
+                    self._slots.acquire()
+                    self._submitted += 1
+                    downloads.submit(self._download, encoders, key, etag)
+
+        if self._done:
+            elapsed = max(time.time() - self._start, 1e-6)
+            print(f"Enrollment: processed {self._done} images in {elapsed:.1f}s ({self._done / elapsed:.1f} img/s)")
+        return self._results
+
+    def _download(self, encoders: ProcessPoolExecutor, key: str, etag: str) -> None:
+        """Fetches one object into memory, decodes it and hands it to the encoding pool."""
+        try:
+            image = decode_image(self.fetch(key), self.max_image_dim)
+            future = encoders.submit(encode_face, image)
+        except Exception as e:
+            print(f"Error downloading image {key}: {e}")
+            self._finish()
+            return
+        future.add_done_callback(lambda f: self._collect(key, etag, f))
+
+    def _collect(self, key: str, etag: str, future) -> None:
+        """Stores the encoding result of one object."""
+        try:
+            encoding = future.result()
+            if encoding is None:
+                print(f"No face found in {key}")
+            with self._lock:
+                self._results[key] = (etag, name_from_key(key), encoding)
+        except Exception as e:
+            print(f"Error processing image {key}: {e}")
+        finally:
+            self._finish()
+
+    def _finish(self) -> None:
+        """Frees a pipeline slot and periodically reports progress."""
+        self._slots.release()
+        with self._lock:
+            self._done += 1
+            now = time.time()
+            if now - self._last_report >= self.report_interval:
+                self._last_report = now
+                rate = self._done / (now - self._start)
+                print(f"Enrollment: {self._done}/{self._submitted} images ({rate:.1f} img/s)")
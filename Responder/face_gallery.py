@@ -0,0 +1,155 @@
+import os
+import json
+import uuid
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+ENCODING_DIM = 128  # dlib face descriptors are 128-d
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+class FaceGallery:
+    """
+    An immutable snapshot of the known-face gallery.
+    Encodings are kept as one contiguous float32 (N, 128) matrix, and the manifest
+    keeps one entry (S3 key, ETag, name) per row of that matrix.
+    """
+
+    def __init__(self, encodings: Optional[np.ndarray] = None, entries: Optional[List[dict]] = None,
+                 skipped: Optional[Dict[str, str]] = None) -> None:
+        """
+        Initializes the gallery.
+
+        Args:
+            encodings (np.ndarray): (N, 128) face encodings, one row per entry.
+            entries (List[dict]): Manifest entries with 'key', 'etag' and 'name'.
+            skipped (Dict[str, str]): Keys (with their ETag) that contained no usable face,
+                so they are not downloaded again until they change.
+        """
+        if encodings is None:
+            encodings = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        self.encodings = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        self.entries = list(entries or [])
+        self.skipped = dict(skipped or {})
+        if len(self.entries) != self.encodings.shape[0]:
+            raise ValueError(f"Gallery has {len(self.entries)} entries but {self.encodings.shape[0]} encodings")
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def names(self) -> List[str]:
+        return [entry["name"] for entry in self.entries]
+
+    def etags(self) -> Dict[str, str]:
+        """Returns the ETag of every key known to the snapshot, including skipped ones."""
+        etags = dict(self.skipped)
+        etags.update({entry["key"]: entry["etag"] for entry in self.entries})
+        return etags
+
+    def diff(self, listing: Dict[str, str]) -> Tuple[List[str], Set[str]]:
+        """
+        Compares the snapshot against a fresh bucket listing.
+
+        Args:
+            listing (Dict[str, str]): Mapping of object key to ETag.
+
+        Returns:
+            Tuple[List[str], Set[str]]: Keys that are new or changed, and keys that were deleted.
+        """
+        known = self.etags()
+        changed = [key for key, etag in listing.items() if known.get(key) != etag]
+        removed = set(known) - set(listing)
+        return changed, removed
+
+    def apply(self, added: Dict[str, Tuple[str, str, Optional[np.ndarray]]],
+              removed: Iterable[str] = ()) -> "FaceGallery":
+        """
+        Builds a new gallery with the given inserts, updates and removals applied.
+
+        Args:
+            added (Dict[str, Tuple[str, str, Optional[np.ndarray]]]): Key -> (etag, name, encoding).
+                An encoding of None records the key as skipped (no face found).
+            removed (Iterable[str]): Keys to drop.
+
+        Returns:
+            FaceGallery: The updated gallery. The current instance is left untouched.
+        """
+        dropped = set(removed) | set(added)
+        keep = [i for i, entry in enumerate(self.entries) if entry["key"] not in dropped]
+        entries = [self.entries[i] for i in keep]
+        rows = [self.encodings[keep]]
+        skipped = {key: etag for key, etag in self.skipped.items() if key not in dropped}
+
+        for key, (etag, name, encoding) in added.items():
+            if encoding is None:
+                skipped[key] = etag
+                continue
+            entries.append({"key": key, "etag": etag, "name": name})
+            rows.append(np.asarray(encoding, dtype=np.float32).reshape(1, ENCODING_DIM))
+
+        return FaceGallery(np.concatenate(rows, axis=0), entries, skipped)
+
+    @classmethod
+    def load(cls, directory: str) -> "FaceGallery":
+        """
+        Loads a snapshot from disk. Returns an empty gallery if there is none or it is unreadable.
+
+        Args:
+            directory (str): Directory holding the manifest and the encodings array.
+        """
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return cls()
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != MANIFEST_VERSION:
+                print("Gallery snapshot version mismatch, ignoring it.")
+                return cls()
+            encodings = np.load(os.path.join(directory, manifest["encodings"]))
+            return cls(encodings, manifest["entries"], manifest.get("skipped"))
+        except Exception as e:
+            print(f"Error loading gallery snapshot, ignoring it: {e}")
+            return cls()
+
+    def save(self, directory: str) -> None:
+        """
+        Persists the snapshot. The encodings go to a fresh file and the manifest is
+        swapped in atomically afterwards, so a crash never leaves a mismatched pair.
+
+        Args:
+            directory (str): Directory to write the manifest and encodings array to.
+        """
+        os.makedirs(directory, exist_ok=True)
+        previous = self._manifest_encodings_file(directory)
+
+        encodings_file = f"encodings-{uuid.uuid4().hex}.npy"
+        np.save(os.path.join(directory, encodings_file), self.encodings)
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "encodings": encodings_file,
+            "entries": self.entries,
+            "skipped": self.skipped,
+        }
+        tmp_path = os.path.join(directory, MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+
+        if previous and previous != encodings_file:
+            try:
+                os.remove(os.path.join(directory, previous))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _manifest_encodings_file(directory: str) -> Optional[str]:
+        """Returns the encodings filename referenced by the current manifest, if any."""
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE), "r") as f:
+                return json.load(f).get("encodings")
+        except Exception:
+            return None
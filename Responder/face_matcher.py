@@ -0,0 +1,171 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+BRUTE_FORCE_LIMIT = 20000  # Above this gallery size "auto" switches to an approximate index
+ANN_CANDIDATES = 16  # Neighbours fetched from an approximate index before exact re-ranking
+
+
+@dataclass
+class MatchResult:
+    """
+    Outcome of matching one face against the gallery.
+
+    Attributes:
+        name (Optional[str]): Matched patient name, or None if the closest face is above tolerance.
+        distance (float): Euclidean distance to the closest gallery face.
+        margin (float): Distance gap between the closest face and the closest face of a
+            *different* person. Small margins mean the match is ambiguous.
+        index (int): Gallery row of the closest face, or -1 if the gallery is empty.
+    """
+    name: Optional[str]
+    distance: float
+    margin: float
+    index: int
+
+
+class FaceMatcher:
+    """
+    Nearest-neighbour matcher over the face gallery.
+    The gallery is held as one float32 (N, 128) matrix and all faces of a frame are
+    matched in one batched distance computation. For very large galleries an
+    approximate index (HNSW via hnswlib, or IVF via faiss) can be built locally.
+    """
+
+    def __init__(self, encodings: np.ndarray, names: Sequence[str], tolerance: float = 0.6,
+                 index: str = "auto") -> None:
+        """
+        Initializes the matcher.
+
+        Args:
+            encodings (np.ndarray): (N, 128) gallery face encodings.
+            names (Sequence[str]): Patient name of each gallery row.
+            tolerance (float): Maximum distance accepted as a match.
+            index (str): 'brute', 'hnsw', 'ivf', or 'auto' (brute force for small galleries,
+                an approximate index above BRUTE_FORCE_LIMIT faces when one is installed).
+        """
+        self.encodings = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, 128)
+        self.names = list(names)
+        self.tolerance = tolerance
+        self._squared_norms = np.einsum("ij,ij->i", self.encodings, self.encodings)
+
+        # Integer identity per row, so the runner-up search can skip rows of the same person
+        label_ids = {}
+        self._labels = np.array([label_ids.setdefault(name, len(label_ids)) for name in self.names], dtype=np.int64)
+
+        self.index_type = self._resolve_index(index)
+        self._index = None
+        if self.index_type == "hnsw":
+            self._index = self._build_hnsw()
+        elif self.index_type == "ivf":
+            self._index = self._build_ivf()
+
+    def __len__(self) -> int:
+        return self.encodings.shape[0]
+
+    def _resolve_index(self, index: str) -> str:
+        """Picks the index type, falling back to brute force when no ANN library is available."""
+        if index == "auto":
+            if len(self) <= BRUTE_FORCE_LIMIT:
+                return "brute"
+            for candidate, module in (("hnsw", "hnswlib"), ("ivf", "faiss")):
+                try:
+                    __import__(module)
+                    return candidate
+                except ImportError:
+                    continue
+            return "brute"
+        if index not in ("brute", "hnsw", "ivf"):
+            raise ValueError(f"Unknown index type: {index}")
+        if index != "brute" and len(self) <= ANN_CANDIDATES:
+            return "brute"  # Too small for an approximate index to be meaningful
+        return index
+
+    def _build_hnsw(self):
+        """Builds an HNSW graph over the gallery."""
+        import hnswlib
+
+        index = hnswlib.Index(space="l2", dim=self.encodings.shape[1])
+        index.init_index(max_elements=len(self), ef_construction=200, M=16)
+        index.add_items(self.encodings, np.arange(len(self)))
+        index.set_ef(max(64, ANN_CANDIDATES))
+        return index
+
+    def _build_ivf(self):
+        """Builds an inverted-file index over the gallery."""
+        import faiss
+
+        dim = self.encodings.shape[1]
+        nlist = max(1, min(int(np.sqrt(len(self))), len(self) // 39))
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        index.train(self.encodings)
+        index.add(self.encodings)
+        index.nprobe = min(nlist, 8)
+        self._quantizer = quantizer  # The index does not own its quantizer, so keep it alive
+        return index
+
+    def _candidates(self, queries: np.ndarray) -> np.ndarray:
+        """Returns (Q, K) candidate gallery rows from the approximate index."""
+        k = min(ANN_CANDIDATES, len(self))
+        if self.index_type == "hnsw":
+            rows, _ = self._index.knn_query(queries, k=k)
+        else:
+            _, rows = self._index.search(queries, k)
+        return rows.astype(np.int64)
+
+    def distances(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Computes the exact distance from every query to every gallery face.
+
+        Args:
+            queries (np.ndarray): (Q, 128) face encodings.
+
+        Returns:
+            np.ndarray: (Q, N) Euclidean distances.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, 128)
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        squared = query_norms[:, None] + self._squared_norms[None, :] - 2.0 * queries @ self.encodings.T
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    def match(self, face_encodings: Sequence[np.ndarray]) -> List[MatchResult]:
+        """
+        Matches every face of a frame against the gallery.
+
+        Args:
+            face_encodings (Sequence[np.ndarray]): Encodings of the faces found in a frame.
+
+        Returns:
+            List[MatchResult]: One result per face, in input order.
+        """
+        if len(face_encodings) == 0:
+            return []
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        if len(self) == 0:
+            return [MatchResult(None, float("inf"), float("inf"), -1) for _ in range(len(queries))]
+
+        if self._index is None:
+            rows = np.broadcast_to(np.arange(len(self)), (len(queries), len(self)))
+            distances = self.distances(queries)
+        else:
+            # Re-rank the approximate candidates with exact distances
+            rows = self._candidates(queries)
+            valid = rows >= 0
+            safe_rows = np.where(valid, rows, 0)
+            distances = np.linalg.norm(self.encodings[safe_rows] - queries[:, None, :], axis=2)
+            distances = np.where(valid, distances, np.inf)
+
+        best = np.argmin(distances, axis=1)
+        query_ids = np.arange(len(queries))
+        best_rows = rows[query_ids, best]
+        best_distances = distances[query_ids, best]
+
+        same_person = self._labels[rows] == self._labels[best_rows][:, None]
+        runner_up = np.where(same_person, np.inf, distances).min(axis=1)
+
+        results = []
+        for row, distance, second in zip(best_rows, best_distances, runner_up):
+            name = self.names[row] if distance <= self.tolerance else None
+            results.append(MatchResult(name, float(distance), float(second - distance), int(row)))
+        return results
@@ -2,106 +2,315 @@ import os
 import cv2
 import numpy as np
 import face_recognition
-import streamlit as st
-from collections import Counter
-import time
+import threading
 import boto3
+from botocore.config import Config
 from botocore.exceptions import NoCredentialsError
+from face_gallery import FaceGallery
+from face_enrollment import EnrollmentPipeline
+from face_matcher import FaceMatcher
+from face_tracking import FaceTracker
+from shared_gallery import SharedGalleryPublisher, SharedGalleryReader
+from recognition_policy import RecognitionPolicy, UNKNOWN
+from tracing import span
 from config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION_NAME
 
+# HighGUI is not thread-safe, and one identifier may serve several stations
+_window_lock = threading.Lock()
+
+
+def _wait_key() -> int:
+    """Services the OpenCV window and returns the key pressed, or -1."""
+    with _window_lock:
+        try:
+            return cv2.waitKey(1) & 0xFF
+        except cv2.error:
+            return -1  # Headless OpenCV build: there are no windows
+
+
+def close_windows() -> None:
+    """Closes the OpenCV windows."""
+    with _window_lock:
+        try:
+            cv2.destroyAllWindows()
+        except cv2.error:
+            pass  # Headless OpenCV build: there are no windows
+
+
 class FaceIdentifier:
-    def __init__(self, known_faces_folder='known_faces'):
-        self.known_face_encodings = []
-        self.known_face_names = []
+    def __init__(self, known_faces_folder='known_faces', gallery_dir='gallery',
+                 download_workers=16, encode_workers=None, tolerance=0.6, match_index='auto',
+                 confidence_threshold=0.8, recognition_timeout=5.0, recognition_mode='detect', detect_every=5,
+                 gallery_source='s3', sync_interval=None, camera=0, s3_client=None, shared_gallery=None):
+        """
+        Args:
+            known_faces_folder (str): Local folder of known face images.
+            gallery_dir (str): Directory of the persisted gallery snapshot.
+            download_workers (int): Concurrent S3 downloads when enrolling.
+            encode_workers (Optional[int]): Face-encoding processes. Defaults to the CPU count.
+            tolerance (float): Maximum face distance accepted as a match.
+            match_index (str): Matcher index type: 'auto', 'brute', 'hnsw' or 'ivf'.
+            confidence_threshold (float): Vote share an identity needs before recognition stops early.
+            recognition_timeout (float): Seconds of camera time before giving up with "Unknown".
+            recognition_mode (str): 'detect' runs detection and encoding on every frame; 'track'
+                detects every `detect_every` frames, tracks faces in between and encodes each
+                track once per detection interval (or sooner when its quality improves). Only
+                new encodings are voted for.
+            detect_every (int): Detection interval in frames for 'track' mode.
+            gallery_source (str): Where enrolled faces come from: 's3' (the bucket), 'folder'
+                (`known_faces_folder`, a local stand-in for the bucket) or 'shared' (the
+                shared gallery published by another identifier, see `shared_gallery`).
+            sync_interval (Optional[float]): If set, polls the source every this many seconds in
+                the background and applies new, changed and deleted faces without a restart.
+            camera (Union[int, str, Callable]): Camera index or video file for cv2.VideoCapture, or
+                a callable returning an object with read() and release() (e.g. recorded frames).
+            s3_client: S3 client to use instead of one built from the AWS settings.
+            shared_gallery (Optional[str]): Directory of a shared, memory-mapped gallery. With the
+                'shared' source the identifier attaches to it read-only, as a recognition worker;
+                with another source it publishes every gallery version there for such workers.
+        """
         self.known_faces_folder = known_faces_folder
+        self.gallery_dir = gallery_dir
         self.bucket_name = 'reponder'
-        self.load_known_faces_from_s3()
+        self.download_workers = download_workers
+        self.encode_workers = encode_workers
+        self.tolerance = tolerance
+        self.match_index = match_index
+        self.confidence_threshold = confidence_threshold
+        self.recognition_timeout = recognition_timeout
+        self.recognition_mode = recognition_mode
+        self.detect_every = detect_every
+        self.gallery_source = gallery_source
+        self.camera = camera
+        self.s3_client = s3_client
+        self._gallery_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._stop_sync = threading.Event()
+        self._sync_thread = None
+        self._shared_reader = None
+        self._publisher = None
+        if gallery_source == 'shared':
+            self._shared_reader = SharedGalleryReader(shared_gallery)
+            self._set_gallery(FaceGallery())
+        else:
+            if shared_gallery:
+                self._publisher = SharedGalleryPublisher(shared_gallery)
+            self._set_gallery(FaceGallery.load(self.gallery_dir))
+        self.load_known_faces()
+        print(f"Loaded {len(self.known_face_names)} known faces")
+        if sync_interval:
+            self.start_sync(sync_interval)
 
+    def _set_gallery(self, gallery):
+        """
+        Makes the given gallery snapshot the one used for recognition. The matcher is built
+        before the swap, and recognition reads `self.matcher` once per frame, so an
+        in-progress recognition never sees a half-applied update.
+        """
+        if self._publisher is not None:
+            self._publisher.publish(gallery.encodings, gallery.names)
+        self._use_encodings(gallery.encodings, gallery.names, gallery)
 
-    def load_known_faces_from_s3(self):
+    def _use_encodings(self, encodings, names, gallery=None):
+        matcher = FaceMatcher(encodings, names, self.tolerance, self.match_index)
+        with self._gallery_lock:
+            self.gallery = gallery
+            self.known_face_encodings = encodings
+            self.known_face_names = names
+            self.matcher = matcher
+
+    def start_sync(self, interval=60.0):
         """
-        Retrieves images from S3, converts them to face encodings, and stores them.
+        Starts polling the gallery source in a background thread.
+
+        Args:
+            interval (float): Seconds between polls.
+        """
+        if self._sync_thread and self._sync_thread.is_alive():
+            return
+        self._stop_sync.clear()
+        self._sync_thread = threading.Thread(target=self._sync_loop, args=(interval,), name="gallery-sync", daemon=True)
+        self._sync_thread.start()
+
+    def stop_sync(self):
+        """Stops the background gallery sync."""
+        self._stop_sync.set()
+        if self._sync_thread:
+            self._sync_thread.join()
+            self._sync_thread = None
+
+    def close(self):
+        """Stops the background sync and detaches from (or withdraws) the shared gallery."""
+        self.stop_sync()
+        if self._shared_reader is not None:
+            self._shared_reader.close()
+        if self._publisher is not None:
+            self._publisher.close()
+
+    def _sync_loop(self, interval):
+        while not self._stop_sync.wait(interval):
+            try:
+                self.load_known_faces()
+            except Exception as e:
+                print(f"Error syncing gallery: {e}")
+
+    def _iter_s3_images(self, s3):
+        """
+        Pages through the bucket and yields every image as soon as its page arrives.
+
+        Yields:
+            Tuple[str, str]: Object key and ETag.
+        """
+        image_extensions = ['.png', '.jpg', '.jpeg']
+        kwargs = {'Bucket': self.bucket_name}
+        while True:
+            response = s3.list_objects_v2(**kwargs)
+            for obj in response.get('Contents', []):
+                key = obj['Key']
+                if any(key.lower().endswith(ext) for ext in image_extensions):
+                    yield key, obj['ETag']
+            if not response.get('IsTruncated'):
+                return
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+    def _iter_local_images(self):
+        """
+        Walks the local known-faces folder. The file's mtime and size stand in for the ETag.
+
+        Yields:
+            Tuple[str, str]: Path relative to the folder, and a change tag.
         """
         image_extensions = ['.png', '.jpg', '.jpeg']
+        for root, _, files in os.walk(self.known_faces_folder):
+            for filename in files:
+                if any(filename.lower().endswith(ext) for ext in image_extensions):
+                    path = os.path.join(root, filename)
+                    stat = os.stat(path)
+                    key = os.path.relpath(path, self.known_faces_folder).replace(os.sep, '/')
+                    yield key, f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def _read_local_image(self, key):
+        with open(os.path.join(self.known_faces_folder, key), 'rb') as f:
+            return f.read()
+
+    def load_known_faces(self):
+        """Syncs the gallery with its configured source."""
+        if self.gallery_source == 'shared':
+            self._refresh_shared_gallery()
+        elif self.gallery_source == 'folder':
+            self._sync_gallery(self._iter_local_images(), self._read_local_image)
+        else:
+            self.load_known_faces_from_s3()
+
+    def _refresh_shared_gallery(self):
+        """Switches to the latest shared gallery version, if a new one was published."""
+        if self._shared_reader.refresh():
+            reader = self._shared_reader
+            self._use_encodings(reader.encodings, reader.names)
+            print(f"Attached to shared gallery generation {reader.generation} ({len(reader.names)} faces)")
+
+    def load_known_faces_from_s3(self):
+        """
+        Syncs the on-disk gallery snapshot with S3 and stores the face encodings.
+        If S3 is unreachable the last snapshot is used as-is.
+        """
         try:
-            s3 = boto3.client(
+            s3 = self.s3_client or boto3.client(
                 's3',
                 aws_access_key_id=AWS_ACCESS_KEY_ID,
                 aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-                region_name=AWS_REGION_NAME
+                region_name=AWS_REGION_NAME,
+                config=Config(max_pool_connections=self.download_workers)
+            )
+            self._sync_gallery(
+                self._iter_s3_images(s3),
+                lambda key: s3.get_object(Bucket=self.bucket_name, Key=key)['Body'].read()
             )
-            response = s3.list_objects_v2(Bucket=self.bucket_name)
-            print("Response:", response)
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    key = obj['Key']
-                    if any(key.lower().endswith(ext) for ext in image_extensions):
-                        try:
-                            # Download the image from S3 to memory
-                            local_file_path = os.path.join('known_faces',key)
-                            image_object = s3.download_file(self.bucket_name, key, local_file_path)
-                            # image_content = image_object['Body'].read()
-
-                            # Load image from memory
-                            image = face_recognition.load_image_file(local_file_path)
-                            encoding = face_recognition.face_encodings(image)
-
-                            if len(encoding) > 0:
-                                self.known_face_encodings.append(encoding[0])
-                                # Extract name from the key (filename)
-                                filename = key.split('/')[-1]  # Get the filename part
-                                name = os.path.splitext(filename)[0]
-                                self.known_face_names.append(name)
-                            else:
-                                print(f"No face found in {key}")
-                        except Exception as e:
-                            print(f"Error processing image {key}: {e}")
-
-            # Handle paginated results
-            while response['IsTruncated']:
-                continuation_token = response['NextContinuationToken']
-                response = s3.list_objects_v2(Bucket=self.bucket_name, Prefix=self.prefix, ContinuationToken=continuation_token)
-                if 'Contents' in response:
-                    for obj in response['Contents']:
-                        key = obj['Key']
-                        if any(key.lower().endswith(ext) for ext in image_extensions):
-                            try:
-                                local_file_path = os.path.join('known_faces',key)
-                                # Download the image from S3 to memory
-                                image_object = s3.download_file(self.bucket_name, key, local_file_path)
-                                # image_content = image_object['Body'].read()
-
-                                # Load image from memory
-                                image = face_recognition.load_image_file(local_file_path)
-                                encoding = face_recognition.face_encodings(image)
-
-                                if len(encoding) > 0:
-                                    self.known_face_encodings.append(encoding[0])
-                                    # Extract name from the key (filename)
-                                    filename = key.split('/')[-1]  # Get the filename part
-                                    name = os.path.splitext(filename)[0]
-                                    self.known_face_names.append(name)
-                                else:
-                                    print(f"No face found in {key}")
-                            except Exception as e:
-                                print(f"Error processing image {key}: {e}")
-
-            print(f"Loaded {len(self.known_face_names)} known faces from S3")
-
         except NoCredentialsError:
             print("Error: AWS credentials not found. Please configure your AWS credentials.")
         except Exception as e:
-            print(f"An error occurred while accessing S3: {e.__traceback__}")
+            print(f"An error occurred while accessing S3: {e}")
 
+    def _sync_gallery(self, images, fetch):
+        """
+        Applies the difference between the gallery and a source listing.
+        Only new or changed objects (by ETag) are fetched and encoded, and deleted
+        objects are dropped. The result is swapped in atomically and persisted.
 
-    def run_recognition(self):
-        """Runs face recognition for 10 seconds and returns the most frequent match"""
-        video_capture = cv2.VideoCapture(0)
-        start_time = time.time()
-        detected_names = []
+        Args:
+            images (Iterable[Tuple[str, str]]): (key, etag) listing of the source.
+            fetch (Callable[[str], bytes]): Reads one object into memory by key.
+        """
+        with self._sync_lock, span("gallery.sync") as sync_span:
+            gallery = self.gallery
+            known = gallery.etags()
+            listing = {}
+
+            def changed_keys():
+                for key, etag in images:
+                    listing[key] = etag
+                    if known.get(key) != etag:
+                        yield key, etag
 
-        while time.time() - start_time < 5:  # Run for 10 seconds
-            ret, frame = video_capture.read()
+            pipeline = EnrollmentPipeline(
+                fetch,
+                download_workers=self.download_workers,
+                encode_workers=self.encode_workers
+            )
+            added = pipeline.run(changed_keys())
+            removed = set(known) - set(listing)
+
+            sync_span.set(listed=len(listing), added=len(added), removed=len(removed))
+            if added or removed:
+                print(f"Gallery update: {len(added)} new/changed, {len(removed)} deleted")
+                self._set_gallery(gallery.apply(added, removed))
+                self.gallery.save(self.gallery_dir)
+
+
+    def recognize(self, policy=None, camera=None, display=True):
+        """
+        Runs face recognition until one identity is confident enough or the policy times out.
+
+        Args:
+            policy (Optional[RecognitionPolicy]): Voting policy. Defaults to the identifier's own.
+            camera (Optional[Union[int, str, Callable]]): Camera to read, for identifiers shared by
+                several stations. Defaults to the identifier's own.
+            display (bool): Service the OpenCV window ('q' stops recognition). Identifiers shared by
+                several stations pass False; window calls are serialised either way.
+
+        Returns:
+            RecognitionResult: The decision, its confidence and the number of frames used.
+        """
+        policy = policy or RecognitionPolicy(
+            tolerance=self.tolerance,
+            confidence_threshold=self.confidence_threshold,
+            timeout=self.recognition_timeout
+        )
+        if self._shared_reader is not None:
+            self._refresh_shared_gallery()  # Reads one small file unless a new version was published
+        tracker = None
+        if self.recognition_mode == 'track':
+            tracker = FaceTracker(lambda encodings: self.matcher.match(encodings), detect_every=self.detect_every,
+                                  reencode_every=self.detect_every)
+        with span("face.recognize") as recognize_span:
+            result = self._recognize_frames(policy, tracker, self.camera if camera is None else camera, display)
+            recognize_span.set(recognised=result.name != UNKNOWN, confidence=round(result.confidence, 3),
+                               frames=result.frames_used)
+        print(f"Recognised {result.name} (confidence {result.confidence:.2f}) "
+              f"from {result.frames_used} frames in {result.elapsed:.2f}s")
+        return result
+
+    def _recognize_frames(self, policy, tracker, camera, display):
+        """Reads camera frames and votes until the policy decides."""
+        with span("camera.open"):
+            video_capture = camera() if callable(camera) else cv2.VideoCapture(camera)
+        policy.reset()
+        result = None
+        frame = None
+
+        while result is None and not policy.timed_out():
+            with span("camera.read", log=False):
+                ret, frame = video_capture.read()
             if not ret:
                 break
 
@@ -109,39 +318,49 @@ class FaceIdentifier:
             small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
             rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
 
-            # Find all faces in current frame
-            face_locations = face_recognition.face_locations(rgb_small_frame)
-            face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+            if tracker is not None:
+                with span("face.track", log=False):
+                    tracks = tracker.update(rgb_small_frame)
+                face_locations = [track.box for track in tracks]
+                matches = [track.match for track in tracks]
+                # Only a new encoding is new evidence; cached matches would re-vote every frame
+                votes = [track.match for track in tracks if track.fresh]
+            else:
+                # Find all faces in current frame
+                with span("face.detect", log=False):
+                    face_locations = face_recognition.face_locations(rgb_small_frame)
+                with span("face.encode", log=False):
+                    face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+
+                # Match every face in the frame against the gallery in one batch
+                with span("face.match", log=False):
+                    matches = self.matcher.match(face_encodings)
+                votes = matches
 
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
+            for (top, right, bottom, left), match in zip(face_locations, matches):
                 # Scale back up face locations
                 top *= 4
                 right *= 4
                 bottom *= 4
                 left *= 4
 
-                # Compare with known faces
-                matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding, tolerance=0.6)
-                
-                if True in matches:
-                    first_match_index = matches.index(True)
-                    name = self.known_face_names[first_match_index]
-                    detected_names.append(name)
-
                 # Draw bounding box and label
-                if name:
+                if match.name:
                     cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
-                    cv2.putText(frame, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.8, (255, 255, 255), 1)
+                    cv2.putText(frame, match.name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.8, (255, 255, 255), 1)
+
+            result = policy.add_frame(votes)
 
-            # st.image(frame, caption='Face Identification', use_container_width=True)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if display and _wait_key() == ord('q'):
                 break
 
         video_capture.release()
-        cv2.destroyAllWindows()
+        if display:
+            close_windows()
+        result = result or policy.decide()
+        result.frame = frame
+        return result
 
-        # Return the most common detected name
-        if detected_names:
-            st.image(frame, caption='Face Identification', use_container_width=True)
-            return Counter(detected_names).most_common(1)[0][0]
-        return "Unknown"
\ No newline at end of file
+    def run_recognition(self):
+        """Runs face recognition and returns the recognised patient name, or "Unknown"."""
+        return self.recognize().name
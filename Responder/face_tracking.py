@@ -0,0 +1,188 @@
+import cv2
+import itertools
+import numpy as np
+import face_recognition
+from typing import Callable, List, Optional, Tuple
+from face_matcher import MatchResult
+
+Box = Tuple[int, int, int, int]  # (top, right, bottom, left), as used by face_recognition
+
+
+def _create_cv2_tracker():
+    """
+    Creates the cheapest correlation tracker available in the installed OpenCV build.
+    Returns None if none is available, in which case tracks hold still between detections.
+    """
+    factories = [
+        ("legacy", "TrackerMOSSE_create"),
+        ("legacy", "TrackerKCF_create"),
+        (None, "TrackerKCF_create"),
+        (None, "TrackerMIL_create"),
+    ]
+    for namespace, factory in factories:
+        module = getattr(cv2, namespace, None) if namespace else cv2
+        if module is not None and hasattr(module, factory):
+            return getattr(module, factory)()
+    return None
+
+
+def box_iou(a: Box, b: Box) -> float:
+    """Intersection over union of two (top, right, bottom, left) boxes."""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    intersection = max(0, bottom - top) * max(0, right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    union = area_a + area_b - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class FaceTrack:
+    """
+    A face followed across frames, with the match of its best encoding so far.
+    `fresh` is True only in the frame in which that encoding was computed.
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self, box: Box) -> None:
+        self.id = next(self._ids)
+        self.box = box
+        self.tracker = None
+        self.match: Optional[MatchResult] = None
+        self.encoded_quality = 0.0
+        self.fresh = False
+        self.encoded_at = 0
+
+    def start_tracker(self, frame: np.ndarray) -> None:
+        """(Re)initialises the correlation tracker on the track's current box."""
+        top, right, bottom, left = self.box
+        self.tracker = _create_cv2_tracker()
+        if self.tracker is not None:
+            self.tracker.init(frame, (left, top, right - left, bottom - top))
+
+    def follow(self, frame: np.ndarray) -> bool:
+        """Moves the box with the tracker. Returns False if the face was lost."""
+        if self.tracker is None:
+            return True
+        ok, (x, y, w, h) = self.tracker.update(frame)
+        if not ok:
+            return False
+        self.box = (int(y), int(x + w), int(y + h), int(x))
+        return True
+
+
+class FaceTracker:
+    """
+    Detect-then-track face pipeline. Full HOG detection runs every `detect_every` frames,
+    faces are followed with a correlation tracker in between, and each track is encoded
+    only once, or again when its quality improves. Only the most prominent faces (largest
+    and most central) are encoded, so background bystanders cost nothing.
+    """
+
+    def __init__(self, match_fn: Callable[[List[np.ndarray]], List[MatchResult]], detect_every: int = 5,
+                 max_faces: int = 1, reencode_gain: float = 1.5, iou_threshold: float = 0.3,
+                 reencode_every: int = 0) -> None:
+        """
+        Initializes the tracker.
+
+        Args:
+            match_fn (Callable): Matches a list of encodings against the gallery (FaceMatcher.match).
+            detect_every (int): Run full detection every N frames.
+            max_faces (int): Number of most prominent faces to encode and report.
+            reencode_gain (float): Re-encode a track once its quality exceeds the quality of its
+                last encoding by this factor.
+            iou_threshold (float): Minimum overlap for a detection to continue an existing track.
+            reencode_every (int): Also re-encode a track every N frames, so voting keeps receiving
+                new evidence. 0 encodes only new or improved tracks.
+        """
+        self.match_fn = match_fn
+        self.detect_every = max(1, detect_every)
+        self.max_faces = max_faces
+        self.reencode_gain = reencode_gain
+        self.iou_threshold = iou_threshold
+        self.reencode_every = reencode_every
+        self.tracks: List[FaceTrack] = []
+        self.frame_index = 0
+        self.encodings_computed = 0
+
+    def update(self, frame: np.ndarray) -> List[FaceTrack]:
+        """
+        Processes one (downscaled RGB) frame.
+
+        Returns:
+            List[FaceTrack]: The prominent tracks in this frame, each with its current match.
+                Tracks encoded in this frame are marked `fresh`; the others carry a cached match,
+                which is not new evidence and should not be voted for again.
+        """
+        if self.frame_index % self.detect_every == 0:
+            self._detect(frame)
+        else:
+            self.tracks = [track for track in self.tracks if track.follow(frame)]
+        self.frame_index += 1
+
+        prominent = sorted(self.tracks, key=lambda track: self._prominence(track, frame), reverse=True)
+        prominent = prominent[:self.max_faces]
+        for track in self.tracks:
+            track.fresh = False
+        self._encode(frame, prominent)
+        return [track for track in prominent if track.match is not None]
+
+    def _detect(self, frame: np.ndarray) -> None:
+        """Runs full detection and associates detections with existing tracks by overlap."""
+        tracks = []
+        unmatched = list(self.tracks)
+        for box in face_recognition.face_locations(frame):
+            best = max(unmatched, key=lambda track: box_iou(track.box, box), default=None)
+            if best is not None and box_iou(best.box, box) >= self.iou_threshold:
+                unmatched.remove(best)
+                track = best
+                track.box = box
+            else:
+                track = FaceTrack(box)
+            track.start_tracker(frame)
+            tracks.append(track)
+        self.tracks = tracks
+
+    def _encode(self, frame: np.ndarray, tracks: List[FaceTrack]) -> None:
+        """Encodes the tracks that have never been encoded or whose quality has improved."""
+        pending = []
+        for track in tracks:
+            quality = self._quality(track, frame)
+            due = self.reencode_every and self.frame_index - track.encoded_at >= self.reencode_every
+            if track.match is None or quality > track.encoded_quality * self.reencode_gain or due:
+                pending.append((track, quality))
+        if not pending:
+            return
+
+        encodings = face_recognition.face_encodings(frame, [self._clip(track.box, frame) for track, _ in pending])
+        self.encodings_computed += len(encodings)
+        for (track, quality), match in zip(pending, self.match_fn(encodings)):
+            track.match = match
+            track.encoded_quality = quality
+            track.fresh = True
+            track.encoded_at = self.frame_index
+
+    @staticmethod
+    def _clip(box: Box, frame: np.ndarray) -> Box:
+        height, width = frame.shape[:2]
+        top, right, bottom, left = box
+        return max(0, top), min(width, right), min(height, bottom), max(0, left)
+
+    def _prominence(self, track: FaceTrack, frame: np.ndarray) -> float:
+        """Face area, discounted by distance from the frame centre."""
+        top, right, bottom, left = self._clip(track.box, frame)
+        height, width = frame.shape[:2]
+        area = max(0, bottom - top) * max(0, right - left)
+        dx = ((left + right) / 2 - width / 2) / (width / 2)
+        dy = ((top + bottom) / 2 - height / 2) / (height / 2)
+        return area * (1.0 - 0.5 * min(1.0, np.hypot(dx, dy)))
+
+    def _quality(self, track: FaceTrack, frame: np.ndarray) -> float:
+        """Encoding quality estimate: face area times sharpness (variance of the Laplacian)."""
+        top, right, bottom, left = self._clip(track.box, frame)
+        crop = frame[top:bottom, left:right]
+        if crop.size == 0:
+            return 0.0
+        sharpness = cv2.Laplacian(cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY), cv2.CV_64F).var()
+        return crop.shape[0] * crop.shape[1] * min(1.0, sharpness / 100.0)
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import threading
+from typing import Callable, Dict, Optional
+from tracing import span
+
+PENDING = "pending"
+FAILED = "failed"
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the API asked us to wait, if the error is a rate-limit response."""
+    status = getattr(error, "status", None) or getattr(getattr(error, "response", None), "status_code", None)
+    code = getattr(error, "code", None)
+    if status != 429 and code != "rate_limited":
+        return None
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", 1.0))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class NotionWriteQueue:
+    """
+    Durable write-behind queue for Notion entries.
+    Entries are committed to a local SQLite spool and the call returns immediately; a
+    background worker writes them to Notion in order, with exponential backoff on errors
+    and Retry-After on rate limits. Entries survive restarts and outages and are only
+    removed once written. Entries that keep failing are parked as 'failed' in the spool
+    instead of being dropped.
+    """
+
+    def __init__(self, spool_path: str, write: Callable[[Dict], None], min_interval: float = 0.35,
+                 backoff: float = 1.0, max_backoff: float = 300.0, max_attempts: int = 20,
+                 poll_interval: float = 1.0) -> None:
+        """
+        Initializes the queue and opens (or creates) the spool.
+
+        Args:
+            spool_path (str): SQLite file of the spool.
+            write (Callable[[Dict], None]): Writes one entry to Notion. It may add keys to the
+                entry (e.g. the created page ID); they are saved with the entry if the write fails,
+                so a retry can resume instead of writing twice.
+            min_interval (float): Minimum seconds between writes (Notion allows about three
+                requests per second).
+            backoff (float): Delay in seconds before the first retry; doubles with each attempt.
+            max_backoff (float): Longest delay between retries.
+            max_attempts (int): Attempts before an entry is parked as failed.
+            poll_interval (float): Seconds the idle worker waits before checking the spool again.
+        """
+        self.spool_path = spool_path
+        self.write = write
+        self.min_interval = min_interval
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+
+        directory = os.path.dirname(spool_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(spool_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, next_attempt REAL NOT NULL, last_error TEXT, created REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enqueue(self, entry: Dict) -> int:
+        """
+        Commits an entry to the spool and wakes the worker.
+
+        Args:
+            entry (Dict): JSON-serializable keyword arguments for the writer.
+
+        Returns:
+            int: The spool ID of the entry.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO entries (payload, status, next_attempt, created) VALUES (?, ?, ?, ?)",
+                (json.dumps(entry), PENDING, now, now)
+            )
+        self._wake.set()
+        return cursor.lastrowid
+
+    def pending(self) -> int:
+        """Number of entries waiting to be written."""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries WHERE status = ?", (PENDING,)).fetchone()[0]
+
+    def failed(self) -> int:
+        """Number of entries parked after too many failed attempts."""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries WHERE status = ?", (FAILED,)).fetchone()[0]
+
+    def retry_failed(self) -> None:
+        """Puts parked entries back in the queue, e.g. after fixing a configuration error."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET status = ?, attempts = 0, next_attempt = ? WHERE status = ?",
+                (PENDING, time.time(), FAILED)
+            )
+        self._wake.set()
+
+    def start(self) -> "NotionWriteQueue":
+        """Starts the background worker."""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="notion-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops the worker after its current write. Unwritten entries stay in the spool."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self) -> None:
+        self.stop()
+        with self._lock:
+            self._db.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            delay = self.process_next()
+            if delay is None:
+                continue
+            self._wake.wait(min(delay, self.poll_interval))
+            self._wake.clear()
+
+    def process_next(self) -> Optional[float]:
+        """
+        Writes the oldest due entry, if any.
+
+        Returns:
+            Optional[float]: None if another entry may be written right away, otherwise the
+                seconds until the next entry is due (or the poll interval if the spool is empty).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, payload, attempts, next_attempt FROM entries WHERE status = ? "
+                "ORDER BY next_attempt, id LIMIT 1", (PENDING,)
+            ).fetchone()
+        if row is None:
+            return self.poll_interval
+        entry_id, payload, attempts, next_attempt = row
+        if next_attempt > now:
+            return next_attempt - now
+
+        entry = json.loads(payload)
+        try:
+            with span("notion.write_behind", attempt=attempts + 1):
+                self.write(entry)
+        except Exception as e:
+            self._reschedule(entry_id, entry, attempts + 1, e)
+            return 0.0
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+        if self.min_interval:
+            time.sleep(self.min_interval)
+        return None
+
+    def _reschedule(self, entry_id: int, entry: Dict, attempts: int, error: Exception) -> None:
+        wait = retry_after(error)
+        if wait is None:
+            wait = min(self.max_backoff, self.backoff * (2 ** (attempts - 1))) * (0.5 + random.random() / 2)
+        status = FAILED if attempts >= self.max_attempts else PENDING
+        print(f"Error writing Notion entry (attempt {attempts}, "
+              f"{'giving up' if status == FAILED else f'retrying in {wait:.1f}s'}): {error}")
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET payload = ?, status = ?, attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                (json.dumps(entry), status, attempts, time.time() + wait, str(error)[:500], entry_id)
+            )
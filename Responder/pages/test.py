@@ -1,5 +1,10 @@
 import streamlit as st
 from assistant import FirstResponderAssistant
+from recognition_policy import UNKNOWN
+from session_worker import (
+    AudioPlaying, Identified, PartialTranscript, PatientMessage, ResponderMessage, SessionEnded, SessionWorker,
+    SummarySaved
+)
 st.set_page_config(layout="wide", initial_sidebar_state="collapsed")
 st.markdown(
    """
@@ -22,5 +27,63 @@ st.markdown(
 )
 st.title("Let me see if I remember you... This may take some time")
 
-assistant = FirstResponderAssistant()
-assistant.start_assistance_flow()
\ No newline at end of file
+
+def start_session():
+    """Starts the intake flow on a background worker; the page only renders its events."""
+    st.session_state.intake = SessionWorker(
+        lambda on_event: FirstResponderAssistant(live_transcription=True, on_event=on_event)
+    ).start()
+
+
+def render(events):
+    """Draws the conversation so far from the session's events."""
+    partial = None
+    playing = False
+    ended = None
+    messages = st.container(height=300)
+    for event in events:
+        if isinstance(event, Identified):
+            if event.patient != UNKNOWN and event.frame is not None:
+                st.image(event.frame, caption='Face Identification', channels="BGR", use_container_width=True)
+            messages.chat_message("Responder").write(f"Detected patient: {event.patient}")
+        elif isinstance(event, ResponderMessage):
+            messages.chat_message("Responder").write(f"Responder: {event.text}")
+        elif isinstance(event, PartialTranscript):
+            partial = event.text
+        elif isinstance(event, PatientMessage):
+            partial = None
+            messages.chat_message("Patient").write(f"Patient: {event.text}")
+        elif isinstance(event, AudioPlaying):
+            playing = event.playing
+        elif isinstance(event, SummarySaved):
+            st.success(f"Summary for {event.patient} sent to the doctor.")
+        elif isinstance(event, SessionEnded):
+            ended = event
+    if partial:
+        messages.chat_message("Patient").write(f"Patient: {partial}...")
+    if ended is not None:
+        if ended.error:
+            st.error(f"The session stopped with an error: {ended.error}")
+        elif ended.cancelled:
+            st.caption("Session cancelled.")
+    elif playing:
+        st.caption("Speaking...")
+
+
+@st.fragment(run_every=0.5)
+def show_session():
+    """Polls the session worker twice a second; the rest of the page is not rerun."""
+    worker = st.session_state.intake
+    worker.poll()
+    render(worker.history)
+    if worker.running:
+        if st.button("Cancel"):
+            worker.cancel()
+    elif st.button("Next patient"):
+        start_session()
+        st.rerun()
+
+
+if "intake" not in st.session_state:
+    start_session()
+show_session()
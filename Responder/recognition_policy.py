@@ -0,0 +1,116 @@
+import time
+from dataclasses import dataclass
+from collections import defaultdict
+from typing import Dict, Optional, Sequence
+import numpy as np
+from face_matcher import MatchResult
+
+UNKNOWN = "Unknown"
+
+
+@dataclass
+class RecognitionResult:
+    """
+    Identity decision for one recognition run.
+
+    Attributes:
+        name (str): Recognised patient name, or "Unknown".
+        confidence (float): Share of the accumulated vote weight held by the decision (0-1).
+        frames_used (int): Number of camera frames processed before deciding.
+        elapsed (float): Seconds from the first frame to the decision.
+        frame (Optional[np.ndarray]): Last frame of the run (BGR), with the faces marked.
+    """
+    name: str
+    confidence: float
+    frames_used: int
+    elapsed: float
+    frame: Optional[np.ndarray] = None
+
+
+class RecognitionPolicy:
+    """
+    Accumulates per-frame match votes weighted by match distance and decides as soon
+    as one identity is confident enough, instead of waiting out a fixed window.
+    """
+
+    def __init__(self, tolerance: float = 0.6, confidence_threshold: float = 0.8,
+                 min_evidence: float = 1.0, timeout: float = 5.0, margin_scale: float = 0.1) -> None:
+        """
+        Initializes the policy.
+
+        Args:
+            tolerance (float): Match tolerance used by the matcher; votes scale with how far
+                below it a match distance falls.
+            confidence_threshold (float): Share of total vote weight an identity needs to win.
+            min_evidence (float): Vote weight an identity needs before an early exit. A close
+                match is worth up to 1.0 per frame, so 1.0 means roughly three good frames.
+            timeout (float): Seconds after which the best identity is returned if it meets the
+                confidence threshold, otherwise "Unknown".
+            margin_scale (float): Runner-up margin below which a vote is scaled down as ambiguous.
+        """
+        self.tolerance = tolerance
+        self.confidence_threshold = confidence_threshold
+        self.min_evidence = min_evidence
+        self.timeout = timeout
+        self.margin_scale = margin_scale
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears all votes and restarts the clock."""
+        self.scores: Dict[str, float] = defaultdict(float)
+        self.frames_used = 0
+        self.start_time = time.time()
+
+    def elapsed(self) -> float:
+        return time.time() - self.start_time
+
+    def timed_out(self) -> bool:
+        return self.elapsed() >= self.timeout
+
+    def vote_weight(self, match: MatchResult) -> float:
+        """
+        Weight of one face match. Close, unambiguous matches count most; faces above
+        tolerance vote for "Unknown" with a weight that grows with their distance.
+        """
+        if match.name is None:
+            if match.index < 0:
+                return 1.0  # Empty gallery: nobody can be recognised
+            return min(1.0, (match.distance - self.tolerance) / max(1e-6, 1.0 - self.tolerance))
+        weight = max(0.0, 1.0 - match.distance / self.tolerance)
+        return weight * min(1.0, match.margin / self.margin_scale)
+
+    def add_frame(self, matches: Sequence[MatchResult]) -> Optional[RecognitionResult]:
+        """
+        Adds the matches of one frame.
+
+        Args:
+            matches (Sequence[MatchResult]): Matches of the faces found in the frame.
+
+        Returns:
+            Optional[RecognitionResult]: The decision if a known identity has become confident
+                enough, otherwise None.
+        """
+        self.frames_used += 1
+        for match in matches:
+            self.scores[match.name or UNKNOWN] += self.vote_weight(match)
+
+        name, confidence = self._leader()
+        if name and name != UNKNOWN and confidence >= self.confidence_threshold \
+                and self.scores[name] >= self.min_evidence:
+            return RecognitionResult(name, confidence, self.frames_used, self.elapsed())
+        return None
+
+    def decide(self) -> RecognitionResult:
+        """Returns the final decision, used when the time budget runs out."""
+        name, confidence = self._leader()
+        if not name or confidence < self.confidence_threshold:
+            name = UNKNOWN
+        return RecognitionResult(name, confidence, self.frames_used, self.elapsed())
+
+    def _leader(self):
+        """Returns the identity with the most vote weight and its share of the total."""
+        total = sum(self.scores.values())
+        if total <= 0:
+            return None, 0.0
+        name = max(self.scores, key=self.scores.get)
+        return name, self.scores[name] / total
@@ -0,0 +1,157 @@
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+UNLOADED = "unloaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+WARMING = "warming"
+WARM = "warm"
+
+
+class Resource:
+    """A heavyweight, shared object (model, client, gallery) and its lifecycle state."""
+
+    def __init__(self, name: str, factory: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None,
+                 close: Optional[Callable[[Any], None]] = None) -> None:
+        self.name = name
+        self.factory = factory
+        self.warmup = warmup
+        self.close = close
+        self.instance = None
+        self.state = UNLOADED
+        self.warm = False
+        self.warming = False
+        self.error: Optional[BaseException] = None
+        self.load_seconds: Optional[float] = None
+        self.lock = threading.RLock()
+
+
+class ResourceRegistry:
+    """
+    Thread-safe, process-wide registry of heavyweight resources.
+    Each resource is loaded once on first use and then shared by every caller, with an
+    explicit lifecycle: load, warm, invalidate and reload. Loads are serialised per
+    resource, so a slow gallery load never blocks access to an already-loaded model.
+    """
+
+    def __init__(self) -> None:
+        self._resources: Dict[str, Resource] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None,
+                 close: Optional[Callable[[Any], None]] = None, replace: bool = False) -> None:
+        """
+        Registers a resource. Registering an existing name is a no-op unless `replace` is set,
+        so modules can register their defaults on every import or script rerun.
+
+        Args:
+            name (str): Resource name.
+            factory (Callable[[], Any]): Builds the resource.
+            warmup (Optional[Callable[[Any], None]]): Pays one-off costs (JIT, connections) ahead
+                of the first real use.
+            close (Optional[Callable[[Any], None]]): Releases the resource when it is invalidated.
+            replace (bool): Replace an existing registration, dropping its loaded instance.
+        """
+        with self._lock:
+            existing = self._resources.get(name)
+            if existing is not None and not replace:
+                return
+            self._resources[name] = Resource(name, factory, warmup, close)
+        if existing is not None:
+            self._close(existing)
+
+    def override(self, name: str, instance: Any) -> None:
+        """Registers an already-built instance, e.g. a fake in a benchmark."""
+        self.register(name, lambda: instance, replace=True)
+        self.get(name)
+
+    def _resource(self, name: str) -> Resource:
+        with self._lock:
+            if name not in self._resources:
+                raise KeyError(f"Unknown resource: {name}")
+            return self._resources[name]
+
+    def get(self, name: str) -> Any:
+        """
+        Returns the shared instance, loading it on first use.
+
+        Raises:
+            Exception: Whatever the factory raised. A failed resource is retried on the next get.
+        """
+        resource = self._resource(name)
+        if resource.state == READY:
+            return resource.instance
+        with resource.lock:
+            if resource.state != READY:
+                resource.state = LOADING
+                start = time.time()
+                try:
+                    resource.instance = resource.factory()
+                except BaseException as e:
+                    resource.state = FAILED
+                    resource.error = e
+                    raise
+                resource.load_seconds = time.time() - start
+                resource.error = None
+                resource.state = READY
+                print(f"Loaded resource {name} in {resource.load_seconds:.1f}s")
+            return resource.instance
+
+    def warm(self, name: str) -> Any:
+        """Loads the resource if needed and runs its warm-up hook once."""
+        resource = self._resource(name)
+        instance = self.get(name)
+        with resource.lock:
+            if not resource.warm and resource.warmup is not None:
+                resource.warming = True
+                try:
+                    resource.warmup(instance)
+                finally:
+                    resource.warming = False
+            resource.warm = True
+        return instance
+
+    def invalidate(self, name: str) -> None:
+        """Drops the loaded instance; the next get() loads a fresh one."""
+        self._close(self._resource(name))
+
+    def reload(self, name: str) -> Any:
+        """Invalidates and immediately reloads the resource."""
+        self.invalidate(name)
+        return self.get(name)
+
+    def status(self) -> Dict[str, str]:
+        """
+        Returns the lifecycle state of every registered resource: unloaded, loading, ready,
+        failed, warming (warm-up hook running) or warm.
+        """
+        with self._lock:
+            resources = list(self._resources.values())
+        status = {}
+        for resource in resources:
+            if resource.warming:
+                status[resource.name] = WARMING
+            elif resource.warm and resource.state == READY:
+                status[resource.name] = WARM
+            else:
+                status[resource.name] = resource.state
+        return status
+
+    def _close(self, resource: Resource) -> None:
+        with resource.lock:
+            instance = resource.instance
+            resource.instance = None
+            resource.state = UNLOADED
+            resource.warm = False
+        if instance is not None and resource.close is not None:
+            try:
+                resource.close(instance)
+            except Exception as e:
+                print(f"Error closing resource {resource.name}: {e}")
+
+
+# Shared by everything in the process. Streamlit reruns re-execute page scripts but keep
+# imported modules, so resources held here survive page refreshes.
+registry = ResourceRegistry()
@@ -0,0 +1,467 @@
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from dataclasses import dataclass
+import numpy as np
+from assistant import FirstResponderAssistant, FACE_IDENTIFIER, LISTENER, LLM, TTS_CACHE, NOTION_QUEUE
+from recognition_policy import RecognitionResult, UNKNOWN
+from resources import ResourceRegistry, registry
+from session_worker import Identified, PatientMessage, ResponderMessage, SessionEvent
+from tracing import session_scope, span, traced, tracer
+
+
+class Stage:
+    """
+    A shared processing stage (face recognition, ASR, LLM or TTS): a bounded queue drained
+    by a fixed number of workers, each running the blocking stage function on the stage's
+    own thread pool. A full queue makes submit() wait, so a burst of sessions slows down at
+    the stage that is saturated instead of piling up unbounded work.
+    """
+
+    def __init__(self, name: str, function: Callable, workers: int = 2, queue_size: int = 16) -> None:
+        """
+        Args:
+            name (str): Stage name, used in metrics.
+            function (Callable): Blocking function run for each request.
+            workers (int): Requests processed concurrently.
+            queue_size (int): Requests allowed to wait before submit() blocks.
+        """
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.queue_size = queue_size
+        self.processed = 0
+        self.busy = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"stage-{name}")
+
+    def start(self) -> None:
+        """Starts the workers on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, *args) -> Any:
+        """Queues a request, waiting for room if the stage is saturated, and returns its result."""
+        future = asyncio.get_running_loop().create_future()
+        # The request runs in the submitting session's context, so its spans keep the session ID
+        await self._queue.put((contextvars.copy_context(), args, future, time.time()))
+        return await future
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            context, args, future, queued = await self._queue.get()
+            tracer.record(f"stage.{self.name}.wait", time.time() - queued, log=False)
+            self.busy += 1
+            try:
+                result = await loop.run_in_executor(self._executor, context.run, self.function, *args)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.busy -= 1
+                self.processed += 1
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "busy": self.busy,
+            "workers": self.workers,
+            "processed": self.processed,
+        }
+
+
+@dataclass
+class Station:
+    """
+    The devices of one intake station.
+
+    Attributes:
+        name (str): Station name.
+        camera (Any): Camera index, video file or capture factory (see FaceIdentifier).
+        input_stream (Optional[Callable]): Microphone, with the signature of sd.InputStream.
+            None uses the listener's default device.
+        play_audio (Callable[[bytes], None]): Plays WAV audio and returns when it has finished.
+        on_message (Optional[Callable[[str, str], None]]): Called with (role, text) for each line
+            of the conversation, e.g. to update a display.
+    """
+    name: str
+    camera: Any
+    input_stream: Optional[Callable]
+    play_audio: Callable[[bytes], None]
+    on_message: Optional[Callable[[str, str], None]] = None
+
+
+@dataclass
+class SessionResult:
+    station: str
+    session_id: str
+    patient: str
+    turns: int
+    summary: Optional[str]
+    elapsed: float
+    error: Optional[str] = None
+    time_to_identity: Optional[float] = None
+
+
+@dataclass
+class StageReply:
+    """Reply of the LLM stage, shaped like a chat model message."""
+    content: str
+
+
+class StageLLM:
+    """Chat model front for the LLM stage, for code running on a station thread."""
+
+    def __init__(self, manager: "SessionManager") -> None:
+        self.manager = manager
+
+    def invoke(self, prompt: str) -> StageReply:
+        return StageReply(self.manager.call(self.manager.llm.submit(prompt)))
+
+
+class StageTTS:
+    """TTS cache front for the TTS stage, for code running on a station thread."""
+
+    def __init__(self, manager: "SessionManager") -> None:
+        self.manager = manager
+
+    def get(self, text: str) -> Optional[bytes]:
+        return self.manager.call(self.manager.tts.submit(text))
+
+
+class FrameFeed:
+    """
+    Capture-like reader over frames a station thread is still reading, so recognition starts
+    on the first frame and the station stops reading as soon as recognition has released
+    the feed. Only the newest frames are kept, so recognition never falls behind the camera.
+    """
+
+    def __init__(self, timeout: float = 2.0, keep: int = 2) -> None:
+        """
+        Args:
+            timeout (float): Seconds read() waits for the next frame before failing.
+            keep (int): Unread frames kept; older ones are dropped.
+        """
+        self.timeout = timeout
+        self.released = threading.Event()
+        self._frames: Deque[np.ndarray] = deque(maxlen=keep)
+        self._changed = threading.Condition()
+        self._ended = False
+
+    def put(self, frame: np.ndarray) -> None:
+        with self._changed:
+            self._frames.append(frame)
+            self._changed.notify_all()
+
+    def end(self) -> None:
+        """Marks the end of the frames; read() fails once the rest are read."""
+        with self._changed:
+            self._ended = True
+            self._changed.notify_all()
+
+    def read(self):
+        with self._changed:
+            self._changed.wait_for(lambda: self._frames or self._ended or self.released.is_set(), self.timeout)
+            if not self._frames or self.released.is_set():
+                return False, None
+            return True, self._frames.popleft()
+
+    def release(self) -> None:
+        with self._changed:
+            self.released.set()
+            self._frames.clear()
+            self._changed.notify_all()
+
+
+class StationAssistant(FirstResponderAssistant):
+    """
+    The assistant's intake flow for one session run by a SessionManager. It runs on a
+    station I/O thread, records and plays on the station's devices, and sends face
+    recognition, transcription, LLM replies, summary updates and speech synthesis to the
+    manager's shared stages.
+    """
+    show_windows = False
+
+    def __init__(self, manager: "SessionManager", station: Station) -> None:
+        self.manager = manager
+        self.station = station
+        self.started = time.time()
+        self.identified_at: Optional[float] = None
+        self.summary: Optional[str] = None
+        super().__init__(resources=manager.resources, play_audio=station.play_audio,
+                         handoff=self._record_handoff, on_event=self._show)
+        self.question_count = manager.question_count
+        self.max_answer_duration = manager.max_answer_duration
+        self.trailing_silence = manager.trailing_silence
+        self.max_prompt_tokens = self.conversation.max_prompt_tokens = manager.max_prompt_tokens
+
+    def _component(self, name: str):
+        # Replies, conversation summary updates and synthesis go through the shared stages,
+        # so they all count against the stages' concurrency limits
+        if name == LLM:
+            return StageLLM(self.manager)
+        if name == TTS_CACHE:
+            return StageTTS(self.manager)
+        return super()._component(name)
+
+    def run(self) -> None:
+        """Runs the session: identify, converse, hand off."""
+        try:
+            self._assistance_flow()
+        finally:
+            self.conversation.close()
+
+    def _identify(self) -> RecognitionResult:
+        result = self.manager.identify_from(self.station.camera)
+        self.identified_at = time.time()
+        return result
+
+    @traced("listen")
+    def _listen(self) -> str:
+        audio = self.listener.record_until_silence(
+            max_duration=self.max_answer_duration,
+            trailing_silence=self.trailing_silence,
+            input_stream=self.station.input_stream
+        )
+        if audio.size == 0:
+            return ""
+        return self.manager.call(self.manager.asr.submit(audio))
+
+    def _speak(self, text: str) -> None:
+        """Speaks a reply sentence by sentence; later sentences synthesize while earlier ones play."""
+        with span("speak", station=self.station.name):
+            self.speech.speak(text)
+
+    def _record_handoff(self, name: str, summary: str, date: str) -> None:
+        self.summary = summary
+        self.manager.handoff(name, summary, date)
+
+    def _show(self, event: SessionEvent) -> None:
+        if isinstance(event, Identified):
+            self.manager.show_message(self.station, "Responder", f"Detected patient: {event.patient}")
+        elif isinstance(event, ResponderMessage):
+            self.manager.show_message(self.station, "Responder", event.text)
+        elif isinstance(event, PatientMessage):
+            self.manager.show_message(self.station, "Patient", event.text)
+
+
+class SessionManager:
+    """
+    Runs intake sessions for many stations concurrently on one asyncio event loop.
+    Each session runs the assistant's intake flow (StationAssistant) on a station I/O
+    thread; face recognition, transcription, LLM requests and speech synthesis are shared
+    stages with their own worker pools and bounded queues, so one copy of each model serves
+    every station. Device I/O (camera, recording and playback) stays on the station threads,
+    so a station waiting for its patient never holds a stage worker.
+    """
+
+    def __init__(self, resources: Optional[ResourceRegistry] = None, identify_workers: int = 2,
+                 asr_workers: int = 2, llm_workers: int = 8, tts_workers: int = 8, queue_size: int = 16,
+                 max_sessions: int = 16, question_count: int = 7, max_answer_duration: float = 20.0,
+                 trailing_silence: float = 0.8, max_prompt_tokens: int = 2000,
+                 handoff: Optional[Callable[[str, str, str], None]] = None) -> None:
+        """
+        Args:
+            resources (Optional[ResourceRegistry]): Where shared components come from. Defaults to
+                the process-wide registry.
+            identify_workers (int): Concurrent face recognitions.
+            asr_workers (int): Concurrent transcriptions. With the shared ASR server
+                (ASR_BACKEND=server), about one per station lets concurrent answers be batched.
+            llm_workers (int): Concurrent LLM requests, replies and summary updates together.
+            tts_workers (int): Concurrent speech syntheses.
+            queue_size (int): Requests waiting per stage before submitters are held back.
+            max_sessions (int): Sessions admitted at once; further sessions wait for a slot.
+            question_count (int): Questions per session.
+            max_answer_duration (float): Cap on one answer, in seconds.
+            trailing_silence (float): Seconds of silence that end an answer.
+            max_prompt_tokens (int): Token budget of each LLM prompt.
+            handoff (Optional[Callable[[str, str, str], None]]): Records the doctor handoff from the
+                patient name, summary and date. Defaults to queueing a Notion entry.
+        """
+        self.resources = resources or registry
+        self.max_sessions = max_sessions
+        self.question_count = question_count
+        self.max_answer_duration = max_answer_duration
+        self.trailing_silence = trailing_silence
+        self.max_prompt_tokens = max_prompt_tokens
+        self.handoff = handoff or self._queue_handoff
+        self.completed = 0
+
+        self.identify = Stage("identify", self._identify, identify_workers, queue_size)
+        self.asr = Stage("asr", self._transcribe, asr_workers, queue_size)
+        self.llm = Stage("llm", self._respond, llm_workers, queue_size)
+        self.tts = Stage("tts", self._synthesize, tts_workers, queue_size)
+        self.stages = [self.identify, self.asr, self.llm, self.tts]
+        self._io = ThreadPoolExecutor(max_workers=2 * max_sessions, thread_name_prefix="station-io")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._admission: Optional[asyncio.Semaphore] = None
+        self._active = 0
+
+    # Stage functions. They run on stage worker threads.
+
+    def _identify(self, feed: FrameFeed) -> RecognitionResult:
+        identifier = self.resources.get(FACE_IDENTIFIER)
+        return identifier.recognize(camera=lambda: feed, display=False)
+
+    def _transcribe(self, audio: np.ndarray) -> str:
+        return self.resources.get(LISTENER).transcribe_audio(audio).strip()
+
+    def _respond(self, prompt: str) -> str:
+        with span("llm.respond"):
+            return self.resources.get(LLM).invoke(prompt).content
+
+    def _synthesize(self, text: str) -> Optional[bytes]:
+        return self.resources.get(TTS_CACHE).get(text)
+
+    # Called from station threads
+
+    def submit(self, request: Awaitable) -> Future:
+        """
+        Starts a stage request from a station thread. The request keeps the caller's
+        context, so its spans keep the session ID.
+        """
+        return asyncio.run_coroutine_threadsafe(request, self._loop)
+
+    def call(self, request: Awaitable) -> Any:
+        """Runs a stage request from a station thread and waits for its result."""
+        return self.submit(request).result()
+
+    def identify_from(self, camera) -> RecognitionResult:
+        """
+        Recognises the patient at a station camera. The camera is read on the calling station
+        thread and each frame goes to the identify stage as it arrives, so recognition can
+        decide on the first frames; reading stops as soon as it has decided or given up.
+        """
+        import cv2
+
+        feed = FrameFeed()
+        request = None
+        with span("camera.capture"):
+            capture = camera() if callable(camera) else cv2.VideoCapture(camera)
+            try:
+                while not feed.released.is_set():
+                    ok, frame = capture.read()
+                    if not ok:
+                        break
+                    feed.put(frame)
+                    if request is None:
+                        # A stage worker is only taken once there is a frame to look at
+                        request = self.submit(self.identify.submit(feed))
+                    elif request.done():
+                        break
+            finally:
+                feed.end()
+                capture.release()
+        if request is None:
+            request = self.submit(self.identify.submit(feed))
+        return request.result()
+
+    def show_message(self, station: Station, role: str, text: str) -> None:
+        print(f"[{station.name}] {role}: {text}")
+        if station.on_message:
+            try:
+                station.on_message(role, text)
+            except Exception as e:
+                print(f"Error showing message: {e}")
+
+    def _queue_handoff(self, name: str, summary: str, date: str) -> None:
+        self.resources.get(NOTION_QUEUE).enqueue({
+            "name": name,
+            "description": summary,
+            "date": date,
+            "time": datetime.now().strftime("%H:%M:%S")
+        })
+
+    # Session flow
+
+    async def start(self) -> None:
+        """Starts the stage workers. Called by serve()."""
+        self._loop = asyncio.get_running_loop()
+        self._admission = asyncio.Semaphore(self.max_sessions)
+        for stage in self.stages:
+            stage.start()
+
+    async def stop(self) -> None:
+        for stage in self.stages:
+            await stage.stop()
+        self._io.shutdown(wait=False)
+
+    async def _device(self, function: Callable, *args) -> Any:
+        """Runs blocking station work off the event loop, in the caller's context."""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self._io, context.run, function, *args)
+
+    async def run_session(self, station: Station) -> SessionResult:
+        """
+        Runs one patient session at a station: identify, converse, queue the handoff.
+
+        Returns:
+            SessionResult: Outcome and timing of the session.
+        """
+        async with self._admission:
+            self._active += 1
+            try:
+                with session_scope() as session_id, span("session", station=station.name):
+                    assistant = await self._device(StationAssistant, self, station)
+                    error = None
+                    try:
+                        await self._device(assistant.run)
+                    except Exception as e:
+                        error = f"{type(e).__name__}: {e}"
+                        print(f"[{station.name}] Session {session_id} failed: {error}")
+                    self.completed += 1
+                    identity = assistant.identified_at - assistant.started if assistant.identified_at else None
+                    return SessionResult(station.name, session_id, assistant.current_patient or UNKNOWN,
+                                         len(assistant.conversation.turns), assistant.summary,
+                                         time.time() - assistant.started, error, identity)
+            finally:
+                self._active -= 1
+
+    async def serve(self, stations: List[Station], sessions_per_station: Optional[int] = None) -> List[SessionResult]:
+        """
+        Runs sessions back to back at every station until cancelled, or until each station has
+        run `sessions_per_station` sessions.
+
+        Returns:
+            List[SessionResult]: Results of every finished session.
+        """
+        await self.start()
+        results: List[SessionResult] = []
+
+        async def station_loop(station):
+            count = 0
+            while sessions_per_station is None or count < sessions_per_station:
+                results.append(await self.run_session(station))
+                count += 1
+
+        try:
+            await asyncio.gather(*(station_loop(station) for station in stations))
+        finally:
+            await self.stop()
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Active sessions, completed sessions and per-stage queue depth and utilisation."""
+        return {
+            "active_sessions": self._active,
+            "completed_sessions": self.completed,
+            "stages": {stage.name: stage.stats() for stage in self.stages},
+        }
@@ -0,0 +1,115 @@
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Union
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Identified:
+    """Face recognition finished. `frame` is the last camera frame (BGR), if any."""
+    patient: str
+    frame: Optional[np.ndarray] = None
+
+
+@dataclass(frozen=True)
+class ResponderMessage:
+    text: str
+
+
+@dataclass(frozen=True)
+class PartialTranscript:
+    """What the patient has said so far, while they are still talking."""
+    text: str
+
+
+@dataclass(frozen=True)
+class PatientMessage:
+    """The patient's final answer."""
+    text: str
+
+
+@dataclass(frozen=True)
+class AudioPlaying:
+    """Playback of a response (or one sentence of it) started or stopped."""
+    playing: bool
+
+
+@dataclass(frozen=True)
+class SummarySaved:
+    patient: str
+    summary: str
+
+
+@dataclass(frozen=True)
+class SessionEnded:
+    cancelled: bool = False
+    error: Optional[str] = None
+
+
+SessionEvent = Union[Identified, ResponderMessage, PartialTranscript, PatientMessage, AudioPlaying,
+                     SummarySaved, SessionEnded]
+
+
+class SessionWorker:
+    """
+    Runs one intake session on a background thread and publishes its progress as typed
+    events on a queue. The UI drains the queue at its own pace with poll(); publishing
+    never blocks, so rendering can never stall the camera or the audio pipeline.
+    """
+
+    def __init__(self, create_assistant: Callable[[Callable[[SessionEvent], None]], Any]) -> None:
+        """
+        Args:
+            create_assistant (Callable): Builds the assistant from the event callback, e.g.
+                `lambda on_event: FirstResponderAssistant(on_event=on_event)`. It is called on the
+                worker thread, so loading shared resources does not block the UI either.
+        """
+        self.create_assistant = create_assistant
+        self.assistant = None
+        self.history: List[SessionEvent] = []
+        self._events: "queue.Queue[SessionEvent]" = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SessionWorker":
+        self._thread = threading.Thread(target=self._run, name="intake-session", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        error = None
+        try:
+            self.assistant = self.create_assistant(self._events.put)
+            if self._cancel.is_set():
+                self.assistant.cancel()
+            self.assistant.start_assistance_flow()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"Intake session failed: {error}")
+        finally:
+            self._events.put(SessionEnded(self._cancel.is_set(), error))
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def cancel(self) -> None:
+        """Asks the session to stop at its next step. The handoff of what was said so far is kept."""
+        self._cancel.set()
+        if self.assistant is not None:
+            self.assistant.cancel()
+
+    def poll(self) -> List[SessionEvent]:
+        """
+        Returns the events published since the last call, without waiting. They are also
+        appended to `history`, so a UI that redraws from scratch can replay the session.
+        """
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+        self.history.extend(events)
+        return events
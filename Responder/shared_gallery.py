@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import struct
+import tempfile
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+from face_gallery import ENCODING_DIM
+
+MAGIC = b"HEALIAGL"
+HEADER = struct.Struct("<8sQQQ")  # magic, generation, rows, name table bytes
+ALIGNMENT = 64
+CURRENT_FILE = "current"
+
+
+def default_directory() -> str:
+    """Where shared galleries live: RAM-backed /dev/shm when available, else the temp directory."""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "healia-gallery")
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _version_file(generation: int) -> str:
+    return f"gallery-{generation}.bin"
+
+
+def _read_generation(directory: str) -> Optional[int]:
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), "r") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+class SharedGalleryPublisher:
+    """
+    Publishes gallery versions as memory-mapped files for recognition workers in other
+    processes. Each version is written once into its own file: a header, the float32
+    (N, 128) encodings matrix and a compact name table (the distinct names plus one int32
+    ID per row). A small 'current' file holds the generation of the live version and is
+    replaced atomically, which switches every reader to the new version at once. The
+    previous version is deleted after the switch; readers that still map it keep a valid view.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        """
+        Args:
+            directory (Optional[str]): Directory of the shared gallery. Defaults to default_directory().
+        """
+        self.directory = directory or default_directory()
+        os.makedirs(self.directory, exist_ok=True)
+        self.generation = _read_generation(self.directory) or 0
+
+    def publish(self, encodings: np.ndarray, names: Sequence[str]) -> int:
+        """
+        Writes a new gallery version and makes it current.
+
+        Args:
+            encodings (np.ndarray): (N, 128) face encodings.
+            names (Sequence[str]): Patient name of each row.
+
+        Returns:
+            int: The generation of the published version.
+        """
+        encodings = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        table = {}
+        ids = np.array([table.setdefault(name, len(table)) for name in names], dtype=np.int32)
+        name_bytes = json.dumps(list(table)).encode("utf-8")
+        if len(ids) != encodings.shape[0]:
+            raise ValueError(f"Gallery has {len(ids)} names but {encodings.shape[0]} encodings")
+
+        # Generations are timestamps, so a publisher started after an earlier one closed (and
+        # withdrew 'current') never reuses a generation a reader still holds
+        generation = max(self.generation + 1, time.time_ns())
+        matrix_offset = _aligned(HEADER.size)
+        ids_offset = _aligned(matrix_offset + encodings.nbytes)
+        path = os.path.join(self.directory, _version_file(generation))
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, generation, encodings.shape[0], len(name_bytes)))
+            f.seek(matrix_offset)
+            f.write(encodings.tobytes())
+            f.seek(ids_offset)
+            f.write(ids.tobytes())
+            f.write(name_bytes)
+
+        # The switch: readers map whatever version this file names
+        tmp_path = os.path.join(self.directory, CURRENT_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            f.write(str(generation))
+        os.replace(tmp_path, os.path.join(self.directory, CURRENT_FILE))
+
+        previous, self.generation = self.generation, generation
+        self._remove(previous)
+        return generation
+
+    def _remove(self, generation: int) -> None:
+        try:
+            os.remove(os.path.join(self.directory, _version_file(generation)))
+        except OSError:
+            pass  # Never published, or still open on a platform that cannot delete open files
+
+    def close(self) -> None:
+        """Withdraws the published gallery. Attached readers keep their current version."""
+        try:
+            os.remove(os.path.join(self.directory, CURRENT_FILE))
+        except OSError:
+            pass
+        self._remove(self.generation)
+
+
+class SharedGalleryReader:
+    """
+    Read-only view of a gallery published by SharedGalleryPublisher. The encodings are a
+    read-only numpy view onto the mapped file, shared through the page cache, so any
+    number of worker processes attach without copying. refresh() reads one tiny file
+    when nothing changed.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory = directory or default_directory()
+        self.generation = 0
+        self.encodings = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        self.names: List[str] = []
+
+    def refresh(self, attempts: int = 5) -> bool:
+        """
+        Maps the current version if it changed since the last call.
+
+        Args:
+            attempts (int): Tries when a version is replaced while being mapped.
+
+        Returns:
+            bool: True if a new version was loaded.
+        """
+        for _ in range(attempts):
+            generation = _read_generation(self.directory)
+            if generation is None or generation == self.generation:
+                return False
+            try:
+                self.encodings, self.names = self._load(generation)
+            except (OSError, ValueError):
+                continue  # Superseded and deleted before we mapped it; read the generation again
+            self.generation = generation
+            return True
+        return False
+
+    def _load(self, generation: int) -> Tuple[np.ndarray, List[str]]:
+        data = np.memmap(os.path.join(self.directory, _version_file(generation)), dtype=np.uint8, mode="r")
+        magic, stored_generation, rows, names_size = HEADER.unpack(bytes(data[:HEADER.size]))
+        if magic != MAGIC or stored_generation != generation:
+            raise ValueError(f"{_version_file(generation)} is not a gallery version")
+        matrix_offset = _aligned(HEADER.size)
+        ids_offset = _aligned(matrix_offset + rows * ENCODING_DIM * 4)
+        names_offset = ids_offset + rows * 4
+
+        encodings = data[matrix_offset:ids_offset][:rows * ENCODING_DIM * 4].view(np.float32).reshape(rows, ENCODING_DIM)
+        ids = data[ids_offset:names_offset].view(np.int32)
+        table = json.loads(bytes(data[names_offset:names_offset + names_size]))
+        return encodings, [table[i] for i in ids]
+
+    def close(self) -> None:
+        """Drops the mapping; it is released once no matcher uses it any more."""
+        self.encodings = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        self.names = []
+        self.generation = 0
@@ -0,0 +1,154 @@
+import re
+import time
+import queue
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+from tracing import run_in_context
+
+SENTENCE_END = re.compile(r"[.!?]+")
+
+
+def split_complete_sentences(buffer: str) -> Tuple[List[str], str]:
+    """
+    Cuts the complete sentences off the front of a streaming text buffer.
+    A terminator only ends a sentence once the character after it has arrived and is
+    whitespace. Terminators followed by anything else ("38.5", "e.g.", "!,") are skipped
+    and the scan goes on, so one decimal does not hold back the rest of the reply.
+
+    Args:
+        buffer (str): Text received so far that has not been spoken yet.
+
+    Returns:
+        Tuple[List[str], str]: The complete sentences, and the remaining partial text.
+    """
+    sentences = []
+    consumed = 0
+    for terminator in SENTENCE_END.finditer(buffer):
+        end = terminator.end()
+        if end >= len(buffer):
+            break  # The next character has not arrived yet
+        if not buffer[end].isspace():
+            continue  # Not a sentence boundary
+        sentence = buffer[consumed:end].strip()
+        if sentence:
+            sentences.append(sentence)
+        consumed = end
+    return sentences, buffer[consumed:]
+
+
+class SpeechPipeline:
+    """
+    Speaks text as it streams in. Three stages run concurrently: the caller's thread
+    cuts the incoming text at sentence boundaries, a synthesis thread renders each
+    sentence to in-memory audio, and a playback thread plays sentences in order. While
+    one sentence plays, the next is already being synthesized.
+    """
+
+    def __init__(self, synthesize: Callable[[str], Optional[bytes]], play: Callable[[bytes], None],
+                 max_buffered: int = 2, interrupted: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Initializes the pipeline.
+
+        Args:
+            synthesize (Callable[[str], Optional[bytes]]): Renders one sentence to audio bytes.
+            play (Callable[[bytes], None]): Plays audio bytes, blocking until done.
+            max_buffered (int): Synthesized sentences allowed to wait for playback.
+            interrupted (Optional[Callable[[], bool]]): Returns True once the patient has talked
+                over the response; the remaining sentences are then neither synthesized nor played.
+        """
+        self.synthesize = synthesize
+        self.play = play
+        self.max_buffered = max_buffered
+        self.interrupted = interrupted or (lambda: False)
+        self.first_audio_latency: Optional[float] = None  # Seconds from start to first playback
+
+    def speak(self, text: str) -> str:
+        """Speaks a complete text, pipelining synthesis and playback sentence by sentence."""
+        return self.speak_stream([text])
+
+    def speak_stream(self, chunks: Iterable[str], on_sentence: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Speaks streamed text and blocks until playback finishes. Once interrupted, no more
+        text is read from `chunks`, so an LLM stream stops generating.
+
+        Args:
+            chunks (Iterable[str]): Text chunks, e.g. LLM tokens as they arrive.
+            on_sentence (Optional[Callable[[str], None]]): Called with each sentence as it is cut.
+
+        Returns:
+            str: The full text that was received, or, if the response was interrupted, the
+                sentences whose playback had started.
+        """
+        sentences = queue.Queue()
+        audio = queue.Queue(maxsize=self.max_buffered)
+        played: List[str] = []
+        self._start = time.time()
+        self.first_audio_latency = None
+
+        # Workers keep the caller's session ID and span for tracing
+        synth_thread = threading.Thread(target=run_in_context(self._synthesize_worker, sentences, audio), daemon=True)
+        play_thread = threading.Thread(target=run_in_context(self._play_worker, audio, played), daemon=True)
+        synth_thread.start()
+        play_thread.start()
+
+        def emit(complete: List[str]) -> None:
+            for sentence in complete:
+                sentences.put(sentence)
+                if on_sentence:
+                    on_sentence(sentence)
+
+        text = ""
+        buffer = ""
+        try:
+            for chunk in chunks:
+                if self.interrupted():
+                    break
+                text += chunk
+                complete, buffer = split_complete_sentences(buffer + chunk)
+                emit(complete)
+            else:
+                # End of stream: whatever is left is complete, including an unterminated tail
+                complete, buffer = split_complete_sentences(buffer + " ")
+                emit(complete + ([buffer.strip()] if buffer.strip() else []))
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()  # Releases an abandoned LLM stream right away
+            sentences.put(None)
+            synth_thread.join()
+            play_thread.join()
+        if self.interrupted():
+            return " ".join(played)
+        return text
+
+    def _synthesize_worker(self, sentences: queue.Queue, audio: queue.Queue) -> None:
+        while True:
+            sentence = sentences.get()
+            if sentence is None:
+                audio.put(None)
+                return
+            if self.interrupted():
+                continue
+            try:
+                data = self.synthesize(sentence)
+            except Exception as e:
+                print(f"Error synthesizing sentence: {e}")
+                continue
+            if data:
+                audio.put((sentence, data))
+
+    def _play_worker(self, audio: queue.Queue, played: List[str]) -> None:
+        while True:
+            item = audio.get()
+            if item is None:
+                return
+            if self.interrupted():
+                continue
+            sentence, data = item
+            if self.first_audio_latency is None:
+                self.first_audio_latency = time.time() - self._start
+            played.append(sentence)
+            try:
+                self.play(data)
+            except Exception as e:
+                print(f"Error playing audio: {e}")
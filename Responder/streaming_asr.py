@@ -0,0 +1,169 @@
+import re
+import threading
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+from tracing import run_in_context
+
+Word = Tuple[float, float, str]  # (start, end, text), times in seconds
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+class StreamingTranscriber:
+    """
+    Incremental transcription of live audio (local-agreement policy).
+    The growing audio buffer is re-decoded every `step` seconds. Words on which two
+    consecutive hypotheses agree are committed and never change again; the rest is a
+    partial hypothesis. Audio before the last committed word is dropped from the
+    buffer, so each decode only covers the recent, still-uncertain window and the final
+    decode after the patient stops speaking is short.
+
+    After start(), partial decodes run on a background thread, so the thread feeding
+    audio (e.g. the VAD loop) never waits for a decode. While one decode runs, new audio
+    only accumulates; steps that fall inside a slow decode are skipped rather than queued.
+    """
+
+    def __init__(self, transcribe_words: Callable[[np.ndarray, str], List[Word]], sampling_rate: int = 16000,
+                 step: float = 1.0, max_window: float = 15.0,
+                 on_partial: Optional[Callable[[str, str], None]] = None) -> None:
+        """
+        Initializes the transcriber.
+
+        Args:
+            transcribe_words (Callable[[np.ndarray, str], List[Word]]): Decodes audio, given the
+                committed text as a prompt, into timestamped words relative to the audio start.
+            sampling_rate (int): Sampling rate of the audio.
+            step (float): Seconds of new audio between decodes.
+            max_window (float): Longest buffer kept when nothing can be committed.
+            on_partial (Optional[Callable[[str, str], None]]): Called after every decode with the
+                full partial transcript and its committed (stable) prefix.
+        """
+        self.transcribe_words = transcribe_words
+        self.sampling_rate = sampling_rate
+        self.step = step
+        self.max_window = max_window
+        self.on_partial = on_partial
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears all audio and text state."""
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_offset = 0.0  # Absolute time of buffer[0]
+        self.committed: List[Word] = []
+        self.hypothesis: List[Word] = []
+        self._pending_samples = 0
+
+    @property
+    def committed_text(self) -> str:
+        return "".join(word for _, _, word in self.committed).strip()
+
+    @property
+    def partial_text(self) -> str:
+        return "".join(word for _, _, word in self.committed + self.hypothesis).strip()
+
+    def start(self) -> "StreamingTranscriber":
+        """Starts decoding partials on a background thread as audio arrives."""
+        if self._worker is None:
+            self._stop.clear()
+            self._worker = threading.Thread(target=run_in_context(self._run), name="asr-partials", daemon=True)
+            self._worker.start()
+        return self
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.process()
+            except Exception as e:
+                print(f"Error decoding partial transcript: {e}")
+
+    def stop(self) -> None:
+        """Stops the background thread once its current decode is done."""
+        if self._worker is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._worker.join()
+        self._worker = None
+
+    def insert_audio(self, chunk: np.ndarray) -> None:
+        """Appends live audio to the buffer. Never waits for a decode."""
+        with self._lock:
+            self.buffer = np.concatenate([self.buffer, chunk.astype(np.float32)])
+            self._pending_samples += len(chunk)
+            due = self._pending_samples >= self.step * self.sampling_rate
+        if due and self._worker is not None:
+            self._wake.set()
+
+    def process(self) -> Optional[str]:
+        """
+        Decodes the buffer if at least `step` seconds of new audio arrived.
+
+        Returns:
+            Optional[str]: The updated partial transcript, or None if no decode ran.
+        """
+        with self._lock:
+            if self._pending_samples < self.step * self.sampling_rate:
+                return None
+            self._pending_samples = 0
+            audio, offset = self.buffer, self.buffer_offset
+
+        # Audio keeps arriving during the decode; it is appended to the buffer, not to `audio`
+        words = self._decode(audio, offset)
+        with self._lock:
+            agreed = 0
+            while agreed < min(len(words), len(self.hypothesis)) and \
+                    _normalize(words[agreed][2]) == _normalize(self.hypothesis[agreed][2]):
+                agreed += 1
+            self.committed.extend(words[:agreed])
+            self.hypothesis = words[agreed:]
+            self._trim()
+            partial, committed = self.partial_text, self.committed_text
+
+        if self.on_partial:
+            self.on_partial(partial, committed)
+        return partial
+
+    def finish(self) -> str:
+        """Decodes whatever is left after the speaker stopped and returns the final transcript."""
+        self.stop()
+        if len(self.buffer):
+            self.committed.extend(self._decode(self.buffer, self.buffer_offset))
+        self.hypothesis = []
+        text = self.committed_text
+        self.reset()
+        return text
+
+    def _decode(self, audio: np.ndarray, offset: float) -> List[Word]:
+        """
+        Decodes audio starting at absolute time `offset` and returns the words after the
+        last committed one, in absolute time.
+        """
+        last_end = self.committed[-1][1] if self.committed else 0.0
+        words = [(start + offset, end + offset, text)
+                 for start, end, text in self.transcribe_words(audio, self.committed_text[-200:])]
+        # A word that ends before the last committed word ended was already committed
+        return [word for word in words if word[1] > last_end + 0.05]
+
+    def _trim(self) -> None:
+        """Drops buffered audio that is fully covered by committed words."""
+        cut = None
+        if self.committed and self.committed[-1][1] > self.buffer_offset:
+            cut = self.committed[-1][1]
+        buffer_seconds = len(self.buffer) / self.sampling_rate
+        if cut is None and buffer_seconds > self.max_window:
+            cut = self.buffer_offset + buffer_seconds - self.max_window
+        if cut is None:
+            return
+        samples = int((cut - self.buffer_offset) * self.sampling_rate)
+        self.buffer = self.buffer[samples:]
+        self.buffer_offset += samples / self.sampling_rate
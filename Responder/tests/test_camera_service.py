@@ -0,0 +1,45 @@
+import time
+import numpy as np
+from camera_service import CameraService
+
+
+class SlowCamera:
+    """Fake capture that takes a while to open, then delivers frames at about 100 fps."""
+
+    def __init__(self, open_delay):
+        time.sleep(open_delay)
+        self.frames = 0
+
+    def read(self):
+        time.sleep(0.01)
+        self.frames += 1
+        return True, np.full((4, 4, 3), self.frames % 256, dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+def test_reader_waits_for_a_slow_opening_camera():
+    service = CameraService(lambda: SlowCamera(open_delay=1.5), max_age=0.5).start()
+    try:
+        reader = service.reader(timeout=5.0)
+        start = time.time()
+        ok, frame = reader.read()
+        assert ok and frame is not None
+        assert time.time() - start >= 1.0
+        # Later reads get newer frames without failing
+        for _ in range(5):
+            ok, frame = reader.read()
+            assert ok
+    finally:
+        service.stop()
+
+
+def test_reader_gives_up_after_its_timeout():
+    service = CameraService(lambda: SlowCamera(open_delay=2.0)).start()
+    try:
+        start = time.time()
+        assert service.reader(timeout=0.3).read() == (False, None)
+        assert time.time() - start < 1.5
+    finally:
+        service.stop()
@@ -0,0 +1,64 @@
+import os
+import time
+import pytest
+
+pytest.importorskip("notion_client")
+pytest.importorskip("config")  # Notion.py reads the API key and parent page from it
+
+from bench_stubs import NotionStub
+from notion_queue import NotionWriteQueue
+
+
+@pytest.fixture
+def notion(monkeypatch):
+    stub = NotionStub(latency=0.0).start()
+    monkeypatch.setenv("NOTION_BASE_URL", stub.url)
+    yield stub
+    stub.stop()
+
+
+def drain(queue: NotionWriteQueue, timeout: float = 10.0) -> None:
+    deadline = time.time() + timeout
+    while queue.pending() and time.time() < deadline:
+        delay = queue.process_next()
+        if delay:
+            time.sleep(min(delay, 0.05))
+
+
+def open_queue(tmp_path) -> NotionWriteQueue:
+    from Notion import NotionDB
+
+    db = NotionDB("Patients", cache_path=str(tmp_path / "notion_ids.json"))
+    return NotionWriteQueue(str(tmp_path / "spool.sqlite3"), db.write_entry, min_interval=0.0, backoff=0.01)
+
+
+def test_entry_survives_outage_and_restart_without_duplicate_page(notion, tmp_path):
+    entry = {"name": "Ann", "description": "Chest pain for two days.", "date": "2026-10-17", "time": "10:00:00"}
+    queue = open_queue(tmp_path)
+    queue.enqueue(entry)
+
+    # Resolving the database takes two requests; the body append after the page is rate limited
+    notion.rate_limit_every = 4
+    notion.retry_after = 0.01
+    assert queue.process_next() == 0.0
+    assert queue.pending() == 1
+    assert len(notion.pages) == 1
+
+    # The retry falls into an outage, then the process restarts
+    notion.rate_limit_every = 0
+    notion.down = True
+    drain(queue, timeout=0.5)
+    assert queue.pending() == 1
+    queue.close()
+
+    notion.down = False
+    queue = open_queue(tmp_path)
+    drain(queue)
+    assert queue.pending() == 0
+    assert queue.failed() == 0
+    queue.close()
+
+    assert len(notion.pages) == 1
+    (page_id,) = notion.pages
+    body = notion.children[page_id]
+    assert [block["paragraph"]["rich_text"][0]["text"]["content"] for block in body] == [entry["description"]]
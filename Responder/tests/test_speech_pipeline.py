@@ -0,0 +1,57 @@
+import threading
+from speech_pipeline import SpeechPipeline, split_complete_sentences
+
+
+def test_decimal_does_not_stop_later_sentences():
+    sentences, rest = split_complete_sentences("Your temperature is 38.5 degrees. How long have you had it? ")
+    assert sentences == ["Your temperature is 38.5 degrees.", "How long have you had it?"]
+    assert rest == " "
+
+
+def test_sentence_is_cut_before_the_next_one_arrives():
+    sentences, rest = split_complete_sentences("Your temperature is 38.5 degrees. How long")
+    assert sentences == ["Your temperature is 38.5 degrees."]
+    assert rest == " How long"
+
+
+def test_terminator_at_end_of_buffer_stays_pending():
+    sentences, rest = split_complete_sentences("Your temperature is 38.")
+    assert sentences == []
+    assert rest == "Your temperature is 38."
+
+
+def test_abbreviation_and_punctuation_run_on():
+    sentences, rest = split_complete_sentences("Take e.g.paracetamol!, then rest. Call us")
+    assert sentences == ["Take e.g.paracetamol!, then rest."]
+    assert rest == " Call us"
+
+
+def test_interrupted_stream_returns_played_text_and_stops_reading():
+    played = []
+    barged_in = threading.Event()
+
+    def play(data):
+        played.append(data)
+        barged_in.set()  # The patient talks over the first sentence
+
+    pipeline = SpeechPipeline(lambda sentence: sentence.encode(), play, interrupted=barged_in.is_set)
+    read = []
+
+    def chunks():
+        for chunk in ["Where does it hurt? ", "Is it sharp? ", "Does it spread? ", "Any fever? "]:
+            read.append(chunk)
+            yield chunk
+            barged_in.wait(1.0)
+
+    text = pipeline.speak_stream(chunks())
+    assert text == "Where does it hurt?"
+    assert played == [b"Where does it hurt?"]
+    assert len(read) == 2
+
+
+def test_uninterrupted_stream_returns_full_text():
+    played = []
+    pipeline = SpeechPipeline(lambda sentence: sentence.encode(), played.append)
+    text = pipeline.speak_stream(["Where does it ", "hurt? Is it sharp"])
+    assert text == "Where does it hurt? Is it sharp"
+    assert played == [b"Where does it hurt?", b"Is it sharp"]
@@ -0,0 +1,36 @@
+import os
+from tts_cache import TTSCache
+
+CLOSING = "Thank you for your time."
+
+
+def make_cache(directory, calls):
+    def synthesize(text):
+        calls.append(text)
+        return text.encode()
+
+    return TTSCache(synthesize, str(directory), "model", "wav", fixed_phrases=[CLOSING])
+
+
+def test_only_fixed_phrases_are_stored_on_disk(tmp_path):
+    calls = []
+    cache = make_cache(tmp_path, calls)
+    cache.warm()
+    assert cache.get("Your temperature is 38.5 degrees.") == b"Your temperature is 38.5 degrees."
+    assert cache.get("Your temperature is 38.5 degrees.") == b"Your temperature is 38.5 degrees."
+    assert calls == [CLOSING, "Your temperature is 38.5 degrees."]
+    assert os.listdir(tmp_path) == [f"{cache.key(CLOSING)}.audio"]
+
+
+def test_fixed_phrases_survive_a_restart(tmp_path):
+    make_cache(tmp_path, []).warm()
+    calls = []
+    assert make_cache(tmp_path, calls).get(CLOSING) == CLOSING.encode()
+    assert calls == []
+
+
+def test_replies_stored_by_older_versions_are_removed(tmp_path):
+    cache = make_cache(tmp_path, [])
+    (tmp_path / f"{cache.key('You mentioned chest pain.')}.audio").write_bytes(b"reply")
+    make_cache(tmp_path, [])
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,343 @@
+import os
+import sys
+import json
+import time
+import uuid
+import atexit
+import threading
+import contextvars
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+session_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("session_id", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed stage. Spans nest: a span started inside another records it as its parent."""
+
+    def __init__(self, name: str, attributes: Dict[str, object]) -> None:
+        self.name = name
+        self.attributes = attributes
+        self.span_id = uuid.uuid4().hex[:16]
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent else None
+        self.session_id = session_id.get()
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        """Adds attributes, e.g. results known only at the end of the stage."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, object]:
+        record = {
+            "span": self.name,
+            "session_id": self.session_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": round(self.start, 6),
+            "duration": round(self.duration or 0.0, 6),
+            "status": "error" if self.error else "ok",
+        }
+        if self.error:
+            record["error"] = self.error
+        record.update(self.attributes)
+        return record
+
+
+class StageMetrics:
+    """Per-stage latency histograms and error counts in the Prometheus text format."""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS) -> None:
+        self.buckets = buckets
+        self._counts: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, duration: float, error: bool = False) -> None:
+        with self._lock:
+            if stage not in self._counts:
+                self._counts[stage] = [0] * (len(self.buckets) + 1)
+                self._sums[stage] = 0.0
+                self._errors[stage] = 0
+            self._counts[stage][bisect_left(self.buckets, duration)] += 1
+            self._sums[stage] += duration
+            self._errors[stage] += int(error)
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP healia_stage_duration_seconds Duration of intake flow stages.",
+            "# TYPE healia_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            stages = sorted(self._counts)
+            for stage in stages:
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), self._counts[stage]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'healia_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'healia_stage_duration_seconds_sum{{stage="{stage}"}} {self._sums[stage]:.6f}')
+                lines.append(f'healia_stage_duration_seconds_count{{stage="{stage}"}} {cumulative}')
+            lines.append("# HELP healia_stage_errors_total Stages that raised an exception.")
+            lines.append("# TYPE healia_stage_errors_total counter")
+            for stage in stages:
+                lines.append(f'healia_stage_errors_total{{stage="{stage}"}} {self._errors[stage]}')
+        return "\n".join(lines) + "\n"
+
+
+class Tracer:
+    """
+    Records named spans around the stages of the intake flow. Every finished span feeds the
+    stage histograms, and is written as one JSON line to the log sinks (unless the span is
+    marked as too frequent to log, e.g. per camera frame).
+    """
+
+    def __init__(self) -> None:
+        self.metrics = StageMetrics()
+        self._sinks: List[Callable[[Dict[str, object]], None]] = []
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink: Callable[[Dict[str, object]], None]) -> None:
+        """Registers a callable that receives every logged span as a dict."""
+        self._sinks.append(sink)
+
+    def log_to(self, stream: TextIO) -> None:
+        """Writes logged spans to a text stream as JSON lines."""
+        def write(record):
+            with self._lock:
+                stream.write(json.dumps(record, default=str) + "\n")
+                stream.flush()
+        self.add_sink(write)
+
+    @contextmanager
+    def span(self, name: str, log: bool = True, **attributes) -> Iterator[Span]:
+        """
+        Times a stage.
+
+        Args:
+            name (str): Stage name, e.g. 'asr.transcribe'.
+            log (bool): Write the span to the JSON log. Hot, per-frame stages only feed the metrics.
+            **attributes: Extra fields for the log record.
+
+        Yields:
+            Span: The span, for adding attributes.
+        """
+        current = Span(name, attributes)
+        token = _current_span.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            current.duration = time.time() - current.start
+            self.metrics.observe(name, current.duration, error=current.error is not None)
+            if log and self._sinks:
+                self._emit(current.to_dict())
+
+    def record(self, name: str, duration: float, log: bool = True, **attributes) -> None:
+        """Records a stage measured by the caller, e.g. time to an LLM's first token."""
+        self.metrics.observe(name, duration)
+        if log and self._sinks:
+            current = Span(name, attributes)
+            current.start -= duration
+            current.duration = duration
+            self._emit(current.to_dict())
+
+    def traced(self, name: str, log: bool = True) -> Callable:
+        """Decorator form of span()."""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name, log=log):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _emit(self, record: Dict[str, object]) -> None:
+        for sink in self._sinks:
+            try:
+                sink(record)
+            except Exception as e:
+                print(f"Error writing trace: {e}")
+
+
+@contextmanager
+def session_scope(session: Optional[str] = None) -> Iterator[str]:
+    """Tags every span started in this context (and threads started via run_in_context) with a session ID."""
+    session = session or uuid.uuid4().hex[:12]
+    token = session_id.set(session)
+    try:
+        yield session
+    finally:
+        session_id.reset(token)
+
+
+def run_in_context(target: Callable, *args) -> Callable[[], None]:
+    """
+    Wraps a thread target so it runs with a copy of the caller's context, keeping the session
+    ID and parent span of the thread that started it.
+    """
+    context = contextvars.copy_context()
+    return lambda: context.run(target, *args)
+
+
+class MetricsServer:
+    """
+    Serves the stage metrics at /metrics for Prometheus to scrape. Binds to localhost
+    unless another host is given, since the metrics reveal session activity.
+    """
+
+    def __init__(self, metrics: StageMetrics, port: int = 9108, host: str = "127.0.0.1") -> None:
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler for hot-path investigation. A background thread samples
+    the stacks of all other threads every `interval` seconds; write() saves them in the
+    collapsed-stack format read by flamegraph tools (e.g. speedscope, flamegraph.pl).
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def top(self, count: int = 20) -> List[Tuple[str, int]]:
+        """Returns the functions most often on top of a stack, with their sample counts."""
+        leaves = Counter()
+        for stack, samples in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += samples
+        return leaves.most_common(count)
+
+    def write(self, path: str) -> None:
+        """Saves the samples as collapsed stacks."""
+        with open(path, "w") as f:
+            for stack, samples in self.samples.items():
+                f.write(f"{stack} {samples}\n")
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+# Shared by the whole process
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_from_env() -> None:
+    """
+    Sets up trace export from environment variables. Safe to call repeatedly; only the first
+    call has an effect.
+
+    HEALIA_TRACE_LOG: JSON-lines span log, a file path or '-' for stderr.
+    HEALIA_METRICS_PORT: Port of the /metrics endpoint.
+    HEALIA_METRICS_HOST: Address the /metrics endpoint binds to (default 127.0.0.1; e.g.
+        0.0.0.0 to let a Prometheus on another host scrape it).
+    HEALIA_PROFILE: File the sampling profiler writes collapsed stacks to at exit.
+    HEALIA_PROFILE_INTERVAL: Sampling interval in seconds (default 0.005).
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+
+    log_path = os.environ.get("HEALIA_TRACE_LOG")
+    if log_path:
+        tracer.log_to(sys.stderr if log_path == "-" else open(log_path, "a"))
+
+    port = os.environ.get("HEALIA_METRICS_PORT")
+    if port:
+        try:
+            host = os.environ.get("HEALIA_METRICS_HOST", "127.0.0.1")
+            server = MetricsServer(tracer.metrics, int(port), host).start()
+            print(f"Serving metrics on {host}:{server.port}")
+        except Exception as e:
+            print(f"Error starting metrics server: {e}")
+
+    profile_path = os.environ.get("HEALIA_PROFILE")
+    if profile_path:
+        profiler = SamplingProfiler(float(os.environ.get("HEALIA_PROFILE_INTERVAL", 0.005))).start()
+
+        def save_profile():
+            profiler.stop()
+            profiler.write(profile_path)
+
+        atexit.register(save_profile)
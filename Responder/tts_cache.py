@@ -0,0 +1,158 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized speech.
+    Audio is keyed by the hash of (text, voice model, format) and kept in a size-bounded
+    in-memory LRU, so repeated phrases play without a network round trip. Only the fixed
+    phrases (greeting and closing templates) are also kept in a size-bounded on-disk
+    store across restarts; replies can contain a patient's medical details, so they never
+    leave memory.
+    """
+
+    def __init__(self, synthesize: Callable[[str], Optional[bytes]], cache_dir: str, model: str, audio_format: str,
+                 fixed_phrases: Iterable[str] = (), max_memory_bytes: int = 32 * 1024 * 1024,
+                 max_disk_bytes: int = 256 * 1024 * 1024) -> None:
+        """
+        Initializes the cache.
+
+        Args:
+            synthesize (Callable[[str], Optional[bytes]]): Renders text to audio bytes on a miss.
+            cache_dir (str): Directory of the on-disk store.
+            model (str): Voice model the synthesizer uses; part of the cache key.
+            audio_format (str): Audio format the synthesizer produces; part of the cache key.
+            fixed_phrases (Iterable[str]): Phrases that contain no patient details and may be stored
+                on disk. Everything else is cached in memory only.
+            max_memory_bytes (int): Size bound of the in-memory LRU.
+            max_disk_bytes (int): Size bound of the on-disk store; least recently used files go first.
+        """
+        self.synthesize = synthesize
+        self.cache_dir = cache_dir
+        self.model = model
+        self.audio_format = audio_format
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.fixed_phrases = list(fixed_phrases)
+        self._fixed_keys = {self.key(phrase) for phrase in self.fixed_phrases}
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._remove_dynamic()
+        self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.is_file())
+
+    def key(self, text: str) -> str:
+        """Returns the cache key of a phrase for the configured voice and format."""
+        return hashlib.sha256("\0".join((text, self.model, self.audio_format)).encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[bytes]:
+        """
+        Returns the audio for a phrase, synthesizing and caching it on a miss.
+
+        Args:
+            text (str): The text to speak.
+
+        Returns:
+            Optional[bytes]: The audio, or None if synthesis failed.
+        """
+        key = self.key(text)
+        persistent = key in self._fixed_keys
+        data = self._get_memory(key) or (self._get_disk(key) if persistent else None)
+        if data is not None:
+            self.hits += 1
+            self._put_memory(key, data)
+            return data
+
+        self.misses += 1
+        data = self.synthesize(text)
+        if data:
+            self._put_memory(key, data)
+            if persistent:
+                self._put_disk(key, data)
+        return data
+
+    def warm(self, phrases: Optional[Iterable[str]] = None) -> None:
+        """Pre-renders phrases, by default the fixed ones, so their first use is served from the cache."""
+        for phrase in self.fixed_phrases if phrases is None else phrases:
+            self.get(phrase)
+
+    def _get_memory(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            return data
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _remove_dynamic(self) -> None:
+        """Deletes stored audio of anything but the fixed phrases, e.g. replies written by older versions."""
+        for entry in os.scandir(self.cache_dir):
+            key = entry.name.split(".", 1)[0]
+            if entry.is_file() and key not in self._fixed_keys:
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    print(f"Error removing TTS cache entry: {e}")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.audio")
+
+    def _get_disk(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Marks the file as recently used for eviction
+            return data
+        except OSError:
+            return None
+
+    def _put_disk(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing TTS cache entry: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += len(data)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Deletes least recently used files until the store fits its size bound."""
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.is_file() and entry.name.endswith(".audio")]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        self._disk_bytes = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._disk_bytes -= size
+            except OSError:
+                pass
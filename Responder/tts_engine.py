@@ -0,0 +1,149 @@
+import random
+import asyncio
+import threading
+import httpx
+from typing import Optional
+
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class TTSError(Exception):
+    """Raised when speech synthesis fails after all retries."""
+
+
+class TTSEngine:
+    """
+    Long-lived client for the Deepgram speak REST API.
+    All requests run on one background event loop and share a pooled, keep-alive HTTP
+    session, so concurrent sessions reuse connections instead of each opening their own.
+    Offers an asyncio API (usable from any event loop) and a blocking wrapper.
+    """
+
+    def __init__(self, api_key: str, model: str, audio_format: str, base_url: str = "https://api.deepgram.com",
+                 max_in_flight: int = 4, max_connections: int = 8, timeout: float = 10.0,
+                 retries: int = 3, backoff: float = 0.5) -> None:
+        """
+        Initializes the engine. The HTTP session is opened lazily on first use.
+
+        Args:
+            api_key (str): Deepgram API key.
+            model (str): Voice model, e.g. 'aura-asteria-en'.
+            audio_format (str): 'encoding/container', e.g. 'linear16/wav'.
+            base_url (str): API root. Point it at a local stand-in server for testing.
+            max_in_flight (int): Maximum concurrent synthesis requests.
+            max_connections (int): Size of the HTTP connection pool.
+            timeout (float): Per-request timeout in seconds.
+            retries (int): Retries after the first attempt for timeouts, connection errors,
+                429 and 5xx responses.
+            backoff (float): Base delay in seconds of the exponential backoff between retries.
+        """
+        self.api_key = api_key
+        self.model = model
+        self.encoding, self.container = audio_format.split("/")
+        self.base_url = base_url.rstrip("/")
+        self.max_in_flight = max_in_flight
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Starts the engine's event loop thread on first use."""
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="tts-engine", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _ensure_client(self) -> None:
+        """Opens the HTTP session. Executes on the engine's loop."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Token {self.api_key}"},
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+    async def _request(self, text: str) -> bytes:
+        """Runs one synthesis request with retries. Executes on the engine's loop."""
+        await self._ensure_client()
+        params = {"model": self.model, "encoding": self.encoding, "container": self.container}
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                retry_after = None
+                try:
+                    response = await self._client.post("/v1/speak", params=params, json={"text": text})
+                    if response.status_code == 200:
+                        return response.content
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        raise TTSError(f"Deepgram returned {response.status_code}: {response.text[:200]}")
+                    error = TTSError(f"Deepgram returned {response.status_code}")
+                    retry_after = response.headers.get("Retry-After")
+                except httpx.TransportError as e:  # Timeouts and connection errors
+                    error = e
+                if attempt == self.retries:
+                    raise TTSError(f"Synthesis failed after {attempt + 1} attempts: {error}")
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                await asyncio.sleep(delay)
+
+    async def synthesize_async(self, text: str) -> bytes:
+        """
+        Synthesizes speech. Can be awaited from any event loop.
+
+        Args:
+            text (str): The text to speak.
+
+        Returns:
+            bytes: The audio.
+
+        Raises:
+            TTSError: If synthesis fails after all retries.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._request(text), self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+    def synthesize(self, text: str) -> bytes:
+        """
+        Blocking version of synthesize_async, safe to call from any thread.
+
+        Raises:
+            TTSError: If synthesis fails after all retries.
+        """
+        return asyncio.run_coroutine_threadsafe(self._request(text), self._ensure_loop()).result()
+
+    async def _connect(self) -> None:
+        """Opens a pooled connection (TCP and TLS) without synthesizing anything."""
+        await self._ensure_client()
+        try:
+            await self._client.head("/")
+        except httpx.HTTPError:
+            pass
+
+    def warm(self) -> None:
+        """Opens a connection ahead of the first request."""
+        asyncio.run_coroutine_threadsafe(self._connect(), self._ensure_loop()).result()
+
+    def close(self) -> None:
+        """Closes the HTTP session and stops the event loop thread."""
+        with self._start_lock:
+            if self._loop is None:
+                return
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+                self._client = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
@@ -0,0 +1,110 @@
+import numpy as np
+
+
+class EnergyVAD:
+    """
+    Lightweight energy-based voice activity detector.
+    A frame counts as speech when its RMS energy is well above an adaptive noise floor.
+    The floor drops immediately to quieter frames and rises slowly otherwise, so it
+    tracks background noise without being dragged up by speech.
+    """
+
+    def __init__(self, ratio: float = 3.0, min_rms: float = 0.01, adapt_rate: float = 0.05) -> None:
+        """
+        Initializes the detector.
+
+        Args:
+            ratio (float): How far above the noise floor a frame must be to count as speech.
+            min_rms (float): Absolute RMS below which a frame is never speech.
+            adapt_rate (float): How quickly the noise floor follows louder non-speech frames (0-1).
+        """
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.adapt_rate = adapt_rate
+        self.noise_floor = min_rms / ratio
+
+    @staticmethod
+    def rms(frame: np.ndarray) -> float:
+        return float(np.sqrt(np.mean(np.square(frame, dtype=np.float64)))) if frame.size else 0.0
+
+    def threshold(self) -> float:
+        """Current speech threshold in RMS units."""
+        return max(self.min_rms, self.noise_floor * self.ratio)
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        """
+        Classifies one audio frame and updates the noise floor.
+
+        Args:
+            frame (np.ndarray): Mono float32 samples, typically 10-30 ms.
+
+        Returns:
+            bool: True if the frame contains speech.
+        """
+        energy = self.rms(frame)
+        speech = energy > self.threshold()
+        if not speech:
+            if energy < self.noise_floor:
+                self.noise_floor = energy
+            else:
+                self.noise_floor += self.adapt_rate * (energy - self.noise_floor)
+        return speech
+
+
+class EchoAwareVAD:
+    """
+    Voice activity detector for a microphone that also hears the assistant's own playback.
+    It knows what is being played (the reference signal) and learns how loudly the
+    speaker leaks into the microphone. A frame counts as speech only when it is clearly
+    louder than the expected echo, so the assistant does not interrupt itself. Without
+    playback it behaves like EnergyVAD.
+    """
+
+    def __init__(self, ratio: float = 3.0, min_rms: float = 0.01, echo_ratio: float = 2.0,
+                 echo_gain: float = 1.0, adapt_rate: float = 0.05, echo_frames: int = 8) -> None:
+        """
+        Initializes the detector.
+
+        Args:
+            ratio (float): How far above the noise floor a frame must be to count as speech.
+            min_rms (float): Absolute RMS below which a frame is never speech.
+            echo_ratio (float): How far above the expected echo a frame must be to count as speech.
+            echo_gain (float): Initial estimate of microphone level per unit of playback level.
+                Starts conservative and is learned from frames without speech.
+            adapt_rate (float): How quickly the noise floor and echo gain adapt (0-1).
+            echo_frames (int): Recent playback frames considered, covering the delay between
+                output and the echo reaching the microphone.
+        """
+        self.energy = EnergyVAD(ratio, min_rms, adapt_rate)
+        self.echo_ratio = echo_ratio
+        self.echo_gain = echo_gain
+        self.adapt_rate = adapt_rate
+        self.echo_frames = echo_frames
+        self._reference = []
+
+    def is_speech(self, frame: np.ndarray, reference: np.ndarray) -> bool:
+        """
+        Classifies one microphone frame and updates the noise floor and echo estimate.
+
+        Args:
+            frame (np.ndarray): Mono float32 microphone samples.
+            reference (np.ndarray): The samples played during the same frame (zeros when silent).
+
+        Returns:
+            bool: True if the frame contains speech that is not just echo.
+        """
+        self._reference = (self._reference + [EnergyVAD.rms(reference)])[-self.echo_frames:]
+        playback = max(self._reference)
+        if playback < self.energy.min_rms / 10:
+            return self.energy.is_speech(frame)
+
+        energy = EnergyVAD.rms(frame)
+        expected_echo = self.echo_gain * playback
+        speech = energy > max(self.energy.threshold(), self.echo_ratio * expected_echo)
+        if not speech:
+            # Echo and background only: learn the coupling. The estimate rises slowly, so
+            # patient speech that is not yet loud enough to count is not learned as echo
+            observed = energy / playback
+            rate = self.adapt_rate / 10 if observed > self.echo_gain else self.adapt_rate
+            self.echo_gain += rate * (observed - self.echo_gain)
+        return speech